@@ -1,31 +1,17 @@
+import hashlib
+import json
 import jsonschema
 import requests
 import logging
 
 from UPISAS.exceptions import ServerNotReachable, IncompleteJSONSchema
+from UPISAS.http_pool import get_session
 
-pull_image_tasks = {}
 
-
-def show_progress(line, progress):
-    """ Show task progress (red for download, green for extract). Used when pulling images."""
-    if line['status'] == 'Downloading':
-        id = f'[red][Download {line["id"]}]'
-    elif line['status'] == 'Extracting':
-        id = f'[green][Extract  {line["id"]}]'
-    else:
-        # skip other statuses
-        return
-    if id not in pull_image_tasks.keys():
-        pull_image_tasks[id] = progress.add_task(f"{id}", total=line['progressDetail']['total'])
-    else:
-        progress.update(pull_image_tasks[id], completed=line['progressDetail']['current'])
-
-
-def get_response_for_get_request(url):
+def get_response_for_get_request(url, headers=None):
     try:
         logging.info("GET request to " + str(url))
-        response = requests.get(url)
+        response = get_session().get(url, headers=headers)
         return response
     except requests.exceptions.ConnectionError as e:
         logging.error(e)
@@ -33,15 +19,52 @@ def get_response_for_get_request(url):
         raise ServerNotReachable
 
 
-def validate_schema(json_instance, json_schema):
+VALIDATION_FULL = "full"
+VALIDATION_SAMPLED = "sampled"
+VALIDATION_KEYS = "keys"
+
+_validators = {}
+
+
+def schema_fingerprint(json_schema):
+    """ Stable hash of a JSON schema, used as the key of the validator cache."""
+    canonical = json.dumps(json_schema, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def get_validator(json_schema):
+    """ Return a compiled validator for the schema. The metaschema check runs only once per schema."""
+    fingerprint = schema_fingerprint(json_schema)
+    validator = _validators.get(fingerprint)
+    if validator is None:
+        validator_class = jsonschema.validators.validator_for(json_schema)
+        validator_class.check_schema(json_schema)
+        validator = validator_class(json_schema)
+        _validators[fingerprint] = validator
+    return validator
+
+
+def validate_schema(json_instance, json_schema, mode=VALIDATION_FULL, tick=0, sample_every=10, key_path=None):
+    """
+    Validate a JSON object against a JSON Schema.
+
+    The top-level keys (or the keys of `json_instance[key_path]`, for exemplars whose schema
+    describes a single entry of the object) must match the schema properties in every mode.
+    `mode` selects how much is checked beyond that: VALIDATION_FULL validates every call,
+    VALIDATION_SAMPLED only every `sample_every`-th `tick`, and VALIDATION_KEYS only the keys.
+    """
     try:
         incomplete_warning_message = "No complete JSON Schema provided for validation"
         if json_schema and "type" in json_schema and "properties" in json_schema:
-            json_instance_keys = sorted(json_instance["CONFIG-SERVER"].keys()) 
+            keyed_instance = json_instance[key_path] if key_path else json_instance
+            json_instance_keys = sorted(keyed_instance.keys())
             json_schema_keys = sorted(json_schema["properties"].keys())
             if json_instance_keys == json_schema_keys:
-                jsonschema.validate(json_instance, json_schema)
-                logging.info("JSON object validated by JSON Schema")
+                if mode == VALIDATION_FULL or (mode == VALIDATION_SAMPLED and tick % sample_every == 0):
+                    get_validator(json_schema).validate(json_instance)
+                    logging.info("JSON object validated by JSON Schema")
+                else:
+                    logging.debug("JSON object keys validated by JSON Schema")
             else:
                 logging.error(incomplete_warning_message + " Keys misaligned")
                 raise IncompleteJSONSchema
@@ -54,5 +77,3 @@ def validate_schema(json_instance, json_schema):
     except jsonschema.exceptions.SchemaError as error:
         logging.error(f"SchemaError in validating JSON object with JSON Schema: {error}")
         raise
-
-
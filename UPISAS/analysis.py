@@ -0,0 +1,135 @@
+import math
+
+# Metrics aggregated for every instance: the fraction of samples in which the instance
+# was failed / unreachable, and the reported QoS values.
+from UPISAS.snapshot_model import FAILED, UNREACHABLE, RESPONSE_TIME, AVAILABILITY, METRICS
+
+
+def window_sum(window):
+    """Sum and count of the samples of a window that are not missing (NaN)."""
+    total, count = 0.0, 0
+    for value in window:
+        if not math.isnan(value):
+            total += value
+            count += 1
+    return total, count
+
+
+class InstanceAggregates:
+    __slots__ = ("instance_id", "status", "folded", "sums")
+
+    def __init__(self, instance_id):
+        self.instance_id = instance_id
+        self.status = None
+        self.folded = {}  # Metric -> (series, number of its samples) folded into the sums
+        self.sums = {metric: (0.0, 0) for metric in METRICS}
+
+    def mean(self, metric):
+        total, count = self.sums[metric]
+        return total / count if count else math.nan
+
+
+class ServiceAggregates:
+    """Windowed aggregates of a service, kept as running sums over its instances' windows."""
+
+    def __init__(self, service_id):
+        self.service_id = service_id
+        self.implementation_id = None
+        self.instances = {}
+        self.totals = {metric: [0.0, 0] for metric in METRICS}
+
+    def mean(self, metric):
+        total, count = self.totals[metric]
+        return total / count if count else math.nan
+
+    def add(self, instance, metric, delta_total, delta_count):
+        total, count = instance.sums[metric]
+        instance.sums[metric] = (total + delta_total, count + delta_count)
+        totals = self.totals[metric]
+        totals[0] += delta_total
+        totals[1] += delta_count
+
+    def remove_instance(self, instance_id):
+        instance = self.instances.pop(instance_id)
+        for metric, (total, count) in instance.sums.items():
+            self.totals[metric][0] -= total
+            self.totals[metric][1] -= count
+
+
+class IncrementalAnalyzer:
+    """
+    Keeps windowed aggregates (failure rate, unreachable rate, mean response time,
+    availability) per instance and per service over the last `window_size` samples of
+    a MonitoredHistory, e.g. `Knowledge.history`.
+
+    The analyzer subscribes to the history, which records one sample per new snapshot
+    of an instance, and `update` only visits the instances and services it reported
+    as changed: the new samples are added to running sums and the ones that left the
+    window are subtracted, so the work is proportional to the number of changes.
+    Services and instances that left the history leave the aggregates too.
+    """
+
+    def __init__(self, history, window_size):
+        if window_size > history.capacity:
+            raise ValueError(f"window_size {window_size} is larger than the history ({history.capacity} samples)")
+        self.history = history
+        self.window_size = window_size
+        self.services = {}
+        # (service id, instance id or None) changed in the history since the last update
+        self._pending = {(service_id, instance_id) for service_id in history.services()
+                         for instance_id in (None, *history.instances(service_id))}
+        history.subscribe(self)
+
+    def history_changed(self, service_id, instance_id):
+        self._pending.add((service_id, instance_id))
+
+    def update(self):
+        """Bring the aggregates up to date with the history; returns the ids of the services that changed."""
+        history = self.history
+        pending, self._pending = self._pending, set()
+        changed = set()
+        # Services first, so that the instances of a new service find it
+        for service_id, instance_id in sorted(pending, key=lambda key: key[1] is not None):
+            if service_id not in history.services():
+                if self.services.pop(service_id, None) is not None:
+                    changed.add(service_id)
+                continue
+            service = self.services.get(service_id)
+            if service is None:
+                service = self.services[service_id] = ServiceAggregates(service_id)
+            if instance_id is None:
+                service.implementation_id = history.implementation(service_id)
+            elif instance_id not in history.instances(service_id):
+                if instance_id not in service.instances:
+                    continue
+                service.remove_instance(instance_id)
+            else:
+                instance = service.instances.get(instance_id)
+                if instance is None:
+                    instance = service.instances[instance_id] = InstanceAggregates(instance_id)
+                instance.status = history.status(service_id, instance_id)
+                for metric in METRICS:
+                    self._advance(service, instance, metric)
+            changed.add(service_id)
+        return changed
+
+    def _advance(self, service, instance, metric):
+        """Fold the samples appended to a series since the last update into the running sums."""
+        series = self.history.series(service.service_id, instance.instance_id, metric)
+        if series is None:
+            return
+        folded_series, folded = instance.folded.get(metric, (None, 0))
+        new = series.appended - folded
+        size = self.window_size
+        instance.folded[metric] = (series, series.appended)
+        if folded_series is not series or new + size > series.capacity:
+            # A new series, or one whose samples that left the window are overwritten: sum it again
+            total, count = instance.sums[metric]
+            window_total, window_count = window_sum(series.window(size))
+            service.add(instance, metric, window_total - total, window_count - count)
+        elif new > 0:
+            recent = series.window(new + size)
+            old = len(recent) - new  # Samples of the previous window
+            entered_total, entered_count = window_sum(recent[max(old, len(recent) - size):])
+            left_total, left_count = window_sum(recent[:min(old, max(0, len(recent) - size))])
+            service.add(instance, metric, entered_total - left_total, entered_count - left_count)
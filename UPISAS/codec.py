@@ -0,0 +1,93 @@
+"""
+Encoding and decoding of the documents exchanged with the exemplars.
+
+JSON goes through orjson when it is installed and through the standard library otherwise
+(UPISAS_JSON_CODEC=json forces the latter). msgpack, a more compact binary encoding of the
+same documents, is available when the msgpack package is installed; the RAMSES interface
+serves /monitor in it to clients that ask for it in their Accept header.
+"""
+
+import json
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+# Other names clients and servers use for msgpack
+_MSGPACK_ALIASES = ("application/x-msgpack", "application/vnd.msgpack")
+
+
+class Codec:
+    """A named encoding: `dumps` returns bytes, `loads` takes bytes or str."""
+    __slots__ = ("name", "media_type", "dumps", "loads")
+
+    def __init__(self, name, media_type, dumps, loads):
+        self.name = name
+        self.media_type = media_type
+        self.dumps = dumps
+        self.loads = loads
+
+    def __repr__(self):
+        return f"Codec({self.name!r}, {self.media_type!r})"
+
+
+def _stdlib_dumps(obj):
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+STDLIB_JSON = Codec("json", JSON_MEDIA_TYPE, _stdlib_dumps, json.loads)
+CODECS = {"json": STDLIB_JSON}
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    CODECS["orjson"] = Codec("orjson", JSON_MEDIA_TYPE, lambda obj: orjson.dumps(obj, option=_ORJSON_OPTIONS),
+                             orjson.loads)
+if msgpack is not None:
+    CODECS["msgpack"] = Codec("msgpack", MSGPACK_MEDIA_TYPE, lambda obj: msgpack.packb(obj, use_bin_type=True),
+                              lambda data: msgpack.unpackb(data, raw=False, strict_map_key=False))
+
+
+def get_codec(name):
+    """The codec called `name`; raises ValueError if it is unknown or its library is not installed."""
+    try:
+        return CODECS[name]
+    except KeyError:
+        raise ValueError(f"codec '{name}' is not available (available: {', '.join(CODECS)})")
+
+
+JSON = get_codec(os.environ.get("UPISAS_JSON_CODEC") or ("orjson" if "orjson" in CODECS else "json"))
+
+
+def dumps(obj):
+    """`obj` as JSON bytes."""
+    return JSON.dumps(obj)
+
+
+def loads(data):
+    """The document in the JSON bytes or str `data`."""
+    return JSON.loads(data)
+
+
+def media_types():
+    """The media types a document can be encoded in, JSON first."""
+    return [JSON_MEDIA_TYPE] + ([MSGPACK_MEDIA_TYPE] if msgpack is not None else [])
+
+
+def for_media_type(media_type):
+    """The codec for a Content-Type or Accept entry (parameters are ignored); JSON if there is none."""
+    media_type = (media_type or "").split(";")[0].strip().lower()
+    if media_type in (MSGPACK_MEDIA_TYPE, *_MSGPACK_ALIASES):
+        return get_codec("msgpack")
+    return JSON
+
+
+def decode_response(response):
+    """The document in a `requests` response, decoded according to its Content-Type."""
+    return for_media_type(response.headers.get("Content-Type")).loads(response.content)
@@ -0,0 +1,131 @@
+"""
+The services of a docker compose project: image, published ports and dependencies.
+"""
+
+import json
+import logging
+import os
+import re
+import subprocess
+
+_VARIABLE = re.compile(r"\$\{(\w+)(?::?-([^}]*))?\}|\$(\w+)")
+# A published port set by a variable, with its default: "${NAME_PORT:-32838}:58020"
+_PORT_VARIABLE = re.compile(r"\$\{(\w+):-(\d+)\}:\d+")
+
+
+class ComposeService:
+    def __init__(self, name, image=None, ports=None, depends_on=None):
+        self.name = name
+        self.image = image
+        self.ports = ports or []  # [(published host port, container port)]
+        self.depends_on = depends_on or []
+
+    def __repr__(self):
+        return f"ComposeService({self.name!r}, image={self.image!r}, ports={self.ports}, depends_on={self.depends_on})"
+
+
+def load_services(compose_dir, compose_file="docker-compose.yml", environment=None):
+    """
+    The services of the project, in order of appearance, as {name: ComposeService}.
+
+    Asks `docker compose config` (which resolves the file the way `up` does); if the compose
+    CLI is not available, reads the file itself, substituting variables from the environment
+    and the project's .env file. `environment` overrides variables of both, e.g. the ports of
+    one run (see UPISAS.run_isolation).
+    """
+    environment = environment or {}
+    try:
+        result = subprocess.run(["docker", "compose", "-f", compose_file, "config", "--format", "json"],
+                                cwd=compose_dir, check=True, capture_output=True, text=True,
+                                env={**os.environ, **environment})
+        return _services_from_config(json.loads(result.stdout))
+    except (OSError, ValueError, subprocess.CalledProcessError) as e:
+        logging.debug(f"docker compose config failed ({e}), reading {compose_file} directly")
+    variables = _read_env_file(os.path.join(compose_dir, ".env"))
+    variables.update(os.environ)
+    variables.update(environment)
+    with open(os.path.join(compose_dir, compose_file)) as f:
+        return _parse_compose_file(f, variables)
+
+
+def port_variables(compose_dir, compose_file="docker-compose.yml"):
+    """The variables setting published ports in the compose file, as {name: default port}."""
+    with open(os.path.join(compose_dir, compose_file)) as f:
+        return {name: int(default) for name, default in _PORT_VARIABLE.findall(f.read())}
+
+
+def _services_from_config(config):
+    services = {}
+    for name, service in (config.get("services") or {}).items():
+        ports = []
+        for port in service.get("ports") or []:
+            if port.get("published"):
+                ports.append((int(port["published"]), int(port["target"])))
+        depends_on = service.get("depends_on") or []
+        services[name] = ComposeService(name, service.get("image"), ports, list(depends_on))
+    return services
+
+
+def _parse_compose_file(lines, variables):
+    """Read services, images, ports and depends_on from a compose file, using indentation only."""
+    services = {}
+    service = key = None
+    in_services = False
+    service_indent = key_indent = None
+    for raw_line in lines:
+        line = raw_line.split(" #")[0].rstrip()
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        indent = len(line) - len(line.lstrip())
+        text = _substitute(line.strip(), variables)
+        if indent == 0:
+            in_services = text == "services:"
+            continue
+        if not in_services:
+            continue
+        if service_indent is None or indent <= service_indent:
+            service_indent = indent
+            service = ComposeService(text.rstrip(":"))
+            services[service.name] = service
+            key_indent = None
+            continue
+        if key_indent is None or indent <= key_indent:
+            key_indent = indent
+            key, _, value = text.partition(":")
+            value = _unquote(value.strip())
+            if key == "image" and value:
+                service.image = value
+            continue
+        # An entry of the current key: "- item" in a list, or "item:" in a mapping
+        if not (text.startswith("-") or text.endswith(":")):
+            continue
+        item = _unquote(text[1:].strip()) if text.startswith("-") else text.rstrip(":")
+        if key == "ports":
+            published, _, target = item.rpartition(":")
+            try:
+                service.ports.append((int(published.rpartition(":")[2]), int(target.split("/")[0])))
+            except ValueError:
+                pass  # Not published, or a port range
+        elif key == "depends_on" and item not in service.depends_on:
+            service.depends_on.append(item)
+    return services
+
+
+def _read_env_file(path):
+    variables = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                line = line.split(" #")[0].strip()
+                if line and not line.startswith("#") and "=" in line:
+                    name, value = line.split("=", 1)
+                    variables[name.strip()] = value.strip().strip("\"'")
+    return variables
+
+
+def _substitute(value, variables):
+    return _VARIABLE.sub(lambda m: variables.get(m.group(1) or m.group(3)) or m.group(2) or "", value)
+
+
+def _unquote(value):
+    return value.strip("\"'")
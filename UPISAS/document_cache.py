@@ -0,0 +1,61 @@
+import hashlib
+import json
+import logging
+import os
+
+from UPISAS import codec, get_response_for_get_request
+
+DEFAULT_CACHE_DIR = os.environ.get("UPISAS_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "upisas"))
+
+
+class DocumentCache:
+    """
+    A persistent on-disk cache of JSON documents (schemas, adaptation options) served with an ETag.
+
+    Cached documents are revalidated with `If-None-Match`, so an unchanged document costs a
+    single 304 round trip. Documents served without an ETag are never cached.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def _path(self, url):
+        return os.path.join(self.cache_dir, hashlib.sha256(url.encode()).hexdigest() + ".json")
+
+    def _load(self, url):
+        try:
+            with open(self._path(url), "r") as cache_file:
+                return json.load(cache_file)
+        except (OSError, ValueError):
+            return None
+
+    def _store(self, url, etag, document):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._path(url)
+            with open(path + ".tmp", "w") as cache_file:
+                json.dump({"url": url, "etag": etag, "document": document}, cache_file)
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            logging.warning(f"cannot write document cache for {url}: {e}")
+
+    def get(self, url):
+        """
+        GET `url`, using the cached copy if the server confirms it is unchanged.
+
+        Returns the response of the request (so callers can check its status code)
+        and the decoded document.
+        """
+        entry = self._load(url)
+        headers = {"If-None-Match": entry["etag"]} if entry else None
+        response = get_response_for_get_request(url, headers=headers)
+        if response.status_code == 304 and entry:
+            logging.info(f"{url} not modified, using cached copy")
+            return response, entry["document"]
+        if response.status_code >= 400:
+            return response, None
+        document = codec.decode_response(response)
+        etag = response.headers.get("ETag")
+        if etag:
+            self._store(url, etag, document)
+        return response, document
@@ -1,10 +1,8 @@
 import docker
 from abc import ABC, abstractmethod
-from rich.progress import Progress
-from UPISAS import show_progress
 import logging
 from docker.errors import DockerException
-from UPISAS.exceptions import DockerImageNotFoundOnDockerHub
+from UPISAS.image_prefetch import prefetch_images
 
 logging.getLogger().setLevel(logging.INFO)
 
@@ -14,30 +12,21 @@ class Exemplar(ABC):
     A class which encapsulates a self-adaptive exemplar run in a docker container.
     """
     _container_name = ""
+    # Key of the monitored object whose keys must match the monitor schema (None: the object itself)
+    monitor_key_path = None
+    # Number of keys of a monitor response that is not complete yet (None: any non-empty response is)
+    incomplete_monitor_key_count = None
     def __init__(self, base_endpoint: "string with the URL of the exemplar's HTTP server", \
                  docker_kwargs,
                  auto_start: "Whether to immediately start the container after creation" =False,
                  ):
         '''Create an instance of the Exemplar class'''
         self.base_endpoint = base_endpoint
-        image_name = docker_kwargs["image"]
-        image_owner = image_name.split("/")[0]
+        self.image_name = docker_kwargs["image"]
         try:
             docker_client = docker.from_env()
-            try:
-                docker_client.images.get(image_name)
-                logging.info(f"image '{image_name}' found locally")
-            except docker.errors.ImageNotFound:
-                logging.info(f"image '{image_name}' not found locally")
-                images_from_owner = docker_client.images.search(image_owner)
-                if image_name.split(":")[0] in [i["name"] for i in images_from_owner]:
-                    logging.info(f"image '{image_name}' found on DockerHub, pulling it")
-                    with Progress() as progress:
-                        for line in docker_client.api.pull(image_name, stream=True, decode=True):
-                            show_progress(line, progress)
-                else:
-                    logging.error(f"image '{image_name}' not found on DockerHub, exiting!")
-                    raise DockerImageNotFoundOnDockerHub
+            # Raises DockerImageNotFoundOnDockerHub if the image is neither local nor on DockerHub
+            self.prefetch_images(docker_client)
             docker_kwargs["detach"] = True
             self.exemplar_container = docker_client.containers.create(**docker_kwargs)
         except DockerException as e:
@@ -51,6 +40,14 @@ class Exemplar(ABC):
     def start_run(self):
         pass
 
+    def required_images(self):
+        '''The docker images this exemplar runs'''
+        return [self.image_name]
+
+    def prefetch_images(self, docker_client=None):
+        '''Pulls all required images that are not available locally, concurrently'''
+        return prefetch_images(self.required_images(), client=docker_client)
+
     def start_container(self):
         '''Starts running the docker container made from the given image when constructing this class'''
         try:
@@ -0,0 +1,256 @@
+"""
+The demo managed system (demo-managed-system/app.js) served from a thread of the current
+process, so strategies can be developed and tested without a docker daemon.
+"""
+
+import json
+import logging
+import random
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+from UPISAS.exemplar import Exemplar
+
+MONITOR_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "f": {"type": "number"}
+    }
+}
+EXECUTE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "x": {"type": "number"},
+        "y": {"type": "number"}
+    }
+}
+ADAPTATION_OPTIONS = {
+    "x": {"start": -4.0, "stop": 6.0, "type": "continuous"},
+    "y": {"start": -10.0, "stop": 10.0, "type": "continuous"}
+}
+_OPTION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "start": {"type": "number"},
+        "stop": {"type": "number"},
+        "type": {"type": "string"}
+    }
+}
+ADAPTATION_OPTIONS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "x": _OPTION_SCHEMA,
+        "y": _OPTION_SCHEMA
+    }
+}
+
+
+class DemoManagedSystem:
+    """
+    The state of the demo managed system: it is adapted through x and y, and monitored through
+
+        f(x,y) = 0.4+-1*(0.3*(1-x)*x+y*(2-y)*0.3+x*y/100)
+
+    optionally scaled by a random factor in [0, 1), like app.js does.
+    """
+
+    def __init__(self, enable_random=True, seed=None):
+        self.x = 0.0
+        self.y = 0.0
+        self.enable_random = enable_random
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def monitor(self):
+        with self.lock:
+            x, y = self.x, self.y
+            rnd = self.random.random() if self.enable_random else 1
+        return {"f": rnd * (0.4 + -1 * (0.3 * (1 - x) * x + y * (2 - y) * 0.3 + x * y / 100))}
+
+    def execute(self, body):
+        logging.info(f"Got value changes: x:{body.get('x')} - y:{body.get('y')}")
+        with self.lock:
+            # Like app.js, a missing (or zero) value keeps the current one
+            self.x = body.get("x") or self.x
+            self.y = body.get("y") or self.y
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_GET(self):
+        self.server.unpaused.wait()
+        path = urlparse(self.path).path
+        if path == "/":
+            self._reply("alive", content_type="text/html; charset=utf-8")
+            return
+        documents = {
+            "/monitor": self.server.system.monitor,
+            "/monitor_schema": lambda: MONITOR_SCHEMA,
+            "/execute_schema": lambda: EXECUTE_SCHEMA,
+            "/adaptation_options": lambda: ADAPTATION_OPTIONS,
+            "/adaptation_options_schema": lambda: ADAPTATION_OPTIONS_SCHEMA,
+        }
+        if self.server.with_endpoints and path in documents:
+            self._reply(json.dumps(documents[path]()))
+        else:
+            self._not_found()
+
+    def do_PUT(self):
+        self.server.unpaused.wait()
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length) if length else b""
+        if not self.server.with_endpoints or urlparse(self.path).path != "/execute":
+            self._not_found()
+            return
+        try:
+            adaptation = json.loads(body) if body else {}
+        except ValueError:
+            adaptation = {}
+        if isinstance(adaptation, dict):
+            self.server.system.execute(adaptation)
+        self._reply("ok", content_type="text/html; charset=utf-8")
+
+    # Strategy.execute posts its adaptations
+    do_POST = do_PUT
+
+    def _not_found(self):
+        self._reply(f"Cannot {self.command} {urlparse(self.path).path}", status=404,
+                    content_type="text/html; charset=utf-8")
+
+    def _reply(self, text, status=200, content_type="application/json"):
+        body = text if isinstance(text, bytes) else text.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class InProcessDemoExemplar(Exemplar):
+    """
+    A drop-in replacement for DemoExemplar that serves the demo managed system from a thread
+    instead of a docker container.
+
+    The "container" is an HTTP server bound to `port` (an ephemeral one by default, see
+    `base_endpoint`). Like the container, it refuses connections until `start_run` starts
+    one of the apps: "app.js" serves all endpoints, "app-no-endpoints.js" only `/`.
+    Pausing it holds requests until it is unpaused.
+    """
+
+    handler_class = _Handler
+    thread_name = "upisas-demo"
+
+    def __init__(self, auto_start=False, host="127.0.0.1", port=0, enable_random=True, seed=None):
+        self.system = DemoManagedSystem(enable_random=enable_random, seed=seed)
+        self._serve(host, port, auto_start)
+
+    def _serve(self, host, port, auto_start):
+        self._host = host
+        self._status = None
+        self._thread = None
+        self.exemplar_container = None
+        self._create_server(port)
+        self.base_endpoint = f"http://{host}:{self.exemplar_container.server_address[1]}"
+        if auto_start:
+            self.start_container()
+
+    def _create_server(self, port):
+        # Bound now, so the port is known, but only listening once an app is started
+        server = ThreadingHTTPServer((self._host, port), self.handler_class, bind_and_activate=False)
+        server.allow_reuse_address = True
+        server.daemon_threads = True
+        server.server_bind()
+        server.system = self.system
+        server.with_endpoints = True
+        server.unpaused = threading.Event()
+        server.unpaused.set()
+        self.exemplar_container = server
+        self._status = "created"
+
+    def start_run(self, app="app.js"):
+        if self.get_container_status() != "running":
+            logging.error("cannot start the app since the container is not running")
+            return False
+        if self._thread is not None:
+            logging.warning("app already running...")
+            return True
+        self.exemplar_container.with_endpoints = app != "app-no-endpoints.js"
+        self.exemplar_container.server_activate()
+        # A short poll interval keeps stop_container (and so test teardown) fast
+        self._thread = threading.Thread(target=self.exemplar_container.serve_forever, args=(0.02,),
+                                        name=self.thread_name, daemon=True)
+        self._thread.start()
+        logging.info(f"{self.thread_name} running on {self.base_endpoint}")
+        return True
+
+    def start_container(self):
+        container_status = self.get_container_status()
+        if container_status == "running":
+            logging.warning("container already running...")
+        else:
+            logging.info("starting container...")
+            if container_status == "exited":
+                self._create_server(self.exemplar_container.server_address[1])
+            self._status = "running"
+        return True
+
+    def stop_container(self, remove=True):
+        container_status = self.get_container_status()
+        if container_status == "removed":
+            logging.warning("cannot stop container")
+            return None
+        if container_status == "exited":
+            logging.warning("container already stopped...")
+        else:
+            logging.info("stopping container...")
+            self.exemplar_container.unpaused.set()
+            if self._thread is not None:
+                self.exemplar_container.shutdown()
+                self._thread.join()
+                self._thread = None
+            self.exemplar_container.server_close()
+            self._status = "exited"
+        if remove:
+            self.exemplar_container = None
+        return True
+
+    def pause_container(self):
+        container_status = self.get_container_status()
+        if container_status == "running":
+            logging.info("pausing container...")
+            self.exemplar_container.unpaused.clear()
+            self._status = "paused"
+            return True
+        elif container_status == "paused":
+            logging.warning("container already paused...")
+            return True
+        logging.warning("cannot pause container since it's not running")
+        return False
+
+    def unpause_container(self):
+        container_status = self.get_container_status()
+        if container_status == "paused":
+            logging.info("unpausing container...")
+            self.exemplar_container.unpaused.set()
+            self._status = "running"
+            return True
+        elif container_status == "running":
+            logging.warning("container already running (why unpause it?)...")
+            return True
+        logging.warning("cannot unpause container since it's not paused")
+        return False
+
+    def get_container_status(self):
+        if self.exemplar_container:
+            return self._status
+        return "removed"
@@ -1,5 +1,12 @@
 import pprint, time
 from UPISAS.exemplar import Exemplar
+from UPISAS.image_prefetch import compose_images
+from UPISAS.compose import load_services, port_variables
+from UPISAS.readiness import ReadinessProbe, StackReadiness
+from UPISAS.exceptions import ServerNotReachable
+from UPISAS.http_pool import get_session
+from UPISAS.run_isolation import allocate_run_slot
+from requests.exceptions import RequestException
 import logging
 import os
 import subprocess
@@ -14,55 +21,273 @@ class RAMSES(Exemplar):
     A class which encapsulates a self-adaptive exemplar run in a docker container.
     """
     _container_name = ""
-    def __init__(self, auto_start=True, container_name = "ramses"
+    # The monitor schema describes a single service of the monitored data
+    monitor_key_path = "CONFIG-SERVER"
+    # Until the other services have registered, only one is monitored
+    incomplete_monitor_key_count = 1
+    # Seconds to wait for the compose stack, and for the interface, to be up
+    stack_max_wait = 300
+    interface_max_wait = 60
+    # Seconds the health check between runs may take before the stack is restarted
+    health_check_max_wait = 10
+    # How start_run serves the interface: "flask" (development server) or "gunicorn" (gevent
+    # workers, see ramses/Interface/gunicorn.conf.py; needs `pip install gunicorn gevent`)
+    interface_server = "flask"
+    # Port of the interface, and URLs of the RAMSES services it talks to (see ramses/Interface/api.py)
+    interface_port = 41248
+    interface_upstreams = {
+        "RAMSES_PROBE_URL": "http://localhost:32838",
+        "RAMSES_INSTANCES_MANAGER_URL": "http://localhost:32839",
+        "RAMSES_LOAD_BALANCER_URL": "http://localhost:32780",
+        "RAMSES_KNOWLEDGE_URL": "http://127.0.0.1:32841",
+    }
+    def __init__(self, auto_start=True, container_name = "ramses", run_slot=None
                  ):
-        self.base_endpoint = "http://127.0.0.1:41248"
+        # With a run slot (see allocate_run_slot), the stack and the interface use its compose
+        # project and ports, so that several runs can share the host
+        self.run_slot = run_slot
         self.ramses_path = os.path.join(os.path.dirname(__file__), "..", "ramses")
+        self.base_endpoint = f"http://127.0.0.1:{self.port(self.interface_port)}"
+        self.interface_process = None
+        self.running_interface_server = None  # Server of the interface started by start_run
+        # Instances and load balancer weights of every service, restored between runs (see reset)
+        self.baseline = None
         
         if auto_start:
             self.start_container()
     
-    def start_run(self): 
+    @classmethod
+    def allocate_run_slot(cls, **kwargs):
+        '''A run slot whose interface and stack ports are all free (see UPISAS.run_isolation)'''
+        ramses_path = os.path.join(os.path.dirname(__file__), "..", "ramses")
+        ports = [cls.interface_port, *port_variables(ramses_path).values()]
+        return allocate_run_slot("ramses", ports=ports, **kwargs)
+
+    def port(self, base_port):
+        '''The port of this run standing for `base_port`'''
+        return self.run_slot.port(base_port) if self.run_slot is not None else base_port
+
+    def compose_environment(self):
+        '''The variables giving the compose stack the container names and published ports of this run'''
+        if self.run_slot is None:
+            return {}
+        environment = {name: str(self.run_slot.port(port)) for name, port in port_variables(self.ramses_path).items()}
+        environment["RAMSES_CONTAINER_PREFIX"] = f"{self.run_slot.project_name}-" if self.run_slot.index else ""
+        return environment
+
+    def interface_environment(self):
+        '''The environment of the interface, pointing it at the RAMSES services of this run'''
+        environment = dict(os.environ)
+        if self.run_slot is not None:
+            environment.update({name: self.run_slot.url(url) for name, url in self.interface_upstreams.items()})
+        return environment
+
+    def start_run(self, wait_ready=True, server=None): 
         # to start the api from RAMES interface
-        try:
-            interface_path =  os.path.join(self.ramses_path, "Interface")
-            subprocess.Popen(
-                [
+        server = server or self.interface_server
+        port = self.port(self.interface_port)
+        if server == "gunicorn":
+            command = ['python', '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'0.0.0.0:{port}', 'api:app']
+        elif server == "flask":
+            command = [
                 'python', '-m', 'flask',
                 '--app', 'api',
                 'run',
                 '--host=0.0.0.0',
-                '--port=41248'
-                ],
+                f'--port={port}'
+                ]
+        else:
+            raise ValueError(f"unknown interface server '{server}'")
+        try:
+            interface_path =  os.path.join(self.ramses_path, "Interface")
+            self.interface_process = subprocess.Popen(
+                command,
                 # ['python', 'api.py'],
                 # ['python', '-m', 'flask', '--app', 'api', 'run', '--host=0.0.0.0', '--port=41248']
-                cwd=interface_path
+                cwd=interface_path,
+                env=self.interface_environment()
             )
-            logging.info("API started successfully")
+            self.running_interface_server = server
+            logging.info(f"API started successfully ({server})")
         except subprocess.CalledProcessError as e:
             logging.error(f"Failed to start API: {e}")
             raise
+        if wait_ready:
+            # Returns as soon as the interface answers (any route, even a 404, will do)
+            ReadinessProbe(self.base_endpoint, initial_delay=0.1, max_delay=1.0).wait_until_ready(self.interface_max_wait)
     
-    def start_container(self):
+    def stop_interface(self):
+        '''Stops the interface started by start_run'''
+        if self.interface_process is not None:
+            self.interface_process.terminate()
+            try:
+                self.interface_process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.interface_process.kill()
+                self.interface_process.wait()
+            self.interface_process = None
+            logging.info("API stopped")
+
+    def capture_baseline(self):
+        '''Remembers the instances and load balancer weights of every service, to reset the stack to'''
+        self.baseline = ramses_baseline(self._get_monitor_document())
+        logging.info(f"baseline captured for {len(self.baseline)} services")
+
+    def reset(self):
+        '''
+        Brings the running stack back to the baseline for the next run, without restarting it:
+        removes the instances added since, restores the load balancer weights and stops the
+        interface (start_run starts a fresh one). If the interface does not answer or the reset
+        through it fails, only the interface is restarted and the reset retried. The stack is
+        restarted if it fails its health check, or if it cannot be reset (no baseline, or a
+        service or instance of the baseline is gone); the baseline has to be captured again then.
+
+        Returns True if the stack was reset, False if it was restarted.
+        '''
+        if self._stack_healthy() and self._reset_in_place():
+            self.stop_interface()
+            return True
+        logging.warning("cannot reset the stack to its baseline, restarting it")
+        self.stop_container()
+        self.baseline = None
+        self.start_container()
+        return False
+
+    def _stack_healthy(self):
         try:
-            subprocess.run(
-                ['docker', 'compose', 'up', '-d'],
-                cwd=self.ramses_path,
-                check=True
-            )
+            self.wait_until_ready(max_wait=self.health_check_max_wait)
+        except ServerNotReachable:
+            logging.warning("the stack failed its health check")
+            return False
+        return True
+
+    def _reset_in_place(self):
+        if self.baseline is None:
+            logging.warning("no baseline captured")
+            return False
+        reset = self._reset_to_baseline()
+        if reset is False:
+            logging.warning("restarting the interface to retry the reset")
+            self.stop_interface()
+            try:
+                self.start_run(server=self.running_interface_server)
+            except ServerNotReachable:
+                logging.warning("the restarted interface does not answer")
+                return False
+            reset = self._reset_to_baseline()
+        return bool(reset)
+
+    def _reset_to_baseline(self):
+        '''
+        Sends the reset requests through the interface: True once they are done, False if the
+        interface failed, None if the stack cannot be reset that way.
+        '''
+        try:
+            reset_requests = ramses_reset_requests(self.baseline, self._get_monitor_document())
+            if reset_requests is None:
+                logging.warning("a service or instance of the baseline is gone")
+                return None
+            # The interface runs the requests on one service in order, so the weights of a
+            # service are only restored once the instances they no longer cover are gone
+            if reset_requests:
+                failed = [result for result in self._execute_batch(reset_requests) if result["status"] >= 400]
+                if failed:
+                    logging.warning(f"reset requests failed: {failed}")
+                    return False
+        except (ServerNotReachable, RequestException) as e:
+            logging.warning(f"reset through the interface failed: {e!r}")
+            return False
+        logging.info(f"stack reset to baseline with {len(reset_requests)} request(s)")
+        return True
+
+    def _execute_batch(self, execute_requests):
+        '''The results of posting `execute_requests` to the interface's /execute_batch'''
+        response = get_session().post(self.base_endpoint + "/execute_batch", json=execute_requests)
+        response.raise_for_status()
+        return response.json()["results"]
+
+    def _get_monitor_document(self):
+        '''The current monitor document, once every service has registered'''
+        deadline = time.monotonic() + self.interface_max_wait
+        while True:
+            response = get_session().get(self.base_endpoint + "/monitor", params={"max_staleness": 0})
+            document = response.json() if response.status_code == 200 else {}
+            if document and len(document) != self.incomplete_monitor_key_count:
+                return document
+            if time.monotonic() > deadline:
+                raise ServerNotReachable
+            time.sleep(1)
+
+    def required_images(self):
+        return compose_images(self.ramses_path)
+
+    def wait_until_ready(self, services=None, max_wait=None):
+        '''Blocks until the services of the compose stack (all by default) answer on their published ports'''
+        max_wait = self.stack_max_wait if max_wait is None else max_wait
+        services_by_name = load_services(self.ramses_path, environment=self.compose_environment())
+        StackReadiness(services_by_name).wait_until_ready(max_wait, services)
+
+    def start_container(self, wait_ready=True):
+        # Pull the missing images concurrently, instead of one after the other in `docker compose up`
+        self.prefetch_images()
+        try:
+            self._compose('up', '-d')
             logging.info("Docker Compose services started successfully")
         except subprocess.CalledProcessError as e:
             logging.error(f"Failed to start Docker Compose: {e}")
             raise
+        if wait_ready:
+            self.wait_until_ready()
     
     def stop_container(self):
+        self.stop_interface()
         try:
-            subprocess.run(
-                ['docker', 'compose', 'down'],
-                cwd=self.ramses_path,
-                check=True
-            )
+            self._compose('down')
             logging.info("Docker Compose services shut down successfully")
         except subprocess.CalledProcessError as e:
             logging.error(f"Failed to close Docker Compose: {e}")
-            raise
\ No newline at end of file
+            raise
+
+    def _compose(self, *args):
+        project = ['-p', self.run_slot.project_name] if self.run_slot is not None else []
+        subprocess.run(['docker', 'compose', *project, *args], cwd=self.ramses_path, check=True,
+                       env={**os.environ, **self.compose_environment()})
+
+def ramses_baseline(monitored_data):
+    """{service: {"instances": [...], "weights": {instance: weight}}} from a RAMSES monitor document."""
+    baseline = {}
+    for service_name, service_data in monitored_data.items():
+        instance_config = service_data.get("instanceConfig") or {}
+        baseline[service_name] = {
+            "instances": list(service_data.get("instances") or []),
+            "weights": dict(instance_config.get("loadBalancerWeights") or {})
+        }
+    return baseline
+
+
+def ramses_reset_requests(baseline, monitored_data):
+    """
+    The execute requests bringing the stack described by `monitored_data` back to `baseline`:
+    a removeInstance for every instance added since, and a changeLBWeights for every service
+    whose weights changed. None if it cannot be done that way, i.e. a service or an instance
+    of the baseline is gone.
+    """
+    requests = []
+    for service_name, service_baseline in baseline.items():
+        service_data = monitored_data.get(service_name)
+        if service_data is None:
+            return None
+        instances = list(service_data.get("instances") or [])
+        if set(service_baseline["instances"]) - set(instances):
+            return None
+        added = [instance for instance in instances if instance not in service_baseline["instances"]]
+        for instance in added:
+            implementation, _, location = instance.partition("@")
+            address, _, port = location.rpartition(":")
+            requests.append({"operation": "removeInstance", "serviceImplementationName": implementation,
+                             "address": address, "port": int(port)})
+        weights = (service_data.get("instanceConfig") or {}).get("loadBalancerWeights") or {}
+        if service_baseline["weights"] and (added or weights != service_baseline["weights"]):
+            requests.append({"operation": "changeLBWeights", "weightsId": service_name,
+                             "weights": service_baseline["weights"], "instancesToRemoveWeightOf": added})
+    return requests
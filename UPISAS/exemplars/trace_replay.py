@@ -0,0 +1,235 @@
+"""
+An exemplar replaying a run log (see UPISAS.run_log) recorded during a real run, so that a
+strategy can be evaluated offline against hours of recorded monitoring in seconds, without
+docker or the managed system.
+
+Every GET /monitor serves the next recorded monitor tick, as fast as the strategy asks for
+them; with `speed`, it serves the tick the recording had reached at that point instead, `speed`
+times faster than it was recorded. Adaptations posted to /execute and /execute_batch are not
+applied to anything: they are kept, with the tick they were posted at, to be compared with the
+ones the recorded run executed.
+"""
+
+import logging
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+import numpy as np
+
+from UPISAS import codec
+from UPISAS.exemplars.in_process_demo import InProcessDemoExemplar, _Handler
+from UPISAS.run_log import RunLog, KINDS, MONITOR, EXECUTE
+
+RAMSES_SPECIFICATIONS = os.path.join(os.path.dirname(__file__), "..", "ramses", "Interface", "specifications")
+# Documents served by the RAMSES interface, and their files under RAMSES_SPECIFICATIONS
+_RAMSES_DOCUMENT_FILES = {
+    "monitor_schema": "monitor_schema.json",
+    "adaptation_options": "adaptation_options.json",
+    "adaptation_options_schema": "adaptation_schema.json",
+    "execute_schema": "adaptation_schema.json",
+}
+
+
+def ramses_documents(specifications=RAMSES_SPECIFICATIONS):
+    """The schemas and adaptation options of the RAMSES interface, by endpoint."""
+    documents = {}
+    for endpoint, file_name in _RAMSES_DOCUMENT_FILES.items():
+        with open(os.path.join(specifications, file_name), "rb") as document_file:
+            documents[endpoint] = codec.loads(document_file.read())
+    return documents
+
+
+class ReplayedTrace:
+    """
+    The monitor ticks of a run log, served in order, and the adaptations executed while
+    replaying them.
+
+    `tick` is the tick served last (-1 before the first); `seek` and `seek_time` choose the
+    next one. Once the last tick has been served, it is served again for every later request.
+    """
+
+    def __init__(self, log, speed=None, clock=time.monotonic):
+        self.log = log
+        self.speed = speed
+        self.clock = clock
+        # Record number and time of every monitor tick
+        self.records = np.flatnonzero(log.index["kind"] == KINDS.index(MONITOR))
+        self.times = log.index["time"][self.records]
+        self.tick = -1
+        self.executed = []  # Dicts with the tick, its recorded time and the posted request
+        self.lock = threading.Lock()
+        self._next = 0
+        self._origin = None  # (clock, recorded time) the paced replay started from
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def finished(self):
+        """Whether the last tick has been served."""
+        return self.tick >= len(self.records) - 1
+
+    def seek(self, tick):
+        """Serve `tick` next (and, when paced, replay from there)."""
+        with self.lock:
+            self._next = min(max(tick, 0), len(self.records))
+            self.tick = self._next - 1
+            self._origin = None
+
+    def seek_time(self, timestamp):
+        """Serve the first tick recorded at or after `timestamp` next."""
+        self.seek(int(np.searchsorted(self.times, timestamp, side="left")))
+
+    def monitor(self):
+        """The JSON bytes of the next tick, or None if the trace has no monitor ticks."""
+        with self.lock:
+            if not len(self.records):
+                return None
+            tick = min(self._next, len(self.records) - 1)
+            if self.speed:
+                if self._origin is None:
+                    self._origin = (self.clock(), self.times[tick])
+                started, recorded = self._origin
+                reached = recorded + (self.clock() - started) * self.speed
+                tick = max(tick, min(int(np.searchsorted(self.times, reached, side="right")) - 1,
+                                     len(self.records) - 1))
+                self._next = tick
+            else:
+                self._next = tick + 1
+            self.tick = tick
+        return self.log.payload(int(self.records[tick]))
+
+    def execute(self, request):
+        with self.lock:
+            tick = self.tick
+            self.executed.append({"tick": tick, "time": float(self.times[tick]) if tick >= 0 else None,
+                                  "request": request})
+        logging.info(f"[Replay]\ttick {tick}: got adaptation {request}")
+
+    def recorded_executions(self):
+        """
+        The requests of the plans the recorded run executed, in the form of `executed`, with the
+        tick each one followed.
+        """
+        executions = []
+        for record in np.flatnonzero(self.log.index["kind"] == KINDS.index(EXECUTE)):
+            tick = int(np.searchsorted(self.records, record)) - 1
+            adaptation = self.log.document(int(record))
+            for request in adaptation.get("requests", []) if isinstance(adaptation, dict) else []:
+                executions.append({"tick": tick, "time": float(self.times[tick]) if tick >= 0 else None,
+                                   "request": request})
+        return executions
+
+
+class _ReplayHandler(_Handler):
+
+    def do_GET(self):
+        self.server.unpaused.wait()
+        path = urlparse(self.path).path
+        if path == "/":
+            self._reply("alive", content_type="text/html; charset=utf-8")
+            return
+        if not self.server.with_endpoints:
+            self._not_found()
+        elif path == "/monitor":
+            payload = self.server.system.monitor()
+            self._reply(payload if payload is not None else b"{}")
+        elif path.lstrip("/") in self.server.documents:
+            self._reply(codec.dumps(self.server.documents[path.lstrip("/")]))
+        else:
+            self._not_found()
+
+    def do_POST(self):
+        self.server.unpaused.wait()
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length) if length else b""
+        path = urlparse(self.path).path
+        if not self.server.with_endpoints or path not in ("/execute", "/execute_batch"):
+            self._not_found()
+            return
+        try:
+            adaptation = codec.for_media_type(self.headers.get("Content-Type")).loads(body) if body else {}
+        except ValueError:
+            self._reply(codec.dumps({"error": "Invalid JSON body"}), status=400)
+            return
+        if path == "/execute":
+            self.server.system.execute(adaptation)
+            self._reply(codec.dumps({"replayed": True}))
+            return
+        results = []
+        for request in adaptation if isinstance(adaptation, list) else [adaptation]:
+            self.server.system.execute(request)
+            results.append({"status": 200, "response": {"replayed": True}, "merged": False})
+        self._reply(codec.dumps({"results": results}))
+
+    do_PUT = do_POST
+
+
+class TraceReplayExemplar(InProcessDemoExemplar):
+    """
+    Serves the run log in `trace_dir` (e.g. `<run_dir>/run_log`) as a managed system, from a
+    thread of the current process; see the module documentation. The container lifecycle is the
+    one of InProcessDemoExemplar.
+
+    `documents` are the other documents it serves, by endpoint (e.g. "monitor_schema", see
+    ramses_documents); the recorded executions and the ones of the replay are available from
+    `trace` (see ReplayedTrace).
+    """
+    handler_class = _ReplayHandler
+    thread_name = "upisas-trace-replay"
+
+    def __init__(self, trace_dir, auto_start=False, host="127.0.0.1", port=0, speed=None, documents=None,
+                 start_tick=0):
+        self.trace = self.system = ReplayedTrace(RunLog(trace_dir), speed=speed)
+        self.trace.seek(start_tick)
+        self.documents = documents or {}
+        self._serve(host, port, auto_start)
+
+    @classmethod
+    def for_ramses(cls, trace_dir, **kwargs):
+        """A replay of a RAMSES run, serving the documents of the RAMSES interface."""
+        from UPISAS.exemplars.ramses import RAMSES
+        exemplar = cls(trace_dir, documents=kwargs.pop("documents", None) or ramses_documents(), **kwargs)
+        exemplar.monitor_key_path = RAMSES.monitor_key_path
+        exemplar.incomplete_monitor_key_count = RAMSES.incomplete_monitor_key_count
+        return exemplar
+
+    def _create_server(self, port):
+        super()._create_server(port)
+        self.exemplar_container.documents = self.documents
+
+    @property
+    def finished(self):
+        return self.trace.finished
+
+    def stop_container(self, remove=True):
+        stopped = super().stop_container(remove)
+        if stopped and remove:
+            self.trace.log.close()
+        return stopped
+
+
+def replay(strategy, ticks=None, with_validation=True):
+    """
+    Run `strategy` (whose exemplar is a TraceReplayExemplar) through the trace as fast as it goes,
+    one MAPE-K iteration per tick, until the trace (or `ticks` ticks) is finished. Returns the
+    adaptations it executed, see ReplayedTrace.executed.
+
+    The strategy sees the QoS values of the recorded run, not newly injected ones (see
+    Strategy.inject_qos), so replays of a trace are reproducible.
+    """
+    exemplar = strategy.exemplar
+    inject_qos, strategy.inject_qos = strategy.inject_qos, False
+    count = 0
+    try:
+        while not exemplar.finished and (ticks is None or count < ticks):
+            strategy.monitor(with_validation=with_validation)
+            if strategy.analyze():
+                if strategy.plan():
+                    strategy.execute()
+            count += 1
+    finally:
+        strategy.inject_qos = inject_qos
+    return exemplar.trace.executed
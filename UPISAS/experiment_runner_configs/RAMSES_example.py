@@ -10,10 +10,13 @@ from ProgressManager.Output.OutputProcedure import OutputProcedure as output
 from typing import Dict, Optional
 from pathlib import Path
 from os.path import dirname, realpath
-import time
 
 from UPISAS.strategies.ramses_reactive_strategy import ReactiveAdaptationManager
 from UPISAS.exemplars.ramses import RAMSES
+from UPISAS.mape_loop import MapeKLoop
+from UPISAS.metrics import ramses_columns
+from UPISAS.instrumentation import REGISTRY
+from UPISAS.run_log import RunRecorder
 
 
 class RunnerConfig:
@@ -32,6 +35,25 @@ class RunnerConfig:
     """Cooldown period between runs (in milliseconds)."""
     time_between_runs_in_ms: int = 1000
 
+    """Duration of the interaction loop and period of its MAPE-K ticks (in seconds)."""
+    interaction_duration_in_s: float = 10
+    tick_period_in_s: float = 3
+
+    """Whether to fetch monitoring data for the next tick while the current one is analyzed, planned and executed."""
+    overlap_monitor: bool = True
+
+    """Whether the strategy keeps monitored data in compact form (see UPISAS.snapshot_model) instead of the raw JSON."""
+    compact_monitor_data: bool = False
+
+    """Whether to keep the compose stack running across runs, resetting it in between to its state at the first run.
+    The stack is then only restarted if it fails its health check; when False, it is started and shut down for every run."""
+    reuse_stack: bool = True
+
+    """Whether to run the stack and the interface under a compose project and ports no other experiment on the host uses
+    (see UPISAS.run_isolation), so that several experiments (e.g. on different rows of the run table) can run at once."""
+    isolate_runs: bool = True
+
+    run_slot = None
     exemplar = None
     strategy = None
 
@@ -67,47 +89,55 @@ class RunnerConfig:
 
     def before_run(self) -> None:
         """Prepare the system before starting a run."""
-        self.exemplar = RAMSES(auto_start=True)
+        if self.reuse_stack and self.exemplar is not None:
+            self.exemplar.reset()  # Back to the baseline, or restarted if that fails
+        else:
+            if self.isolate_runs and self.run_slot is None:
+                self.run_slot = RAMSES.allocate_run_slot()  # Held until the end of the experiment
+            self.exemplar = RAMSES(auto_start=True, run_slot=self.run_slot)  # Returns once the compose stack is up
         self.strategy = ReactiveAdaptationManager(self.exemplar)
-        time.sleep(30)  # Allow the exemplar to initialize
+        self.strategy.compact_monitor_data = self.compact_monitor_data
         output.console_log("Config.before_run() called!")
 
     def start_run(self, context: RunnerContext) -> None:
         """Initialize parameters and start the target system for measurement."""
         self.strategy.failure_rate_threshold = float(context.run_variation['failure_threshold'])
-        self.exemplar.start_run()
-        time.sleep(3)  # Allow time for stabilization
+        self.exemplar.start_run()  # Returns once the interface answers
+        if self.reuse_stack and self.exemplar.baseline is None:
+            self.exemplar.capture_baseline()
         output.console_log("Config.start_run() called!")
 
     def start_measurement(self, context: RunnerContext) -> None:
         """Start performance measurement."""
+        REGISTRY.reset()  # Phase and HTTP latencies are measured per run
+        # Every monitor tick, analysis and executed plan of the run, readable with UPISAS.run_log.RunLog
+        self.strategy.recorder = RunRecorder(context.run_dir / "run_log")
         output.console_log("Config.start_measurement() called!")
 
     def interact(self, context: RunnerContext) -> None:
         """Interact with the system during the experiment."""
-        time_slept = 0
         self.strategy.get_monitor_schema()
         self.strategy.get_adaptation_options_schema()
         self.strategy.get_execute_schema()
 
-        while time_slept < 10:  # Example duration for interaction loop
-            self.strategy.monitor(verbose=True)
-            if self.strategy.analyze():
-                if self.strategy.plan():
-                    self.strategy.execute()
-
-            time.sleep(3)
-            time_slept += 3
+        mape_loop = MapeKLoop(self.strategy, tick_period=self.tick_period_in_s,
+                              overlap=self.overlap_monitor, verbose=True)
+        mape_loop.run_for(duration=self.interaction_duration_in_s)
 
         output.console_log("Config.interact() called!")
 
     def stop_measurement(self, context: RunnerContext) -> None:
         """Stop measurements after the interaction phase."""
+        # Strategy-side latencies (strategy_metrics.prom/.json); the interface serves its own on /metrics
+        REGISTRY.write(context.run_dir, "strategy_metrics")
+        self.strategy.recorder.close()
+        self.strategy.recorder = None
         output.console_log("Config.stop_measurement() called!")
 
     def stop_run(self, context: RunnerContext) -> None:
         """Stop the system and clean up resources after a run."""
-        self.exemplar.stop_container()
+        if not self.reuse_stack:
+            self.exemplar.stop_container()
         output.console_log("Config.stop_run() called!")
 
     def populate_run_data(self, context: RunnerContext) -> Optional[Dict[str, SupportsStr]]:
@@ -115,30 +145,25 @@ class RunnerConfig:
         output.console_log("Config.populate_run_data() called!")
 
         monitored_data = self.strategy.knowledge.monitored_data
-        utilities = []
-        failure_rates = []
 
         print("MONITORED DATA:")
         print(monitored_data)
 
-        for service_id, service_data in monitored_data.items():
-            snapshots = service_data.get("snapshot", [])
-            for snapshot in snapshots:
-                qos = snapshot.get("qos", {})
-                failure_rate = qos.get("failureRate", 0)
-                utility = qos.get("utility", 0)
-
-                utilities.append(utility)
-                failure_rates.append(failure_rate)
+        columns = ramses_columns(monitored_data, defaults={"failureRate": 0, "utility": 0})
 
         # Populate the run table with calculated metrics
         return {
-            "utility": utilities,
-            "failure_rate": failure_rates
+            "utility": columns["utility"].tolist(),
+            "failure_rate": columns["failureRate"].tolist()
         }
 
     def after_experiment(self) -> None:
         """Finalize the experiment and perform post-experiment activities."""
+        if self.reuse_stack and self.exemplar is not None:
+            self.exemplar.stop_container()
+        if self.run_slot is not None:
+            self.run_slot.release()
+            self.run_slot = None
         output.console_log("Config.after_experiment() called!")
 
     # ================================ DO NOT ALTER BELOW THIS LINE ================================
@@ -15,6 +15,9 @@ import statistics
 
 from UPISAS.strategies.swim_reactive_strategy import ReactiveAdaptationManager
 from UPISAS.exemplars.swim import SWIM
+from UPISAS.metrics import swim_utility
+from UPISAS.instrumentation import REGISTRY
+from UPISAS.run_log import RunRecorder
 
 
 
@@ -97,6 +100,9 @@ class RunnerConfig:
 
     def start_measurement(self, context: RunnerContext) -> None:
         """Perform any activity required for starting measurements."""
+        REGISTRY.reset()  # Phase and HTTP latencies are measured per run
+        # Every monitor tick, analysis and executed plan of the run, readable with UPISAS.run_log.RunLog
+        self.strategy.recorder = RunRecorder(context.run_dir / "run_log")
         output.console_log("Config.start_measurement() called!")
 
     def interact(self, context: RunnerContext) -> None:
@@ -123,7 +129,9 @@ class RunnerConfig:
 
     def stop_measurement(self, context: RunnerContext) -> None:
         """Perform any activity here required for stopping measurements."""
-
+        REGISTRY.write(context.run_dir, "strategy_metrics")
+        self.strategy.recorder.close()
+        self.strategy.recorder = None
         output.console_log("Config.stop_measurement called!")
 
     def stop_run(self, context: RunnerContext) -> None:
@@ -139,38 +147,11 @@ class RunnerConfig:
 
         output.console_log("Config.populate_run_data() called!")
 
-        basicRevenue = 1
-        optRevenue = 1.5
-        serverCost = 10
-        
-        precision = 1e-5
         mon_data = self.strategy.knowledge.monitored_data
-        utilities = []
         print("MON DATA")
         print(mon_data)
-        for i in range(len(mon_data["max_servers"])):
-
-            maxServers = int(mon_data["max_servers"][i])
-            arrivalRateMean = mon_data["arrival_rate"][i]
-            dimmer = mon_data["dimmer_factor"][i]
-            maxThroughput = maxServers * self.strategy.MAX_SERVICE_RATE
-            avgServers = mon_data["servers"][i]
-            avgResponseTime = (mon_data["basic_rt"][i] * mon_data["basic_throughput"][i] + mon_data["opt_rt"][i] * mon_data["opt_throughput"][i]) / (mon_data["basic_throughput"][i] + mon_data["opt_throughput"][i])
-
-            Ur = (arrivalRateMean * ((1 - dimmer) * basicRevenue + dimmer * optRevenue))
-            Uc = serverCost * (maxServers - avgServers)
-            UrOpt = arrivalRateMean * optRevenue
-            utility = 0
-
-            if(avgResponseTime <= self.strategy.RT_THRESHOLD and Ur >= UrOpt - precision):
-                utility = Ur + Uc
-            else:                
-                if(avgResponseTime <= self.strategy.RT_THRESHOLD):
-                    utility = Ur
-                else:
-                    utility = min(0.0, arrivalRateMean - maxThroughput) * optRevenue
-            utilities.append(utility)
-        
+        utilities = swim_utility(mon_data, self.strategy.RT_THRESHOLD, self.strategy.MAX_SERVICE_RATE).tolist()
+
         return {"utility" : utilities}
 
     def after_experiment(self) -> None:
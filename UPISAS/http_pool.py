@@ -0,0 +1,83 @@
+import threading
+import logging
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from UPISAS.instrumentation import REGISTRY
+
+# (connect, read) timeout in seconds applied to every request that does not pass its own.
+DEFAULT_TIMEOUT = (3.05, 30)
+# Number of per-host pools kept alive, and number of keep-alive connections in each of them.
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
+
+_session = None
+_session_kwargs = {}
+_session_lock = threading.Lock()
+
+
+class PooledSession(requests.Session):
+    """
+    A requests.Session which keeps connections alive and applies a default timeout.
+
+    `host_pool_sizes` maps URL prefixes (e.g. "http://localhost:32838") to the
+    size of the connection pool used for that host, for hosts that are hit harder
+    than the others.
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, pool_connections=DEFAULT_POOL_CONNECTIONS,
+                 pool_maxsize=DEFAULT_POOL_MAXSIZE, host_pool_sizes=None, max_retries=0):
+        super().__init__()
+        self.timeout = timeout
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                              max_retries=max_retries)
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+        for prefix, pool_size in (host_pool_sizes or {}).items():
+            self.mount(prefix, HTTPAdapter(pool_connections=1, pool_maxsize=pool_size,
+                                           max_retries=max_retries))
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        endpoint = urlsplit(url).path or "/"
+        try:
+            with REGISTRY.timer("upisas_http_request_seconds", method=method, endpoint=endpoint):
+                response = super().request(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            REGISTRY.counter("upisas_http_errors_total", method=method, endpoint=endpoint).inc()
+            raise
+        if response.status_code >= 500:
+            REGISTRY.counter("upisas_http_errors_total", method=method, endpoint=endpoint).inc()
+        return response
+
+
+def configure_session(**kwargs):
+    """Replace the shared session with one built from `kwargs` (see PooledSession)."""
+    global _session, _session_kwargs
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session_kwargs = kwargs
+        _session = PooledSession(**kwargs)
+        logging.info(f"HTTP session configured with {kwargs}")
+    return _session
+
+
+def get_session():
+    """Return the process-wide pooled session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = PooledSession(**_session_kwargs)
+    return _session
+
+
+def close_session():
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
@@ -0,0 +1,117 @@
+"""
+Pull the docker images an exemplar needs before it is started: only the ones missing locally,
+all at the same time, with one progress bar per image.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import docker
+from docker.errors import DockerException
+from rich.progress import Progress
+
+from UPISAS.compose import load_services
+from UPISAS.exceptions import DockerImageNotFoundOnDockerHub
+
+# Concurrent pulls; the docker daemon itself downloads at most 3 layers per pull by default.
+DEFAULT_MAX_PULLS = 4
+
+# Images known to be present locally, so later lookups skip the daemon (and the registry).
+_local_images = set()
+_local_images_lock = threading.Lock()
+
+
+def image_available_locally(image, client=None):
+    """Whether `image` is present locally; positive answers are remembered for the whole process."""
+    if image in _local_images:
+        return True
+    client = client or docker.from_env()
+    try:
+        client.images.get(image)
+    except docker.errors.ImageNotFound:
+        return False
+    _remember_local_image(image)
+    return True
+
+
+def forget_local_image(image=None):
+    """Drop `image` (all images by default) from the known local images, e.g. after removing it."""
+    with _local_images_lock:
+        if image is None:
+            _local_images.clear()
+        else:
+            _local_images.discard(image)
+
+
+def _remember_local_image(image):
+    with _local_images_lock:
+        _local_images.add(image)
+
+
+def compose_images(compose_dir, compose_file="docker-compose.yml"):
+    """The images used by the services of a docker compose project, in order of appearance."""
+    return _unique(service.image for service in load_services(compose_dir, compose_file).values() if service.image)
+
+
+def prefetch_images(images, client=None, max_workers=DEFAULT_MAX_PULLS, show_progress=True):
+    """
+    Pull every image of `images` that is not available locally, `max_workers` at a time.
+
+    Raises DockerImageNotFoundOnDockerHub if one of them does not exist in the registry (the
+    other pulls are still completed). Returns the images that were pulled.
+    """
+    client = client or docker.from_env()
+    missing = [image for image in _unique(images) if not image_available_locally(image, client)]
+    if not missing:
+        return []
+    logging.info(f"pulling {len(missing)} image(s): {', '.join(missing)}")
+    with Progress(disable=not show_progress) as progress:
+        tasks = {image: progress.add_task(f"[cyan]{image}", total=None) for image in missing}
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(missing))),
+                                thread_name_prefix="image-pull") as executor:
+            futures = {image: executor.submit(_pull, client, image, progress, tasks[image]) for image in missing}
+        not_found = [image for image, future in futures.items() if isinstance(future.exception(), _NotFound)]
+        for future in futures.values():
+            if future.exception() is not None and not isinstance(future.exception(), _NotFound):
+                raise future.exception()
+    if not_found:
+        logging.error(f"image(s) {', '.join(not_found)} not found on DockerHub, exiting!")
+        raise DockerImageNotFoundOnDockerHub
+    return missing
+
+
+class _NotFound(Exception):
+    pass
+
+
+def _pull(client, image, progress, task):
+    """Pull one image, reporting the downloaded and extracted bytes of all its layers on `task`."""
+    layers = {}  # layer id -> (status, current, total)
+    try:
+        for line in client.api.pull(image, stream=True, decode=True):
+            if "error" in line:
+                if _is_not_found(line["error"]):
+                    raise _NotFound(line["error"])
+                raise DockerException(line["error"])
+            detail = line.get("progressDetail") or {}
+            if line.get("status") in ("Downloading", "Extracting") and detail.get("total"):
+                layers[line["id"]] = (line["status"], detail.get("current", 0), detail["total"])
+                # Downloading and extracting each count for half of a layer's progress
+                total = sum(2 * layer_total for _, _, layer_total in layers.values())
+                completed = sum(current + (layer_total if status == "Extracting" else 0)
+                                for status, current, layer_total in layers.values())
+                progress.update(task, total=total, completed=completed)
+    except docker.errors.NotFound as e:
+        raise _NotFound(str(e))
+    progress.update(task, total=1, completed=1, description=f"[green]{image}")
+    _remember_local_image(image)
+
+
+def _is_not_found(message):
+    message = message.lower()
+    return "not found" in message or "does not exist" in message or "pull access denied" in message
+
+
+def _unique(items):
+    return list(dict.fromkeys(items))
@@ -0,0 +1,196 @@
+"""
+Low-overhead timers, fixed-bucket histograms and counters, rendered in the Prometheus text format.
+
+    with REGISTRY.timer("upisas_phase_seconds", phase="analyze"):
+        ...
+    REGISTRY.counter("upisas_monitor_retries_total").inc()
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# Upper bounds (in seconds) of the latency buckets, from 1 ms to 30 s.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Counter:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class Histogram:
+    """Counts of observations per bucket (the last one is +Inf), plus their sum."""
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q):
+        """Estimate of the `q` quantile, interpolated linearly within its bucket (NaN if empty)."""
+        with self._lock:
+            counts, count = list(self.counts), self.count
+        if not count:
+            return math.nan
+        rank = q * count
+        seen = 0
+        for i, bucket_count in enumerate(counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                if i == len(self.buckets):
+                    return lower  # In the +Inf bucket, the best estimate is the largest finite bound
+                return lower + (self.buckets[i] - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+
+class _Timer:
+    __slots__ = ("histogram", "started")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self.histogram
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started)
+
+
+class MetricsRegistry:
+    """
+    Counters and histograms keyed by metric name and labels, created on first use.
+
+    Metrics can be described with `describe`, which sets their HELP line.
+    """
+
+    def __init__(self):
+        self._metrics = {}  # name -> (type, {labels: metric})
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name, help_text):
+        self._help[name] = help_text
+
+    def counter(self, name, **labels):
+        return self._get(name, "counter", labels, Counter)
+
+    def histogram(self, name, buckets=DEFAULT_BUCKETS, **labels):
+        return self._get(name, "histogram", labels, lambda: Histogram(buckets))
+
+    def timer(self, name, **labels):
+        """Observe the (monotonic) duration of a `with` block in histogram `name`, also when it raises."""
+        return _Timer(self.histogram(name, **labels))
+
+    def _get(self, name, kind, labels, create):
+        key = tuple(sorted(labels.items()))
+        family = self._metrics.get(name)
+        if family is not None and family[0] == kind:
+            metric = family[1].get(key)
+            if metric is not None:
+                return metric
+        with self._lock:
+            family = self._metrics.setdefault(name, (kind, {}))
+            if family[0] != kind:
+                raise ValueError(f"metric '{name}' is a {family[0]}, not a {kind}")
+            return family[1].setdefault(key, create())
+
+    def reset(self):
+        with self._lock:
+            self._metrics = {}
+
+    def _families(self):
+        """(name, type, sorted [(labels, metric)]) of every metric, copied so they can be read while others record."""
+        with self._lock:
+            families = [(name, kind, list(metrics.items())) for name, (kind, metrics) in self._metrics.items()]
+        return [(name, kind, sorted(metrics, key=lambda item: item[0])) for name, kind, metrics in sorted(families)]
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for name, kind, metrics in self._families():
+            if name in self._help:
+                lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key, metric in metrics:
+                if kind == "counter":
+                    lines.append(f"{name}{_format_labels(key)} {_format_value(metric.value)}")
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip(metric.buckets + (math.inf,), metric.counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == math.inf else _format_value(bound)
+                    lines.append(f"{name}_bucket{_format_labels(key + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(key)} {_format_value(metric.sum)}")
+                lines.append(f"{name}_count{_format_labels(key)} {metric.count}")
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self):
+        """All metrics as JSON-serialisable data, with p50/p95/p99 estimates for histograms."""
+        result = {}
+        for name, kind, metrics in self._families():
+            series = []
+            for key, metric in metrics:
+                entry = {"labels": dict(key)}
+                if kind == "counter":
+                    entry["value"] = metric.value
+                else:
+                    entry.update(count=metric.count, sum=metric.sum,
+                                 buckets=dict(zip([str(b) for b in metric.buckets] + ["+Inf"], metric.counts)),
+                                 p50=_finite(metric.quantile(0.5)), p95=_finite(metric.quantile(0.95)),
+                                 p99=_finite(metric.quantile(0.99)))
+                series.append(entry)
+            result[name] = {"type": kind, "series": series}
+        return result
+
+    def write(self, directory, basename="metrics"):
+        """Write `<basename>.prom` and `<basename>.json` to `directory`."""
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"{basename}.prom"), "w") as f:
+            f.write(self.render())
+        with open(os.path.join(directory, f"{basename}.json"), "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+def _format_labels(key):
+    if not key:
+        return ""
+    return "{" + ",".join(f'{label}="{_escape(value)}"' for label, value in key) + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _finite(value):
+    return None if math.isnan(value) else value
+
+
+# The registry used by the strategy, the MAPE-K loop and the shared HTTP session.
+REGISTRY = MetricsRegistry()
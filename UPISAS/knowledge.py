@@ -1,4 +1,261 @@
-from dataclasses import dataclass
+from array import array
+from dataclasses import dataclass, field
+import math
+import numbers
+import weakref
+
+from UPISAS.snapshot_model import MonitorSnapshot, METRICS, snapshot_metrics
+
+DEFAULT_HISTORY_SIZE = 256
+
+
+class RingBuffer:
+    """
+    A fixed-size, preallocated buffer of the last `capacity` float samples.
+
+    Every sample is written twice, at `i` and `i + capacity`, so the most recent
+    samples are always contiguous in memory and `window` can return a zero-copy
+    memoryview, oldest sample first.
+    """
+    __slots__ = ("capacity", "count", "appended", "_next", "_data", "_view")
+
+    def __init__(self, capacity=DEFAULT_HISTORY_SIZE):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.count = 0
+        self.appended = 0  # Samples appended since creation, including the ones overwritten since
+        self._next = 0
+        self._data = array("d", [math.nan]) * (2 * capacity)
+        self._view = memoryview(self._data)
+
+    def __len__(self):
+        return self.count
+
+    def append(self, value):
+        self._data[self._next] = value
+        self._data[self._next + self.capacity] = value
+        self._next = (self._next + 1) % self.capacity
+        self.appended += 1
+        if self.count < self.capacity:
+            self.count += 1
+
+    def window(self, size=None):
+        """The last `size` samples (all of them by default) as a read-only memoryview."""
+        size = self.count if size is None else min(size, self.count)
+        end = self._next + self.capacity
+        return self._view[end - size:end].toreadonly()
+
+    def last(self):
+        return self._data[self._next + self.capacity - 1] if self.count else math.nan
+
+
+class MonitoredHistory:
+    """
+    Bounded per-(service, instance, metric) history of monitored values.
+
+    Service-level values use `None` as instance id; values that do not belong
+    to a service (e.g. the demo exemplar's `f`) use `None` for both ids.
+
+    `record` keeps one sample per snapshot of an instance, however many monitor
+    responses repeat it, and drops the series of instances that are no longer in
+    their service's snapshots (and of services no longer in the response), so the
+    history only grows with the number of live instances.
+
+    Subscribers (see `subscribe`) are told which instances and services changed,
+    so they can follow the history without scanning it.
+    """
+
+    def __init__(self, capacity=DEFAULT_HISTORY_SIZE):
+        self.capacity = capacity
+        self.ticks = 0
+        self._series = {}
+        self._metrics = {}  # (service id, instance id) -> metrics with a series
+        self._instances = {}  # Service id -> {instance id: (snapshot id, timestamp) of its last recorded snapshot}
+        self._implementations = {}  # Service id -> its implementation id in the last recorded response
+        self._statuses = {}  # (service id, instance id) -> status in its last recorded snapshot
+        self._subscribers = weakref.WeakSet()
+
+    def __contains__(self, key):
+        return key in self._series
+
+    def keys(self):
+        return self._series.keys()
+
+    def subscribe(self, subscriber):
+        """
+        Call `subscriber.history_changed(service_id, instance_id)` whenever an instance gets a new
+        snapshot or is dropped, and with `None` as instance id whenever the implementation of a
+        service changes or the service is dropped. Subscribers are only weakly referenced.
+        """
+        self._subscribers.add(subscriber)
+
+    def _changed(self, service_id, instance_id):
+        for subscriber in self._subscribers:
+            subscriber.history_changed(service_id, instance_id)
+
+    def append(self, service_id, instance_id, metric, value):
+        key = (service_id, instance_id, metric)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = RingBuffer(self.capacity)
+            self._metrics.setdefault((service_id, instance_id), set()).add(metric)
+        series.append(value)
+
+    def drop(self, service_id, instance_id):
+        """Forget every series of an instance."""
+        for metric in self._metrics.pop((service_id, instance_id), ()):
+            del self._series[(service_id, instance_id, metric)]
+        self._statuses.pop((service_id, instance_id), None)
+        self._instances.get(service_id, {}).pop(instance_id, None)
+        self._changed(service_id, instance_id)
+
+    def drop_service(self, service_id):
+        """Forget every series of the instances of a service, and the service itself."""
+        for instance_id in list(self._instances.get(service_id, ())):
+            self.drop(service_id, instance_id)
+        self._instances.pop(service_id, None)
+        self._implementations.pop(service_id, None)
+        self._changed(service_id, None)
+
+    def services(self):
+        """The ids of the services of the last recorded response."""
+        return self._instances.keys()
+
+    def instances(self, service_id):
+        """The ids of the instances of a service in the last recorded response."""
+        return self._instances.get(service_id, {}).keys()
+
+    def implementation(self, service_id):
+        return self._implementations.get(service_id)
+
+    def status(self, service_id, instance_id):
+        """The status of an instance in its last recorded snapshot."""
+        return self._statuses.get((service_id, instance_id))
+
+    def series(self, service_id, instance_id, metric):
+        return self._series.get((service_id, instance_id, metric))
+
+    def window(self, service_id, instance_id, metric, size=None):
+        series = self.series(service_id, instance_id, metric)
+        return series.window(size) if series is not None else memoryview(array("d"))
+
+    def mean(self, service_id, instance_id, metric, size=None):
+        values = [v for v in self.window(service_id, instance_id, metric, size) if not math.isnan(v)]
+        return sum(values) / len(values) if values else math.nan
+
+    def percentile(self, service_id, instance_id, metric, q, size=None):
+        """The `q`-th percentile (0-100) of the window, interpolating linearly between samples."""
+        values = sorted(v for v in self.window(service_id, instance_id, metric, size) if not math.isnan(v))
+        if not values:
+            return math.nan
+        rank = (len(values) - 1) * q / 100
+        low = math.floor(rank)
+        high = min(low + 1, len(values) - 1)
+        return values[low] + (values[high] - values[low]) * (rank - low)
+
+    def record(self, monitored_data):
+        """
+        Append the values of a monitor response (see `monitored_values`), and drop the series
+        of the instances and services that left the response.
+
+        The snapshot of an instance is skipped if it is the one recorded last (by snapshot
+        `id` and `timestamp`). Missing METRICS are recorded as NaN, so every window of an
+        instance covers the same snapshots.
+        """
+        self.ticks += 1
+        services = set()
+        for service_id, implementation_id, samples in _instance_samples(monitored_data):
+            services.add(service_id)
+            recorded = self._instances.setdefault(service_id, {})
+            if service_id not in self._implementations or self._implementations[service_id] != implementation_id:
+                self._implementations[service_id] = implementation_id
+                self._changed(service_id, None)
+            seen = set()
+            for instance_id, identity, status, values in samples:
+                seen.add(instance_id)
+                if identity != (None, None) and recorded.get(instance_id) == identity:
+                    continue
+                recorded[instance_id] = identity
+                self._statuses[(service_id, instance_id)] = status
+                for metric, value in values:
+                    self.append(service_id, instance_id, metric, value)
+                self._changed(service_id, instance_id)
+            for instance_id in [instance_id for instance_id in recorded if instance_id not in seen]:
+                self.drop(service_id, instance_id)
+        if services:  # Not for a response without services at all, e.g. a failed one
+            for service_id in [service_id for service_id in self._instances if service_id not in services]:
+                self.drop_service(service_id)
+        for metric, value in _flat_values(monitored_data):
+            self.append(None, None, metric, value)
+
+
+def monitored_values(monitored_data):
+    """
+    Every numeric value of a monitor response, as (service id, instance id, metric, value).
+
+    Understands the RAMSES layout (services holding a list of per-instance snapshots,
+    with an optional `qos` dict), plus flat objects of numbers or lists of numbers. Every
+    snapshot gives the METRICS of the snapshot model, then its other numeric fields; of a
+    MonitorSnapshot, only the METRICS it keeps are produced. Booleans (status flags) and
+    snapshot ids are not metrics and are left out, as are missing values.
+    """
+    for service_id, _, samples in _instance_samples(monitored_data):
+        for instance_id, _, _, values in samples:
+            for metric, value in values:
+                if not math.isnan(value):
+                    yield service_id, instance_id, metric, value
+    for metric, value in _flat_values(monitored_data):
+        yield None, None, metric, value
+
+
+def _instance_samples(monitored_data):
+    """
+    (service id, implementation id, [(instance id, (snapshot id, timestamp), status, [(metric, value)])])
+    for every service of a monitor response.
+    """
+    if isinstance(monitored_data, MonitorSnapshot):
+        for service_id, service in monitored_data.items():
+            columns = [(metric, service.metrics[metric]) for metric in METRICS]
+            yield service_id, service.implementation_id, [
+                (instance.instance_id, (instance.snapshot_id, instance.timestamp), instance.status,
+                 [(metric, values[instance.index]) for metric, values in columns])
+                for instance in service.instances]
+        return
+    for service_id, service_data in monitored_data.items():
+        if isinstance(service_data, dict):
+            yield service_id, service_data.get("currentImplementationId"), [
+                (snapshot.get("instanceId"), (snapshot.get("id"), snapshot.get("timestamp")), snapshot.get("status"),
+                 _snapshot_values(snapshot))
+                for snapshot in service_data.get("snapshot") or []]
+
+
+def _snapshot_values(snapshot):
+    values = list(zip(METRICS, snapshot_metrics(snapshot)))
+    for metric, value in dict(snapshot, **(snapshot.get("qos") or {})).items():
+        if metric not in _NOT_METRICS and _is_number(value):
+            values.append((metric, float(value)))
+    return values
+
+
+def _flat_values(monitored_data):
+    if isinstance(monitored_data, MonitorSnapshot):
+        return
+    for key, value in monitored_data.items():
+        if _is_number(value):
+            yield key, value
+        elif isinstance(value, list):
+            for sample in value:
+                if _is_number(sample):
+                    yield key, sample
+
+
+# Snapshot fields that are ids, or already produced as METRICS
+_NOT_METRICS = frozenset(("id",) + METRICS)
+
+
+def _is_number(value):
+    return isinstance(value, numbers.Real) and not isinstance(value, bool)
 
 
 @dataclass
@@ -10,3 +267,4 @@ class Knowledge:
     monitor_schema: dict
     execute_schema: dict
     adaptation_options_schema: dict
+    history: MonitoredHistory = field(default_factory=MonitoredHistory)
@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from UPISAS.instrumentation import REGISTRY
+from UPISAS.strategy import Strategy
+
+
+class MapeKLoop:
+    """
+    Drives a Strategy's monitor -> analyze -> plan -> execute loop on a fixed tick period.
+
+    Ticks are scheduled against absolute deadlines (start + n * tick_period), so the time
+    spent in the loop does not add to the period; ticks that are missed entirely are skipped.
+    With `overlap` enabled, the monitor fetch for tick N+1 runs while tick N is still being
+    analyzed, planned and executed. The fetch is started `monitor_lead` seconds before the
+    next deadline, or, if `monitor_lead` is None, as far ahead as the recent fetch latency.
+
+    Strategy methods are called unchanged, in worker threads: one thread for fetching and one
+    for everything that reads or writes the knowledge base, so strategies need no locking.
+    The loop monitors through `fetch_monitor_data` and `process_monitor_data`, which are the
+    extension points to override for a custom monitor that keeps the overlapped fetch. A
+    strategy that overrides `monitor()` instead is monitored with it, at the start of each
+    tick in the knowledge thread, and its ticks are not overlapped.
+    """
+
+    def __init__(self, strategy, tick_period=3.0, overlap=True, monitor_lead=None,
+                 endpoint_suffix="monitor", with_validation=True, verbose=False):
+        self.strategy = strategy
+        self.tick_period = tick_period
+        self.overlap = overlap
+        self.monitor_lead = monitor_lead
+        self.endpoint_suffix = endpoint_suffix
+        self.with_validation = with_validation
+        self.verbose = verbose
+        self.monitors_itself = getattr(type(strategy), "monitor", Strategy.monitor) is not Strategy.monitor
+        self.ticks = 0
+        self.skipped_ticks = 0
+        self.fetch_latency = None  # Exponentially weighted average, in seconds
+        self._fetch_executor = None
+        self._strategy_executor = None
+
+    def run_for(self, duration=None, ticks=None):
+        """Run the loop from synchronous code, for `duration` seconds and/or `ticks` ticks."""
+        return asyncio.run(self.run(duration=duration, ticks=ticks))
+
+    async def run(self, duration=None, ticks=None):
+        self._fetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mape-monitor")
+        self._strategy_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mape-strategy")
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        end = start + duration if duration is not None else math.inf
+        tick = 0
+        overlap = self.overlap and not self.monitors_itself
+        fetch = asyncio.ensure_future(self._fetch())
+        try:
+            while (ticks is None or self.ticks < ticks) and loop.time() < end:
+                data = await fetch
+                next_deadline = start + (tick + 1) * self.tick_period
+                if overlap:
+                    fetch = asyncio.ensure_future(self._fetch_at(next_deadline - self._lead()))
+                await self._run_in(self._strategy_executor, self._tick, data)
+                self.ticks += 1
+
+                # Compensate for drift: wait for the next deadline, skipping any that already passed
+                now = loop.time()
+                if now > next_deadline:
+                    missed = math.ceil((now - next_deadline) / self.tick_period)
+                    self.skipped_ticks += missed
+                    REGISTRY.counter("upisas_skipped_ticks_total").inc(missed)
+                    logging.warning(f"MAPE-K tick took longer than {self.tick_period}s, skipping {missed} tick(s)")
+                    tick += missed
+                    next_deadline += missed * self.tick_period
+                tick += 1
+                if loop.time() >= end or (ticks is not None and self.ticks >= ticks):
+                    break
+                if not overlap:
+                    await asyncio.sleep(max(0.0, next_deadline - self._lead() - loop.time()))
+                    fetch = asyncio.ensure_future(self._fetch())
+                await asyncio.sleep(max(0.0, next_deadline - loop.time()))
+        finally:
+            fetch.cancel()
+            self._fetch_executor.shutdown(wait=False)
+            self._strategy_executor.shutdown(wait=True)
+        return self.ticks
+
+    def _lead(self):
+        if self.monitor_lead is not None:
+            return self.monitor_lead
+        return min(self.fetch_latency or 0.0, self.tick_period)
+
+    async def _fetch_at(self, when):
+        await asyncio.sleep(max(0.0, when - asyncio.get_running_loop().time()))
+        return await self._fetch()
+
+    async def _fetch(self):
+        if self.monitors_itself:
+            return None  # Fetched by the strategy's own monitor(), in _tick
+        started = time.monotonic()
+        try:
+            return await self._run_in(self._fetch_executor, self.strategy.fetch_monitor_data, self.endpoint_suffix)
+        except Exception as e:
+            logging.error(f"Monitor fetch failed: {e}")
+            return None
+        finally:
+            latency = time.monotonic() - started
+            self.fetch_latency = latency if self.fetch_latency is None else 0.8 * self.fetch_latency + 0.2 * latency
+
+    async def _run_in(self, executor, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(executor, function, *args)
+
+    def _tick(self, data):
+        if data is None and not self.monitors_itself:
+            return False
+        try:
+            with REGISTRY.timer("upisas_tick_seconds"):
+                if self.monitors_itself:
+                    self.strategy.monitor(endpoint_suffix=self.endpoint_suffix, with_validation=self.with_validation,
+                                          verbose=self.verbose)
+                else:
+                    self.strategy.process_monitor_data(data, with_validation=self.with_validation,
+                                                       verbose=self.verbose)
+                if self.strategy.analyze():
+                    if self.strategy.plan():
+                        self.strategy.execute()
+            return True
+        except Exception as e:
+            logging.error(f"MAPE-K tick failed: {e}")
+            return False
@@ -0,0 +1,84 @@
+import numpy as np
+
+from UPISAS.snapshot_model import MonitorSnapshot
+
+# Fields of a SWIM monitor response, each a list with one entry per sample.
+SWIM_COLUMNS = ("max_servers", "arrival_rate", "dimmer_factor", "servers",
+                "basic_rt", "basic_throughput", "opt_rt", "opt_throughput")
+# Per-instance values collected from the snapshots of RAMSES monitored data.
+RAMSES_COLUMNS = ("failureRate", "utility", "availability", "responseTime")
+
+
+def to_columns(monitored_data, keys):
+    """Convert parallel lists of monitored data into float arrays, one per key."""
+    return {key: np.asarray(monitored_data[key], dtype=float) for key in keys}
+
+
+def swim_utility(monitored_data, rt_threshold, max_service_rate,
+                 basic_revenue=1, opt_revenue=1.5, server_cost=10, precision=1e-5):
+    """Utility of every SWIM sample, as defined by the SWIM exemplar."""
+    columns = to_columns(monitored_data, SWIM_COLUMNS)
+    max_servers = np.trunc(columns["max_servers"])
+    arrival_rate = columns["arrival_rate"]
+    dimmer = columns["dimmer_factor"]
+    max_throughput = max_servers * max_service_rate
+    avg_response_time = swim_average_response_time(columns)
+
+    ur = arrival_rate * ((1 - dimmer) * basic_revenue + dimmer * opt_revenue)
+    uc = server_cost * (max_servers - columns["servers"])
+    ur_opt = arrival_rate * opt_revenue
+
+    within_threshold = avg_response_time <= rt_threshold
+    return np.where(within_threshold & (ur >= ur_opt - precision), ur + uc,
+                    np.where(within_threshold, ur, np.minimum(0.0, arrival_rate - max_throughput) * opt_revenue))
+
+
+def swim_average_response_time(columns):
+    """Throughput-weighted response time of basic and optional content, per sample."""
+    return ((columns["basic_rt"] * columns["basic_throughput"] + columns["opt_rt"] * columns["opt_throughput"])
+            / (columns["basic_throughput"] + columns["opt_throughput"]))
+
+
+def ramses_columns(monitored_data, defaults=None):
+    """
+    Collect the `qos` of every snapshot of RAMSES monitored data and return one array per column
+    of RAMSES_COLUMNS, with one entry per snapshot. Values are read from the snapshot's `qos`;
+    missing ones are taken from `defaults` (NaN if absent there too).
+
+    Also takes a MonitorSnapshot, whose typed arrays are concatenated as they are; the columns
+    it does not keep are filled from `defaults`.
+    """
+    defaults = defaults or {}
+    if isinstance(monitored_data, MonitorSnapshot):
+        return _snapshot_columns(monitored_data, defaults)
+    qos = [snapshot.get("qos") or {} for service_data in monitored_data.values()
+           for snapshot in service_data.get("snapshot") or []]
+    return {column: _float_column([values.get(column, defaults.get(column)) for values in qos])
+            for column in RAMSES_COLUMNS}
+
+
+def _snapshot_columns(monitor_snapshot, defaults):
+    services = list(monitor_snapshot.values())
+    columns = {}
+    for column in RAMSES_COLUMNS:
+        default = _as_float(defaults.get(column))
+        parts = [np.frombuffer(service.metrics[column], dtype=float) if column in service.metrics
+                 else np.full(len(service), default) for service in services]
+        columns[column] = np.concatenate(parts) if parts else np.empty(0)
+    return columns
+
+
+def _float_column(values):
+    """A float array of raw QoS values, with NaN for None; percentages ("80%") take the slow path."""
+    try:
+        return np.array(values, dtype=float)
+    except ValueError:
+        return np.array([_as_float(value) for value in values], dtype=float)
+
+
+def _as_float(value):
+    if value is None:
+        return np.nan
+    if isinstance(value, str):
+        return float(value.rstrip("%"))
+    return float(value)
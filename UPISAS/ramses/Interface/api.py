@@ -6,247 +6,569 @@
 
 
 
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, fields, replace
 from typing import Optional, Dict, List
 
-from flask import Flask, Response, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 
 import requests
+import hashlib
+import math
 import os
-import json
+import sys
+import time
+
+import jsonschema
+
+# The interface runs from its own directory; make the enclosing UPISAS package importable.
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+from UPISAS import codec, get_validator
+from UPISAS.instrumentation import REGISTRY
+
+from upstream import session as upstream
+from monitor_stream import MonitorState
+from probe_cache import ProbeCache, ARCHITECTURE, CONFIGURATION, SNAPSHOT
+from prefetcher import MonitorPrefetcher
 
 app = Flask(__name__)
 
-monitor_schema_file = "specifications/monitor_schema.json"
-adaption_option_file = "specifications/adaptation_options.json"
-adaption_schema_file = "specifications/adaptation_schema.json"
+specifications_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "specifications")
+monitor_schema_file = os.path.join(specifications_dir, "monitor_schema.json")
+adaption_option_file = os.path.join(specifications_dir, "adaptation_options.json")
+adaption_schema_file = os.path.join(specifications_dir, "adaptation_schema.json")
+execute_schema_file = os.path.join(specifications_dir, "execute_schema.json")
+# Base URLs of the RAMSES services the interface talks to
+probe_url = os.environ.get("RAMSES_PROBE_URL", "http://localhost:32838")
+instances_manager_url = os.environ.get("RAMSES_INSTANCES_MANAGER_URL", "http://localhost:32839")
+load_balancer_url = os.environ.get("RAMSES_LOAD_BALANCER_URL", "http://localhost:32780")
+knowledge_url = os.environ.get("RAMSES_KNOWLEDGE_URL", "http://127.0.0.1:32841")
+upstream.name_upstreams(probe=probe_url, instances_manager=instances_manager_url,
+                        load_balancer=load_balancer_url, knowledge=knowledge_url)
+REGISTRY.describe("ramses_interface_request_seconds", "Time spent serving each route of the interface")
+REGISTRY.describe("ramses_interface_errors_total", "Responses of the interface with a 5xx status")
+REGISTRY.describe("ramses_upstream_request_seconds", "Latency of the calls to each RAMSES service")
+REGISTRY.describe("ramses_upstream_errors_total", "Calls to a RAMSES service that failed or got a 5xx status")
+REGISTRY.describe("ramses_monitor_build_seconds", "Time spent building the combined monitor document")
+REGISTRY.describe("ramses_probe_cache_requests_total", "Lookups in the probe response cache, by result")
+REGISTRY.describe("ramses_probe_cache_discarded_total", "Probe responses not cached, as their key was invalidated while they were fetched")
+# file -> (mtime, parsed document, serialised body, etag), see load_document
+_document_cache = {}
+# codec name -> (version, body) of the last /monitor document served with it
+_encoded_monitor_documents = {}
+
+# Per-service probe calls in /monitor are fanned out over a bounded pool of workers.
+# Set RAMSES_MONITOR_PARALLEL=0 to fall back to the sequential behaviour.
+monitor_parallel = os.environ.get("RAMSES_MONITOR_PARALLEL", "1") != "0"
+monitor_max_workers = int(os.environ.get("RAMSES_MONITOR_MAX_WORKERS", "8"))
+# Seconds between probe polls (and keep-alives) on /monitor/stream.
+monitor_stream_interval = float(os.environ.get("RAMSES_MONITOR_STREAM_INTERVAL", "3"))
+monitor_state = MonitorState()
+probe_cache = ProbeCache()
+# Seconds between background rebuilds of the /monitor document (0 builds it inside each request).
+monitor_prefetch_interval = float(os.environ.get("RAMSES_MONITOR_PREFETCH_INTERVAL", "2"))
+# Upper bound on concurrent upstream calls made by a single /execute_batch request.
+execute_max_workers = int(os.environ.get("RAMSES_EXECUTE_MAX_WORKERS", "8"))
+
+
+class InvalidRequest(ValueError):
+    pass
 
 
 @dataclass
 class UnifiedRequest:
+    """
+    An execute request. `decode` returns the typed request of its operation (see REQUEST_TYPES),
+    with the fields execute_schema.json allows for that operation.
+    """
     operation: str  # "addInstances", "removeInstance", "changeLBWeights", or "changeProperty"
-    serviceImplementationName: Optional[str] = None
-    numberOfInstances: Optional[int] = None
+
+    @classmethod
+    def decode(cls, data):
+        """
+        The typed request in a decoded body, validated against execute_schema.json (with the
+        cached validator, see get_execute_validator). Raises InvalidRequest.
+        """
+        if not isinstance(data, dict):
+            raise InvalidRequest(f"Invalid request: {data!r} is not of type 'object'")
+        validator = get_execute_validator()
+        if validator is not None:
+            error = jsonschema.exceptions.best_match(validator.iter_errors(data))
+            if error is not None:
+                raise InvalidRequest(f"Invalid request: {error.message}")
+        # Also without a schema, as the dataclasses cannot take them
+        request_type = REQUEST_TYPES.get(data.get("operation"))
+        if request_type is None:
+            raise InvalidRequest(f"Invalid request: unknown operation {data.get('operation')!r}")
+        unexpected = sorted(set(data) - REQUEST_FIELDS[request_type])
+        if unexpected:
+            raise InvalidRequest(f"Invalid request: Additional properties are not allowed ({unexpected} unexpected)")
+        try:
+            return request_type(**data)
+        except (TypeError, ValueError, AttributeError) as e:
+            raise InvalidRequest(f"Invalid request: {e}")
+
+
+@dataclass
+class AddInstances(UnifiedRequest):
+    serviceImplementationName: str
+    numberOfInstances: int
+
+
+@dataclass
+class RemoveInstance(UnifiedRequest):
+    serviceImplementationName: str
+    address: str
+    port: int
     removeInstanceName: Optional[str] = None
-    weightsId: Optional[str] = None
-    weights: Optional[Dict[str, float]] = None
-    instancesToRemoveWeightOf: Optional[List[str]] = None
-    serviceName: Optional[str] = None
-    propertiesName: Optional[str] = None
-    propertiesToChange: Optional[str] = None
-    address: Optional[str] = None
-    port: Optional[int] = None
+
+
+@dataclass
+class ChangeLBWeights(UnifiedRequest):
+    weightsId: str
+    weights: Dict[str, float]
+    instancesToRemoveWeightOf: List[str]
+
+    def __post_init__(self):
+        self.weights = {instance: float(weight) for instance, weight in self.weights.items()}
+
+
+@dataclass
+class ChangeProperty(UnifiedRequest):
+    serviceName: str
+    propertiesName: str
+    propertiesToChange: str
+
+
+REQUEST_TYPES = {"addInstances": AddInstances, "removeInstance": RemoveInstance,
+                 "changeLBWeights": ChangeLBWeights, "changeProperty": ChangeProperty}
+REQUEST_FIELDS = {request_type: frozenset(field.name for field in fields(request_type))
+                  for request_type in REQUEST_TYPES.values()}
+# (schema document, compiled validator) of execute_schema.json, see get_execute_validator
+_execute_validator = None
+
+
+def get_execute_validator():
+    """The validator of execute_schema.json, compiled again only when the file changes; None if there is none."""
+    global _execute_validator
+    try:
+        schema = load_document(execute_schema_file)[0]
+    except FileNotFoundError as e:
+        print(e)
+        return None
+    if _execute_validator is None or _execute_validator[0] is not schema:
+        _execute_validator = (schema, get_validator(schema))
+    return _execute_validator[1]
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def observe_request(response):
+    """Record the latency (up to the first byte, for streams) and errors of every route."""
+    started = g.pop("request_started", None)
+    if started is not None:
+        endpoint = request.endpoint or "unknown"
+        REGISTRY.histogram("ramses_interface_request_seconds", endpoint=endpoint,
+                           method=request.method).observe(time.perf_counter() - started)
+        if response.status_code >= 500:
+            REGISTRY.counter("ramses_interface_errors_total", endpoint=endpoint).inc()
+    return response
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Latency histograms and error counters of the interface routes and upstream calls, for Prometheus."""
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
 
 
 @app.route('/monitor', methods=['GET'])
 def monitor():
-    services = fetch_system_architecture()
-    combined_data = {}
-    if services:
+    """
+    The combined monitor document.
+
+    With prefetching enabled, the latest document built in the background is returned at once;
+    `?max_staleness=<seconds>` forces a synchronous refresh if it is older than that. The
+    document's age is sent in the `Age` and `X-Monitor-Age` headers.
+
+    Served as msgpack to clients that prefer it in their Accept header (and JSON otherwise),
+    with the encoded document kept until it changes.
+    """
+    parallel = _parallel_requested()
+    max_staleness = request.args.get("max_staleness", type=float)
+    if max_staleness is None:
+        max_staleness = math.inf if monitor_prefetcher.enabled else 0
+    monitor_prefetcher.start()
+    monitor_state.refresh(lambda: build_monitor_document(parallel=parallel), max_age=max_staleness)
+    combined_data, version, age = monitor_state.snapshot()
+    media_type = request.accept_mimetypes.best_match(codec.media_types(), default=codec.JSON_MEDIA_TYPE)
+    return Response(
+        response=encoded_monitor_document(combined_data, version, codec.for_media_type(media_type)),
+        status=200,
+        mimetype=media_type,
+        headers={
+            'Age': str(int(age)),
+            'X-Monitor-Age': f"{age:.3f}",
+            'X-Monitor-Version': str(version),
+            'Vary': 'Accept'
+        }
+    )
+
+
+def encoded_monitor_document(document, version, document_codec):
+    """`document` (at `version`) encoded with `document_codec`, reusing the last encoding of that version."""
+    cached = _encoded_monitor_documents.get(document_codec.name)
+    if cached is None or cached[0] != version:
+        cached = _encoded_monitor_documents[document_codec.name] = (version, document_codec.dumps(document))
+    return cached[1]
+
+
+@app.route('/monitor/stream', methods=['GET'])
+def monitor_stream():
+    """
+    Server-Sent Events stream of monitor updates.
+
+    The first event carries the full document, later events only the services (and fields)
+    that changed since the client's version. The version is the SSE event id, so a client
+    reconnects with `Last-Event-ID` (or `?since=`) and resumes from where it left off.
+    """
+    since = request.headers.get("Last-Event-ID", request.args.get("since"))
+    try:
+        version = int(since) if since not in (None, "") else None
+    except ValueError:
+        version = None  # Not an id we sent: start over with the full document
+    interval = float(request.args.get("interval", monitor_stream_interval))
+    parallel = _parallel_requested()
+
+    def events():
+        client_version = version
+        while True:
+            monitor_state.refresh(lambda: build_monitor_document(parallel=parallel), max_age=interval)
+            event = monitor_state.event_since(client_version)
+            if event is None:
+                monitor_state.wait_for_change(client_version, timeout=interval)
+                event = monitor_state.event_since(client_version)
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            event_type, payload = event
+            client_version = payload["version"]
+            yield f"id: {client_version}\nevent: {event_type}\ndata: {codec.dumps(payload).decode()}\n\n"
+
+    return Response(
+        stream_with_context(events()),
+        status=200,
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache'}
+    )
+
+
+monitor_prefetcher = MonitorPrefetcher(monitor_state, lambda: build_monitor_document(parallel=monitor_parallel),
+                                       monitor_prefetch_interval)
+
+
+def _parallel_requested():
+    return request.args.get("parallel", str(monitor_parallel)).lower() not in ("0", "false", "no")
+
+
+def build_monitor_document(parallel=True):
+    """Combine architecture, snapshot and configuration of every service, as served by /monitor."""
+    with REGISTRY.timer("ramses_monitor_build_seconds"):
+        services = fetch_system_architecture()
+        combined_data = {}
+        if not services:
+            return combined_data
+        if parallel:
+            per_service_data = fetch_services_parallel(services)
+        else:
+            per_service_data = fetch_services_sequential(services)
         for service_name, details in services.items():
-            service_id = details['serviceId']
-            implementation_id = details['currentImplementationId']
-            instances = details['instances']
-            snapshot_config = fetch_service_snapshot(service_name)
-            instance_config = fetch_instance_configuration(service_name, implementation_id)
+            snapshot_config, instance_config = per_service_data[service_name]
             combined_data[service_name] = {
-                'serviceId': service_id,
-                'currentImplementationId': implementation_id,
-                'instances': instances,
+                'serviceId': details['serviceId'],
+                'currentImplementationId': details['currentImplementationId'],
+                'instances': details['instances'],
                 'snapshot': snapshot_config,
                 'instanceConfig': instance_config
             }
-    return Response(
-        response=json.dumps(combined_data),
-        status=200,
-        mimetype='application/json'
-    )
+    return combined_data
 
 
-@app.route('/monitor_schema', methods=['GET'])
-def monitor_schema():
-    try:
-        data = get_schema(monitor_schema_file)
-        return Response(
-            response=json.dumps(data),
-            status=200,
-            mimetype='application/json'
+def fetch_services_sequential(services):
+    """Fetch snapshot and configuration of every service one call after another."""
+    return {
+        service_name: (
+            fetch_service_snapshot(service_name),
+            fetch_instance_configuration(service_name, details['currentImplementationId'])
         )
-    except FileNotFoundError as e:
+        for service_name, details in services.items()
+    }
+
+
+def fetch_services_parallel(services, max_workers=None):
+    """
+    Fetch snapshot and configuration of every service concurrently.
+
+    All 2 * len(services) probe calls are submitted at once to a pool of at most
+    `max_workers` threads. A call that fails leaves None in its slot, so the caller
+    always gets an entry for every service (a partial result rather than an error).
+    """
+    max_workers = max_workers or monitor_max_workers
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="monitor-fanout") as pool:
+        futures = {
+            service_name: (
+                pool.submit(fetch_service_snapshot, service_name),
+                pool.submit(fetch_instance_configuration, service_name, details['currentImplementationId'])
+            )
+            for service_name, details in services.items()
+        }
+        return {
+            service_name: (_future_result(snapshot_future), _future_result(config_future))
+            for service_name, (snapshot_future, config_future) in futures.items()
+        }
+
+
+def _future_result(future):
+    try:
+        return future.result()
+    except Exception as e:
         print(e)
-        return Response(
-            response=json.dumps({"error": "Schema file not found"}),
-            status=404,
-            mimetype='application/json'
-        )
+        return None
+
+
+@app.route('/monitor_schema', methods=['GET'])
+def monitor_schema():
+    return document_response(monitor_schema_file)
 
 
 @app.route('/adaptation_options', methods=['GET'])
 def adaptation_options():
-    try:
-        data = get_schema(adaption_option_file)
-        return Response(
-            response=json.dumps(data),
-            status=200,
-            mimetype='application/json'
-        )
-    except FileNotFoundError as e:
-        print(e)
-        return Response(
-            response=json.dumps({"error": "Schema file not found"}),
-            status=404,
-            mimetype='application/json'
-        )
+    return document_response(adaption_option_file)
 
 
 @app.route('/adaptation_options_schema', methods=['GET'])
 def adaptation_options_schema():
+    return document_response(adaption_schema_file)
 
+@app.route('/execute', methods=['POST'])
+def execute():
     try:
-        data = get_schema(adaption_schema_file)
+        req = UnifiedRequest.decode(request_json())
+    except ValueError as e:
         return Response(
-            response=json.dumps(data),
-            status=200,
+            response=codec.dumps({"error": str(e)}),
+            status=400,
             mimetype='application/json'
         )
-    except FileNotFoundError as e:
-        print(e)
-        return Response(
-            response=json.dumps({"error": "Schema file not found"}),
-            status=404,
-            mimetype='application/json'
-        )
-
-@app.route('/execute', methods=['POST'])
-def execute():
     try:
-        data = request.get_json()
-        req = UnifiedRequest(**data)
-
-        if req.operation == "addInstances":
-            if not req.serviceImplementationName or not req.numberOfInstances:
-                return Response(
-                    response=json.dumps({"error": "Missing required fields for addInstances"}),
-                    status=400,
-                    mimetype='application/json'
-                )
-            # sefa-instance-manager
-            url = "http://localhost:32839/rest/addInstances"
-            headers = {
-                'Content-Type': 'application/json'
-            }
-            request_body = {
-                "serviceImplementationName": req.serviceImplementationName,
-                "numberOfInstances": req.numberOfInstances
-            }
-            response = requests.post(url, headers=headers, data=json.dumps(request_body)).json()
-
-        elif req.operation == "changeLBWeights":
-            if not req.weights:
-                return Response(
-                    response=json.dumps({"error": "Missing weights for changeLBWeights"}),
-                    status=400,
-                    mimetype='application/json'
-                )
-            url = "http://localhost:32780/rest/changeLBWeights"
-            headers = {
-                'Content-Type': 'application/json'
-            }
-            request_body = {
-                "serviceID": req.weightsId,
-                "newWeights": req.weights,
-                "instancesToRemoveWeightOf": req.instancesToRemoveWeightOf
-            }
-            response = requests.post(url, headers=headers, data=json.dumps(request_body)).json()
-
-        elif req.operation == "changeProperty":
-            if not req.propertiesToChange:
-                return Response(
-                    response=json.dumps({"error": "Missing properties for changeProperty"}),
-                    status=400,
-                    mimetype='application/json'
-                )
-            URL = "http://localhost:32780/rest/changeProperty"
-            headers = {
-                'Content-Type': 'application/json'
-            }
-            request_body = {
-                "serviceName": req.serviceName,
-                "propertyName" : req.propertiesName,
-                "value": req.propertiesToChange
-            }
-            response = {
-                "message": "Properties updated successfully",
-                "updatedProperties": req.propertiesToChange
-            }
-
-        elif req.operation == "removeInstance":
-
-            if not req.serviceImplementationName or not req.address or req.port is None:
-                return Response(
-                    response=json.dumps({"error": "Missing required fields for removeInstance"}),
-                    status=400,
-                    mimetype='application/json'
-                )
-            # sefa instance manager
-            url = "http://localhost:32839/rest/removeInstance"
-            headers = {
-                'Content-Type': 'application/json'
-            }
-            request_body = {
-                "serviceImplementationName": req.serviceImplementationName,
-                "address": req.address,
-                "port": req.port
-            }
-
-            response = requests.post(url, headers=headers, data=json.dumps(request_body)).json()
-
-        else:
-            return Response(
-                response=json.dumps({"error": "Invalid operation"}),
-                status=400,
-                mimetype='application/json'
-            )
-
+        status, response = dispatch_request(req)
         return Response(
-            response=json.dumps(response),
-            status=200,
+            response=codec.dumps(response),
+            status=status,
             mimetype='application/json'
         )
 
     except Exception as e:
         return Response(
-            response=json.dumps({"error": str(e)}),
+            response=codec.dumps({"error": str(e)}),
             status=500,
             mimetype='application/json'
         )
 
 
-@app.route('/execute_schema', methods=['GET'])
-def execute_schema():
+@app.route('/execute_batch', methods=['POST'])
+def execute_batch():
+    """
+    Execute a list of UnifiedRequest objects in one round trip.
+
+    Consecutive addInstances for the same implementation are merged into a single upstream
+    call. Requests touching different services are dispatched concurrently, requests on
+    the same service (whatever their operation) run one at a time, in order. The response
+    holds one result per input item.
+    """
     try:
-        data = get_schema(adaption_schema_file)
-        return Response(
-            response=json.dumps(data),
-            status=200,
-            mimetype='application/json'
-        )
-    except FileNotFoundError as e:
-        print(e)
+        data = request_json()
+    except ValueError:
+        data = None
+    if isinstance(data, dict):
+        data = data.get("requests")
+    if not isinstance(data, list):
         return Response(
-            response=json.dumps({"error": "Schema file not found"}),
-            status=404,
+            response=codec.dumps({"error": "Expected a list of requests"}),
+            status=400,
             mimetype='application/json'
         )
 
+    results = [None] * len(data)
+    batch = []
+    for index, item in enumerate(data):
+        try:
+            batch.append((index, UnifiedRequest.decode(item)))
+        except InvalidRequest as e:
+            results[index] = {"status": 400, "response": {"error": str(e)}, "merged": False}
+
+    groups = {}
+    for indices, req in merge_add_instances(batch):
+        groups.setdefault(request_target(req), []).append((indices, req))
+
+    with ThreadPoolExecutor(max_workers=execute_max_workers, thread_name_prefix="execute-batch") as pool:
+        for group_results in pool.map(dispatch_group, groups.values()):
+            for indices, result in group_results:
+                for index in indices:
+                    results[index] = dict(result, merged=len(indices) > 1)
+
+    return Response(
+        response=codec.dumps({"results": results}),
+        status=200,
+        mimetype='application/json'
+    )
+
+
+def request_json():
+    """
+    The body of the request, decoded according to its Content-Type (JSON, with the fast codec,
+    or msgpack); raises ValueError if it has neither or cannot be decoded.
+    """
+    body_codec = codec.for_media_type(request.mimetype)
+    if body_codec is codec.JSON and not request.is_json:
+        raise ValueError("Expected a JSON or msgpack body")
+    return body_codec.loads(request.get_data())
+
+
+def merge_add_instances(batch):
+    """
+    Merge consecutive addInstances requests for the same implementation, summing numberOfInstances.
+
+    Requests are never reordered, so only runs of addInstances next to each other in the batch
+    are merged. `batch` is a list of (index, UnifiedRequest); returns a list of
+    (indices, UnifiedRequest) where `indices` are the positions in the original batch served
+    by that request.
+    """
+    merged = []
+    for index, req in batch:
+        if req.operation == "addInstances" and req.serviceImplementationName and req.numberOfInstances:
+            if merged:
+                indices, previous = merged[-1]
+                if previous.operation == "addInstances" and previous.numberOfInstances \
+                        and previous.serviceImplementationName == req.serviceImplementationName:
+                    indices.append(index)
+                    previous.numberOfInstances += req.numberOfInstances
+                    continue
+            req = replace(req)
+        merged.append(([index], req))
+    return merged
+
+
+def request_target(req):
+    """The service a request acts on; requests on the same service are not run concurrently."""
+    if req.operation in ("addInstances", "removeInstance"):
+        return service_of_implementation(req.serviceImplementationName) or req.serviceImplementationName
+    if req.operation == "changeLBWeights":
+        return req.weightsId
+    if req.operation == "changeProperty":
+        return req.serviceName
+    return req.operation
+
+
+def dispatch_group(group):
+    results = []
+    for indices, req in group:
+        try:
+            status, response = dispatch_request(req)
+        except Exception as e:
+            status, response = 500, {"error": str(e)}
+        results.append((indices, {"status": status, "response": response}))
+    return results
+
+
+def dispatch_request(req):
+    """Forward a single UnifiedRequest to the RAMSES service handling it; returns (status, body)."""
+    if req.operation == "addInstances":
+        if not req.serviceImplementationName or not req.numberOfInstances:
+            return 400, {"error": "Missing required fields for addInstances"}
+        # sefa-instance-manager
+        url = instances_manager_url + "/rest/addInstances"
+        headers = {
+            'Content-Type': 'application/json'
+        }
+        request_body = {
+            "serviceImplementationName": req.serviceImplementationName,
+            "numberOfInstances": req.numberOfInstances
+        }
+        response = codec.decode_response(upstream.post(url, headers=headers, data=codec.dumps(request_body)))
+
+    elif req.operation == "changeLBWeights":
+        if not req.weights:
+            return 400, {"error": "Missing weights for changeLBWeights"}
+        url = load_balancer_url + "/rest/changeLBWeights"
+        headers = {
+            'Content-Type': 'application/json'
+        }
+        request_body = {
+            "serviceID": req.weightsId,
+            "newWeights": req.weights,
+            "instancesToRemoveWeightOf": req.instancesToRemoveWeightOf
+        }
+        response = codec.decode_response(upstream.post(url, headers=headers, data=codec.dumps(request_body)))
+
+    elif req.operation == "changeProperty":
+        if not req.propertiesToChange:
+            return 400, {"error": "Missing properties for changeProperty"}
+        URL = load_balancer_url + "/rest/changeProperty"
+        headers = {
+            'Content-Type': 'application/json'
+        }
+        request_body = {
+            "serviceName": req.serviceName,
+            "propertyName" : req.propertiesName,
+            "value": req.propertiesToChange
+        }
+        response = {
+            "message": "Properties updated successfully",
+            "updatedProperties": req.propertiesToChange
+        }
+
+    elif req.operation == "removeInstance":
+
+        if not req.serviceImplementationName or not req.address or req.port is None:
+            return 400, {"error": "Missing required fields for removeInstance"}
+        # sefa instance manager
+        url = instances_manager_url + "/rest/removeInstance"
+        headers = {
+            'Content-Type': 'application/json'
+        }
+        request_body = {
+            "serviceImplementationName": req.serviceImplementationName,
+            "address": req.address,
+            "port": req.port
+        }
+
+        response = codec.decode_response(upstream.post(url, headers=headers, data=codec.dumps(request_body)))
+
+    else:
+        return 400, {"error": "Invalid operation"}
+
+    invalidate_probe_cache(req)
+    # The next /monitor (even one allowing any staleness) shows the adapted system
+    monitor_state.invalidate()
+    return 200, response
+
+
+@app.route('/execute_schema', methods=['GET'])
+def execute_schema():
+    return document_response(adaption_schema_file)
+
 @app.route('/restaurant-service-instance', methods=['GET'])
 def restaurant_service_instance():
     # Define the URL of the external endpoint
-    url = "http://127.0.0.1:32841/rest/service/RESTAURANT-SERVICE/instance/restaurant-service@sefa-restaurant-service:58085"
+    url = knowledge_url + "/rest/service/RESTAURANT-SERVICE/instance/restaurant-service@sefa-restaurant-service:58085"
     
     try:
         # Make a GET request to the external endpoint
-        response = requests.get(url)
+        response = upstream.get(url)
         response.raise_for_status()  # Raise an error for HTTP codes 4xx/5xx
         
         # Return the external service's response to the client
@@ -258,63 +580,130 @@ def restaurant_service_instance():
     except requests.exceptions.RequestException as e:
         # Handle any errors that occur during the request
         return Response(
-            response=json.dumps({"error": str(e)}),
+            response=codec.dumps({"error": str(e)}),
             status=500,
             mimetype='application/json'
         )
 
 def fetch_system_architecture():
+    return probe_cache.get((ARCHITECTURE,), _fetch_system_architecture)
+
+
+def fetch_instance_configuration(serviceName, implementationId):
+    return probe_cache.get((CONFIGURATION, serviceName, implementationId),
+                           lambda: _fetch_instance_configuration(serviceName, implementationId))
+
+
+def fetch_service_snapshot(serviceName):
+    return probe_cache.get((SNAPSHOT, serviceName), lambda: _fetch_service_snapshot(serviceName))
+
+
+def invalidate_probe_cache(req):
+    """Drop the cached probe data a successful adaptation has made stale."""
+    if req.operation in ("addInstances", "removeInstance"):
+        service_name = service_of_implementation(req.serviceImplementationName)
+        probe_cache.invalidate(ARCHITECTURE)
+        probe_cache.invalidate(SNAPSHOT, service_name)
+        probe_cache.invalidate(CONFIGURATION, service_name)
+    elif req.operation == "changeLBWeights":
+        probe_cache.invalidate(CONFIGURATION, req.weightsId)
+    elif req.operation == "changeProperty":
+        probe_cache.invalidate(CONFIGURATION, req.serviceName)
+
+
+def service_of_implementation(implementation_id):
+    """
+    The service currently running `implementation_id`, per the cached architecture or else the
+    latest monitor document (None if unknown).
+    """
+    services = probe_cache.peek((ARCHITECTURE,)) or monitor_state.snapshot()[0]
+    for service_name, details in services.items():
+        if details.get('currentImplementationId') == implementation_id:
+            return service_name
+    return None
+
+
+def _fetch_system_architecture():
     #probe
-    url = "http://localhost:32838/rest/systemArchitecture"
+    url = probe_url + "/rest/systemArchitecture"
 
     try:
-        response = requests.get(url)
+        response = upstream.get(url)
         response.raise_for_status()
         print("data fetched")
-        architecture_data = response.json()
+        architecture_data = codec.decode_response(response)
         return architecture_data
     except requests.exceptions.RequestException as e:
         print(e)
         return None
 
 
-def fetch_instance_configuration(serviceName, implementationId):
+def _fetch_instance_configuration(serviceName, implementationId):
     #probe
-    url = "http://localhost:32838/rest/service/{}/configuration?implementationId={}".format(serviceName,
-                                                                                            implementationId)
+    url = probe_url + "/rest/service/{}/configuration?implementationId={}".format(serviceName, implementationId)
     try:
-        response = requests.get(url)
+        response = upstream.get(url)
         response.raise_for_status()
         print("instance configuration data fetched")
-        instance_configuration = response.json()
+        instance_configuration = codec.decode_response(response)
         return instance_configuration
     except requests.exceptions.RequestException as e:
         print(e)
         return None
 
 
-def fetch_service_snapshot(serviceName):
+def _fetch_service_snapshot(serviceName):
     #probe
-    url = "http://localhost:32838/rest/service/{}/snapshot".format(serviceName)
+    url = probe_url + "/rest/service/{}/snapshot".format(serviceName)
     try:
-        response = requests.get(url)
+        response = upstream.get(url)
         response.raise_for_status()
         print("snapshot data fetched")
-        snapshot_data = response.json()
+        snapshot_data = codec.decode_response(response)
         return snapshot_data
     except requests.exceptions.RequestException as e:
         print(e)
         return None
 
 
-def get_schema(file):
+def load_document(file):
+    """
+    Return (data, body, etag) for a JSON document under specifications/.
+
+    Documents are parsed and serialised once and kept in memory until the file's
+    modification time changes. Raises FileNotFoundError if the file does not exist.
+    """
+    mtime = os.stat(file).st_mtime_ns
+    cached = _document_cache.get(file)
+    if cached is None or cached[0] != mtime:
+        with open(file, "rb") as document_file:
+            data = codec.loads(document_file.read())
+        body = codec.dumps(data)
+        etag = hashlib.sha256(body).hexdigest()[:32]
+        cached = (mtime, data, body, etag)
+        _document_cache[file] = cached
+    return cached[1:]
+
+
+def document_response(file):
+    """Serve a cached document, answering 304 Not Modified when the client's ETag matches."""
     try:
-        with open(file, "r") as schema_file:
-            schema = json.load(schema_file)
-            return schema
+        data, body, etag = load_document(file)
     except FileNotFoundError as e:
         print(e)
-        return None
+        return Response(
+            response=codec.dumps({"error": "Schema file not found"}),
+            status=404,
+            mimetype='application/json'
+        )
+    response = Response(
+        response=body,
+        status=200,
+        mimetype='application/json'
+    )
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 
 if __name__ == '__main__':
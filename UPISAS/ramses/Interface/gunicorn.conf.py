@@ -0,0 +1,39 @@
+"""
+Production serving of the interface, instead of Flask's development server:
+
+    gunicorn -c gunicorn.conf.py api:app
+
+With the default gevent workers, every request runs in a greenlet and the upstream calls
+(requests, and the /monitor fan-out threads) yield while waiting on the network, so many
+clients can poll /monitor, /monitor/stream and /execute concurrently. Set
+RAMSES_INTERFACE_WORKER_CLASS=gthread to use a pool of OS threads instead.
+
+The monitor state, probe cache and prefetcher live in the worker process, and an /execute
+only invalidates those of the worker that handled it: with more workers, the others would
+serve the topology from before the adaptation until their cache entries expire, and their
+/monitor/stream deltas would disagree. The interface is therefore served by exactly one
+worker; concurrency comes from its greenlets (or threads), and other worker counts are
+rejected at startup.
+"""
+
+import os
+
+bind = os.environ.get("RAMSES_INTERFACE_BIND", "0.0.0.0:41248")
+worker_class = os.environ.get("RAMSES_INTERFACE_WORKER_CLASS", "gevent")
+workers = int(os.environ.get("RAMSES_INTERFACE_WORKERS", "1"))
+# Concurrent requests per worker: greenlets for gevent, threads for gthread.
+worker_connections = int(os.environ.get("RAMSES_INTERFACE_CONNECTIONS", "1000"))
+threads = int(os.environ.get("RAMSES_INTERFACE_THREADS", "32"))
+# Strategies poll every few seconds; keep their connections open in between.
+keepalive = 30
+# /monitor/stream responses last as long as the client listens.
+timeout = 0
+graceful_timeout = 5
+accesslog = None
+
+
+def on_starting(server):
+    # Also catches a worker count given on the command line (-w)
+    if server.cfg.workers != 1:
+        raise RuntimeError(f"the RAMSES interface must run in 1 worker, not {server.cfg.workers}: "
+                           "the probe cache and monitor state are per process (see gunicorn.conf.py)")
@@ -0,0 +1,103 @@
+"""Versioned monitor document, from which /monitor/stream sends each client only what changed."""
+
+from collections import deque
+import threading
+import time
+
+
+class MonitorState:
+    """
+    The latest combined monitor document, with a version that increases whenever it changes.
+
+    Every change is kept as a delta, {"changed": {service: {field: value}}, "removed": [service]},
+    in a bounded history, so a client that is a few versions behind gets just the merged
+    deltas; a client that is further behind (or new) gets the full document.
+    """
+
+    def __init__(self, history_size=64):
+        self.version = 0
+        self.document = {}
+        self.updated_at = None  # Set on every update, even if nothing changed
+        self.built_at = None  # When the build of the latest document started
+        self.invalidated_at = None  # See invalidate
+        self._deltas = deque(maxlen=history_size)
+        self._condition = threading.Condition()
+        self._refresh_lock = threading.Lock()
+
+    def update(self, document, built_at=None):
+        changed = {}
+        for service_name, service_data in document.items():
+            previous = self.document.get(service_name, {})
+            fields = {field: value for field, value in service_data.items() if previous.get(field) != value}
+            if fields:
+                changed[service_name] = fields
+        removed = [service_name for service_name in self.document if service_name not in document]
+        with self._condition:
+            self.updated_at = time.monotonic()
+            self.built_at = self.updated_at if built_at is None else built_at
+            if changed or removed:
+                self.document = document
+                self.version += 1
+                self._deltas.append((self.version, changed, removed))
+                self._condition.notify_all()
+        return self.version
+
+    def refresh(self, build_document, max_age):
+        """
+        Rebuild the document with `build_document` if it is older than `max_age` seconds.
+
+        Concurrent callers share one rebuild: a caller that waited for another one's rebuild
+        takes its result, since it was built after the caller asked. A document invalidated
+        since its build started is rebuilt whatever `max_age` is.
+        """
+        requested_at = time.monotonic()
+        with self._refresh_lock:
+            updated_at = self.updated_at
+            if updated_at is not None and not self._invalidated() and \
+                    (updated_at >= requested_at or time.monotonic() - updated_at < max_age):
+                return
+            built_at = time.monotonic()
+            self.update(build_document(), built_at=built_at)
+
+    def invalidate(self):
+        """Have the next refresh rebuild the document, e.g. because an adaptation changed the system."""
+        with self._condition:
+            self.invalidated_at = time.monotonic()
+
+    def _invalidated(self):
+        with self._condition:
+            return self.invalidated_at is not None and self.built_at <= self.invalidated_at
+
+    def snapshot(self):
+        """The latest (document, version, age in seconds)."""
+        with self._condition:
+            age = time.monotonic() - self.updated_at if self.updated_at is not None else None
+            return self.document, self.version, age
+
+    def wait_for_change(self, version, timeout):
+        with self._condition:
+            self._condition.wait_for(lambda: self.version != version, timeout=timeout)
+            return self.version
+
+    def event_since(self, version):
+        """
+        The event bringing a client at `version` up to date: ("delta", payload), ("full", payload),
+        or None if the client already has the latest version.
+        """
+        with self._condition:
+            if version == self.version:
+                return None
+            oldest = self._deltas[0][0] if self._deltas else None
+            if version is None or oldest is None or version < oldest - 1 or version > self.version:
+                return "full", {"version": self.version, "document": self.document}
+            changed, removed = {}, set()
+            for delta_version, delta_changed, delta_removed in self._deltas:
+                if delta_version <= version:
+                    continue
+                for service_name, fields in delta_changed.items():
+                    changed.setdefault(service_name, {}).update(fields)
+                    removed.discard(service_name)
+                for service_name in delta_removed:
+                    changed.pop(service_name, None)
+                    removed.add(service_name)
+            return "delta", {"version": self.version, "changed": changed, "removed": sorted(removed)}
@@ -0,0 +1,49 @@
+"""Background thread keeping the monitor document fresh, so /monitor can answer from memory."""
+
+import logging
+import threading
+
+
+class MonitorPrefetcher:
+    """
+    Rebuilds the document held by a MonitorState every `interval` seconds.
+
+    `interval` <= 0 disables prefetching: the thread is never started and /monitor
+    falls back to building the document inside the request.
+    """
+
+    def __init__(self, state, build_document, interval):
+        self.state = state
+        self.build_document = build_document
+        self.interval = interval
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.interval > 0
+
+    def start(self):
+        if not self.enabled or self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="monitor-prefetcher", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                # Another request may just have refreshed synchronously; do not poll twice.
+                self.state.refresh(self.build_document, max_age=self.interval / 2)
+            except Exception as e:
+                logging.error(f"monitor prefetch failed: {e}")
+            self._stop.wait(self.interval)
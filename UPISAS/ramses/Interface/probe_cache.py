@@ -0,0 +1,69 @@
+"""TTL cache for probe responses, with a separate lifetime for each kind of data."""
+
+import os
+import threading
+import time
+
+from UPISAS.instrumentation import REGISTRY
+
+ARCHITECTURE = "architecture"
+CONFIGURATION = "configuration"
+SNAPSHOT = "snapshot"
+
+# Seconds a probe response stays valid; 0 disables caching for that kind of data.
+PROBE_TTLS = {
+    ARCHITECTURE: float(os.environ.get("RAMSES_ARCHITECTURE_TTL", "30")),
+    CONFIGURATION: float(os.environ.get("RAMSES_CONFIGURATION_TTL", "30")),
+    SNAPSHOT: float(os.environ.get("RAMSES_SNAPSHOT_TTL", "1")),
+}
+
+
+class ProbeCache:
+    """
+    Entries are keyed by (kind, service name, ...). Failed fetches (None) are never cached,
+    so an unreachable probe is retried on the next request. Neither is a value whose fetch
+    overlapped an invalidation of its key, as it may predate the change that invalidated it.
+    """
+
+    def __init__(self, ttls=None):
+        self.ttls = dict(PROBE_TTLS, **(ttls or {}))
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._generation = 0  # Number of invalidations so far
+        self._invalidated = {}  # (kind, service name), None for all -> generation of its last invalidation
+
+    def get(self, key, loader):
+        ttl = self.ttls[key[0]]
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] < ttl:
+            REGISTRY.counter("ramses_probe_cache_requests_total", kind=key[0], result="hit").inc()
+            return entry[1]
+        REGISTRY.counter("ramses_probe_cache_requests_total", kind=key[0], result="miss").inc()
+        generation = self._generation
+        value = loader()
+        if value is not None and ttl > 0:
+            with self._lock:
+                if self._invalidated_since(key, generation):
+                    REGISTRY.counter("ramses_probe_cache_discarded_total", kind=key[0]).inc()
+                else:
+                    self._entries[key] = (time.monotonic(), value)
+        return value
+
+    def _invalidated_since(self, key, generation):
+        service_name = key[1] if len(key) > 1 else None
+        scopes = ((None, None), (None, service_name), (key[0], None), (key[0], service_name))
+        return any(self._invalidated.get(scope, 0) > generation for scope in scopes)
+
+    def peek(self, key):
+        """The cached value for `key`, even if expired, or None."""
+        entry = self._entries.get(key)
+        return entry[1] if entry is not None else None
+
+    def invalidate(self, kind=None, service_name=None):
+        """Drop the entries of one kind (all kinds by default), optionally only those of one service."""
+        with self._lock:
+            self._generation += 1
+            self._invalidated[(kind, service_name)] = self._generation
+            for key in list(self._entries):
+                if (kind is None or key[0] == kind) and (service_name is None or key[1:2] == (service_name,)):
+                    del self._entries[key]
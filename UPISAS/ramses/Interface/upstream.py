@@ -0,0 +1,51 @@
+"""Keep-alive connection pool shared by every call the interface makes to the RAMSES services."""
+
+import os
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from UPISAS.instrumentation import REGISTRY
+
+# (connect, read) timeout in seconds for calls to the probe, instance manager and load balancer.
+UPSTREAM_TIMEOUT = (
+    float(os.environ.get("RAMSES_UPSTREAM_CONNECT_TIMEOUT", "3.05")),
+    float(os.environ.get("RAMSES_UPSTREAM_READ_TIMEOUT", "30"))
+)
+# Keep-alive connections per upstream host; must be at least the /monitor fan-out width.
+UPSTREAM_POOL_MAXSIZE = int(os.environ.get("RAMSES_UPSTREAM_POOL_MAXSIZE", "16"))
+UPSTREAM_POOL_CONNECTIONS = int(os.environ.get("RAMSES_UPSTREAM_POOL_CONNECTIONS", "4"))
+
+
+class UpstreamSession(requests.Session):
+    def __init__(self, timeout=UPSTREAM_TIMEOUT, pool_connections=UPSTREAM_POOL_CONNECTIONS,
+                 pool_maxsize=UPSTREAM_POOL_MAXSIZE):
+        super().__init__()
+        self.timeout = timeout
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+        self.upstream_names = {}  # host:port -> name used in the metrics
+
+    def name_upstreams(self, **base_urls):
+        """Label the calls to each of `base_urls` with its keyword in the metrics, instead of its host:port."""
+        for name, base_url in base_urls.items():
+            self.upstream_names.setdefault(urlsplit(base_url).netloc, name)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        netloc = urlsplit(url).netloc
+        name = self.upstream_names.get(netloc, netloc)
+        try:
+            with REGISTRY.timer("ramses_upstream_request_seconds", upstream=name, method=method):
+                response = super().request(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            REGISTRY.counter("ramses_upstream_errors_total", upstream=name, method=method).inc()
+            raise
+        if response.status_code >= 500:
+            REGISTRY.counter("ramses_upstream_errors_total", upstream=name, method=method).inc()
+        return response
+
+
+session = UpstreamSession()
@@ -0,0 +1,157 @@
+import logging
+import random
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from UPISAS.exceptions import ServerNotReachable
+from UPISAS.http_pool import get_session
+
+
+class ReadinessProbe:
+    """
+    Tracks whether an exemplar's HTTP server is up.
+
+    The first call to `wait_until_ready` polls `url` with exponential backoff and
+    jitter until the server answers. The result is cached, so later calls return
+    immediately; `mark_unready` re-arms the probe after a failed request.
+    Any HTTP response below 500 counts as ready, since an exemplar does not need
+    to serve its root path to be reachable.
+    """
+
+    def __init__(self, url, initial_delay=0.25, max_delay=10.0, multiplier=2.0, jitter=0.5,
+                 max_wait=300.0, timeout=2.0):
+        self.url = url
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self._ready = False
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self._ready
+
+    def mark_unready(self):
+        if self._ready:
+            logging.warning(f"{self.url} marked as not ready, re-arming readiness probe")
+        self._ready = False
+
+    def backoff_delay(self, attempt):
+        """Delay before retry number `attempt` (0-based), with +/- `jitter` relative noise."""
+        delay = min(self.max_delay, self.initial_delay * self.multiplier ** attempt)
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def probe(self):
+        """Issue a single readiness request, updating the cached state."""
+        try:
+            response = get_session().get(self.url, timeout=self.timeout)
+            self._ready = response.status_code < 500
+        except requests.exceptions.RequestException:
+            self._ready = False
+        return self._ready
+
+    def wait_until_ready(self, max_wait=None):
+        if self._ready:
+            return True
+        max_wait = self.max_wait if max_wait is None else max_wait
+        with self._lock:
+            deadline = time.monotonic() + max_wait
+            attempt = 0
+            while not self.probe():
+                delay = self.backoff_delay(attempt)
+                if time.monotonic() + delay > deadline:
+                    logging.error(f"{self.url} not ready after {max_wait} seconds")
+                    raise ServerNotReachable
+                logging.info(f"waiting for {self.url} to be ready, retrying in {delay:.2f}s")
+                time.sleep(delay)
+                attempt += 1
+            logging.info(f"{self.url} is ready")
+        return True
+
+
+def port_answers(host, port, timeout=2.0):
+    """
+    Whether a server answers on host:port. A successful connect is not enough, since docker
+    accepts connections on published ports before the container listens: it must also send
+    something back (an HTTP response, or e.g. the greeting of a database).
+    """
+    try:
+        with socket.create_connection((host, port), timeout=timeout) as connection:
+            connection.sendall(f"GET / HTTP/1.0\r\nHost: {host}\r\n\r\n".encode())
+            return bool(connection.recv(1))
+    except OSError:
+        return False
+
+
+class StackReadiness:
+    """
+    Waits until the services of a docker compose project (see UPISAS.compose.load_services) are up.
+
+    Every service is polled in its own thread, starting as soon as the services it depends on
+    are ready. A service is ready when all its published ports answer, or, if it has an entry
+    in `health_paths`, when that path answers with a status below 400. Services without
+    published ports are ready once their dependencies are.
+    """
+
+    def __init__(self, services, host="127.0.0.1", health_paths=None, poll_interval=0.5, timeout=2.0):
+        self.services = services
+        self.host = host
+        self.health_paths = health_paths or {}
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+
+    def service_ready(self, name):
+        service = self.services[name]
+        if name in self.health_paths and service.ports:
+            url = f"http://{self.host}:{service.ports[0][0]}/{self.health_paths[name].lstrip('/')}"
+            try:
+                return get_session().get(url, timeout=self.timeout).status_code < 400
+            except requests.exceptions.RequestException:
+                return False
+        return all(port_answers(self.host, published, self.timeout) for published, _ in service.ports)
+
+    def wait_until_ready(self, max_wait=300.0, services=None):
+        """Block until `services` (all by default) and their dependencies are ready."""
+        names = self._with_dependencies(services or list(self.services))
+        ready = {name: threading.Event() for name in names}
+        started = time.monotonic()
+        deadline = started + max_wait
+
+        def wait_for(name):
+            for dependency in self.services[name].depends_on:
+                if dependency in ready and not ready[dependency].wait(max(0.0, deadline - time.monotonic())):
+                    return False
+            while not self.service_ready(name):
+                if time.monotonic() + self.poll_interval > deadline:
+                    return False
+                time.sleep(self.poll_interval)
+            logging.info(f"{name} is ready after {time.monotonic() - started:.1f}s")
+            ready[name].set()
+            return True
+
+        if names:
+            with ThreadPoolExecutor(max_workers=len(names), thread_name_prefix="stack-readiness") as executor:
+                results = dict(zip(names, executor.map(wait_for, names)))
+            not_ready = [name for name, is_ready in results.items() if not is_ready]
+            if not_ready:
+                logging.error(f"services not ready after {max_wait} seconds: {', '.join(not_ready)}")
+                raise ServerNotReachable
+        logging.info(f"{len(names)} service(s) ready after {time.monotonic() - started:.1f}s")
+        return True
+
+    def _with_dependencies(self, names):
+        result = []
+        pending = list(names)
+        while pending:
+            name = pending.pop()
+            if name in self.services and name not in result:
+                result.append(name)
+                pending.extend(self.services[name].depends_on)
+        return [name for name in self.services if name in result]
@@ -0,0 +1,101 @@
+"""
+Several experiment runs on one host at the same time: every run takes a slot, i.e. a compose
+project name and a port offset that no other run on the host holds, and adds the offset to
+every port it publishes or connects to.
+
+Slots are held with a lock file per slot, so runs in different processes (e.g. run table rows
+in a process pool) never share one, and the slot of a process that dies is free again.
+"""
+
+import errno
+import fcntl
+import logging
+import os
+import socket
+import tempfile
+
+from UPISAS.exceptions import NoRunSlotAvailable
+
+DEFAULT_SLOT_COUNT = 32
+# Ports between the ones of two consecutive slots; the published ports of a run must span fewer
+DEFAULT_PORT_STRIDE = 100
+DEFAULT_LOCK_DIR = os.path.join(tempfile.gettempdir(), "upisas-run-slots")
+
+
+class RunSlot:
+    """
+    The compose project name and port offset of one run. Slot 0 keeps the default ports and
+    the plain project name, so a single run looks exactly as without isolation.
+    """
+
+    def __init__(self, index, project_name, port_offset, lock_file=None):
+        self.index = index
+        self.project_name = project_name
+        self.port_offset = port_offset
+        self._lock_file = lock_file
+
+    def port(self, base_port):
+        """The port of this run standing for `base_port`."""
+        return base_port + self.port_offset
+
+    def url(self, base_url):
+        """`base_url` ("http://host:port"), with the port of this run."""
+        prefix, _, port = base_url.rstrip("/").rpartition(":")
+        return f"{prefix}:{self.port(int(port))}"
+
+    def release(self):
+        """Frees the slot for other runs; the ports must no longer be in use by then."""
+        if self._lock_file is not None:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            self._lock_file.close()
+            self._lock_file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    def __repr__(self):
+        return f"RunSlot({self.index}, project_name={self.project_name!r}, port_offset={self.port_offset})"
+
+
+def allocate_run_slot(name, ports=(), slot_count=DEFAULT_SLOT_COUNT, port_stride=DEFAULT_PORT_STRIDE,
+                      lock_dir=DEFAULT_LOCK_DIR):
+    """
+    Takes the first slot of `name` that no other run holds and at whose offset all of `ports`
+    (the default ports of the run) are free, e.g. not still published by a stack left running.
+
+    Raises NoRunSlotAvailable if there is none among the first `slot_count`.
+    """
+    os.makedirs(lock_dir, exist_ok=True)
+    for index in range(slot_count):
+        lock_file = open(os.path.join(lock_dir, f"{name}-{index}.lock"), "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError as e:
+            lock_file.close()
+            if e.errno in (errno.EAGAIN, errno.EACCES):
+                continue
+            raise
+        slot = RunSlot(index, name if index == 0 else f"{name}-{index}", index * port_stride, lock_file)
+        busy = [slot.port(port) for port in ports if not port_free(slot.port(port))]
+        if busy:
+            logging.debug(f"skipping run slot {index} of {name}, ports in use: {busy}")
+            slot.release()
+            continue
+        logging.info(f"allocated {slot}")
+        return slot
+    raise NoRunSlotAvailable(f"all {slot_count} run slots of {name} are taken")
+
+
+def port_free(port, host="0.0.0.0"):
+    """Whether a server could listen on `port` right now."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        # As servers do, so that connections of a previous run in TIME_WAIT do not count
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            s.bind((host, port))
+        except OSError:
+            return False
+    return True
@@ -0,0 +1,209 @@
+"""
+An append-only log of a run: every monitor tick, analysis and executed plan, written in chunks
+to a directory (by the experiment runner configs, `<run_dir>/run_log`) and read back through
+memory maps, so that post-run analysis never has to load the whole run.
+
+The directory holds:
+- records.bin: one record per entry, a header (kind, time, payload length; see RECORD_HEADER)
+  followed by the entry as JSON.
+- index.bin: one INDEX_DTYPE row per record (time, kind, payload offset and length), the time
+  index of the log.
+- metrics.bin: one METRIC_DTYPE row per numeric value of every monitor tick (see
+  UPISAS.knowledge.monitored_values), with the service, instance and metric as name ids.
+- names.txt: the names of those ids, one JSON string per line; id 0 is None.
+
+Records, metric rows and names are written before the index rows pointing to them, so a log
+cut short (e.g. by a crash) reads as if it had ended at its last complete chunk.
+"""
+
+import mmap
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+from UPISAS import codec
+from UPISAS.knowledge import monitored_values
+
+MONITOR = "monitor"
+ANALYSIS = "analysis"
+PLAN = "plan"
+EXECUTE = "execute"
+KINDS = (MONITOR, ANALYSIS, PLAN, EXECUTE)
+
+RECORD_HEADER = struct.Struct("<BdI")
+INDEX_DTYPE = np.dtype([("time", "<f8"), ("kind", "u1"), ("offset", "<u8"), ("length", "<u4")])
+METRIC_DTYPE = np.dtype([("record", "<u4"), ("time", "<f8"), ("service", "<u4"), ("instance", "<u4"),
+                         ("metric", "<u4"), ("value", "<f8")])
+_INDEX_ROW = struct.Struct("<dBQI")
+_METRIC_ROW = struct.Struct("<IdIIId")
+
+RECORDS_FILE = "records.bin"
+INDEX_FILE = "index.bin"
+METRICS_FILE = "metrics.bin"
+NAMES_FILE = "names.txt"
+
+# Bytes buffered before they are written out
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+
+class RunRecorder:
+    """Writes a new log to `directory`, replacing any log already there."""
+
+    def __init__(self, directory, chunk_size=DEFAULT_CHUNK_SIZE):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()
+        self._names = {None: 0}
+        self._files = {file_name: open(os.path.join(directory, file_name), "wb")
+                       for file_name in (RECORDS_FILE, METRICS_FILE, NAMES_FILE, INDEX_FILE)}
+        self._buffers = {file_name: bytearray() for file_name in self._files}
+        self._buffers[NAMES_FILE] += b"null\n"
+        self._offset = 0
+        self.count = 0
+
+    def append(self, kind, document, timestamp=None):
+        """
+        Append `document` (JSON-serialisable) as an entry of `kind`; the numeric values of a
+        monitor tick also go to the metrics. Returns the number of the entry.
+        """
+        code = KINDS.index(kind)
+        timestamp = time.time() if timestamp is None else timestamp
+        payload = codec.dumps(document)
+        values = list(monitored_values(document)) if kind == MONITOR else ()
+        with self._lock:
+            record = self.count
+            self._buffers[RECORDS_FILE] += RECORD_HEADER.pack(code, timestamp, len(payload))
+            self._buffers[RECORDS_FILE] += payload
+            payload_offset = self._offset + RECORD_HEADER.size
+            self._offset = payload_offset + len(payload)
+            metrics = self._buffers[METRICS_FILE]
+            for service_id, instance_id, metric, value in values:
+                metrics += _METRIC_ROW.pack(record, timestamp, self._name_id(service_id),
+                                            self._name_id(instance_id), self._name_id(metric), value)
+            self._buffers[INDEX_FILE] += _INDEX_ROW.pack(timestamp, code, payload_offset, len(payload))
+            self.count += 1
+            if sum(len(buffer) for buffer in self._buffers.values()) >= self.chunk_size:
+                self._flush()
+        return record
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            for file in self._files.values():
+                file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _name_id(self, name):
+        name_id = self._names.get(name)
+        if name_id is None:
+            name_id = self._names[name] = len(self._names)
+            self._buffers[NAMES_FILE] += codec.STDLIB_JSON.dumps(str(name)) + b"\n"
+        return name_id
+
+    def _flush(self):
+        # The index last, so that it only ever points to data that has been written
+        for file_name in (RECORDS_FILE, METRICS_FILE, NAMES_FILE, INDEX_FILE):
+            buffer = self._buffers[file_name]
+            if buffer:
+                self._files[file_name].write(buffer)
+                self._files[file_name].flush()
+                buffer.clear()
+
+
+class RunLog:
+    """
+    Reads a log written by RunRecorder. `index` and `metrics` are read-only memory-mapped
+    structured arrays (see INDEX_DTYPE and METRIC_DTYPE); entries are decoded one at a time.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.names = _read_names(directory)
+        self._name_ids = {name: name_id for name_id, name in enumerate(self.names)}
+        self._records_file = open(os.path.join(directory, RECORDS_FILE), "rb")
+        size = os.fstat(self._records_file.fileno()).st_size
+        self._data = mmap.mmap(self._records_file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        index = _memmap(os.path.join(directory, INDEX_FILE), INDEX_DTYPE)
+        complete = len(index)
+        while complete and int(index["offset"][complete - 1]) + int(index["length"][complete - 1]) > size:
+            complete -= 1
+        self.index = index[:complete]
+        metrics = _memmap(os.path.join(directory, METRICS_FILE), METRIC_DTYPE)
+        self.metrics = metrics[:np.searchsorted(metrics["record"], len(self.index))]
+
+    def __len__(self):
+        return len(self.index)
+
+    def kind(self, record):
+        return KINDS[self.index["kind"][record]]
+
+    def document(self, record):
+        """The entry numbered `record`, decoded."""
+        return codec.loads(self.payload(record))
+
+    def payload(self, record):
+        """The entry numbered `record`, as the JSON bytes it was written as."""
+        offset, length = int(self.index["offset"][record]), int(self.index["length"][record])
+        return self._data[offset:offset + length]
+
+    def records(self, kind=None, start=None, end=None):
+        """(time, kind, document) of the entries of `kind` (all by default) in [start, end), in order."""
+        times = self.index["time"]
+        first = 0 if start is None else int(np.searchsorted(times, start, side="left"))
+        last = len(times) if end is None else int(np.searchsorted(times, end, side="left"))
+        code = None if kind is None else KINDS.index(kind)
+        kinds = self.index["kind"]
+        for record in range(first, last):
+            if code is None or kinds[record] == code:
+                yield float(times[record]), KINDS[kinds[record]], self.document(record)
+
+    def series(self, metric, service=None, instance=None):
+        """(times, values) of `metric` over the run, for one service and instance (None: not per service/instance)."""
+        ids = [self._name_ids.get(name) for name in (metric, service, instance)]  # None has id 0
+        if None in ids:
+            return np.empty(0), np.empty(0)
+        metric_id, service_id, instance_id = ids
+        rows = self.metrics
+        mask = (rows["metric"] == metric_id) & (rows["service"] == service_id) & (rows["instance"] == instance_id)
+        return rows["time"][mask], rows["value"][mask]
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._records_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _read_names(directory):
+    path = os.path.join(directory, NAMES_FILE)
+    if not os.path.exists(path):
+        return [None]
+    with open(path, "rb") as f:
+        # The last line is only complete (and a name) if it ends with a newline
+        return [codec.loads(line) for line in f.read().split(b"\n")[:-1]]
+
+
+def _memmap(path, dtype):
+    size = os.path.getsize(path) if os.path.exists(path) else 0
+    rows = size // dtype.itemsize
+    if not rows:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(rows,))
@@ -0,0 +1,145 @@
+"""
+A compact, parsed form of RAMSES monitored data, which a strategy can keep instead of the raw
+JSON (see Strategy.compact_monitor_data).
+
+Every service becomes one ServiceRecord and every instance an InstanceRecord. Ids and statuses
+are interned, so they are shared across ticks instead of being allocated again for every
+response. The per-instance values of a service are kept in typed arrays, one entry per
+instance, with NaN for missing values.
+"""
+
+from array import array
+import math
+import sys
+
+# Per-instance values kept for every snapshot: whether the instance was failed / unreachable
+# (1 or 0), and the reported QoS values.
+FAILED = "failed"
+UNREACHABLE = "unreachable"
+RESPONSE_TIME = "responseTime"
+AVAILABILITY = "availability"
+METRICS = (FAILED, UNREACHABLE, RESPONSE_TIME, AVAILABILITY)
+
+_intern = sys.intern
+
+
+class InstanceRecord:
+    __slots__ = ("instance_id", "status", "snapshot_id", "timestamp", "service", "index")
+
+    def __init__(self, instance_id, status, snapshot_id, timestamp, service, index):
+        self.instance_id = instance_id
+        self.status = status
+        self.snapshot_id = snapshot_id
+        self.timestamp = timestamp
+        self.service = service
+        self.index = index  # Position of this instance in the arrays of its service
+
+    def metric(self, name):
+        return self.service.metrics[name][self.index]
+
+    def __repr__(self):
+        return f"InstanceRecord({self.instance_id!r}, status={self.status!r})"
+
+
+class ServiceRecord:
+    __slots__ = ("service_id", "implementation_id", "instances", "metrics")
+
+    def __init__(self, service_id, implementation_id):
+        self.service_id = service_id
+        self.implementation_id = implementation_id
+        self.instances = []
+        self.metrics = {metric: array("d") for metric in METRICS}
+
+    def __len__(self):
+        return len(self.instances)
+
+    def add_snapshot(self, snapshot):
+        """Append the instance of a raw snapshot, and its values."""
+        status = snapshot.get("status")
+        instance = InstanceRecord(_intern_or_none(snapshot.get("instanceId")), _intern_or_none(status),
+                                  snapshot.get("id"), snapshot.get("timestamp"), self, len(self.instances))
+        self.instances.append(instance)
+        for metric, value in zip(METRICS, snapshot_metrics(snapshot)):
+            self.metrics[metric].append(value)
+        return instance
+
+    def __repr__(self):
+        return f"ServiceRecord({self.service_id!r}, implementation_id={self.implementation_id!r}, " \
+               f"instances={len(self.instances)})"
+
+
+class MonitorSnapshot:
+    """
+    The services of one monitor response, by service id. Reads like the raw response at the
+    top level (`snapshot[service_id]`, `items()`, `len()`), with ServiceRecords as values.
+    """
+    __slots__ = ("services",)
+
+    def __init__(self, services=None):
+        self.services = services or {}
+
+    @classmethod
+    def parse(cls, monitored_data):
+        """Parse a RAMSES monitor response; values that are not service objects are left out."""
+        services = {}
+        for service_id, service_data in monitored_data.items():
+            if not isinstance(service_data, dict):
+                continue
+            service_id = _intern(service_id)
+            service = services[service_id] = ServiceRecord(
+                service_id, _intern_or_none(service_data.get("currentImplementationId")))
+            for snapshot in service_data.get("snapshot") or []:
+                service.add_snapshot(snapshot)
+        return cls(services)
+
+    def __getitem__(self, service_id):
+        return self.services[service_id]
+
+    def __contains__(self, service_id):
+        return service_id in self.services
+
+    def __iter__(self):
+        return iter(self.services)
+
+    def __len__(self):
+        return len(self.services)
+
+    def get(self, service_id, default=None):
+        return self.services.get(service_id, default)
+
+    def keys(self):
+        return self.services.keys()
+
+    def values(self):
+        return self.services.values()
+
+    def items(self):
+        return self.services.items()
+
+    def instance_count(self):
+        return sum(len(service) for service in self.services.values())
+
+    def __repr__(self):
+        return f"MonitorSnapshot({len(self.services)} services, {self.instance_count()} instances)"
+
+
+def snapshot_metrics(snapshot):
+    """The values of the METRICS of a raw snapshot, in that order, with NaN for missing values."""
+    status = snapshot.get("status")
+    qos = snapshot.get("qos") or {}
+    return (1.0 if status == "FAILED" or snapshot.get("failed") else 0.0,
+            1.0 if status == "UNREACHABLE" or snapshot.get("unreachable") else 0.0,
+            _as_float(qos.get(RESPONSE_TIME)),
+            _as_float(qos.get(AVAILABILITY)))
+
+
+def _intern_or_none(value):
+    return _intern(value) if isinstance(value, str) else value
+
+
+def _as_float(value):
+    if value is None:
+        return math.nan
+    if isinstance(value, str):
+        return float(value.rstrip("%"))
+    return float(value)
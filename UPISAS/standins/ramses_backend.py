@@ -0,0 +1,271 @@
+"""
+A Python stand-in for the RAMSES services the interface (ramses/Interface/api.py) talks to:
+the probe, the instances manager and the load balancer.
+
+It serves all their endpoints from one HTTP server, so the interface can run without the
+docker-compose stack by pointing RAMSES_PROBE_URL, RAMSES_INSTANCES_MANAGER_URL and
+RAMSES_LOAD_BALANCER_URL at it:
+
+    python -m UPISAS.standins.ramses_backend --services 100 --instances 3 --port 32838
+"""
+
+import argparse
+import json
+import random
+import socket
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, unquote
+
+
+class RamsesBackend:
+    """
+    The simulated state: `services` services with `instances` instances each.
+
+    Every request waits `latency` seconds (plus up to `latency_jitter`), and fails with a 500
+    with probability `failure_rate`. Each instance is reported FAILED with probability
+    `instance_failure_rate` in its snapshots.
+    """
+
+    def __init__(self, services=10, instances=2, latency=0.0, latency_jitter=0.0, failure_rate=0.0,
+                 instance_failure_rate=0.0, seed=None):
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.failure_rate = failure_rate
+        self.instance_failure_rate = instance_failure_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.snapshot_id = 0
+        self.next_port = 50000
+        self.services = {}
+        self.weights = {}
+        for i in range(services):
+            service_name = f"SERVICE-{i}"
+            self.services[service_name] = {
+                "serviceId": service_name,
+                "currentImplementationId": f"service-{i}",
+                "instances": [self._new_instance(f"service-{i}") for _ in range(instances)]
+            }
+
+    def _new_instance(self, implementation_id):
+        self.next_port += 1
+        return f"{implementation_id}@{implementation_id}:{self.next_port}"
+
+    def _service_of_implementation(self, implementation_id):
+        for service in self.services.values():
+            if service["currentImplementationId"] == implementation_id:
+                return service
+        return None
+
+    def system_architecture(self):
+        with self.lock:
+            return {name: dict(service, instances=list(service["instances"]))
+                    for name, service in self.services.items()}
+
+    def snapshot(self, service_name):
+        with self.lock:
+            service = self.services.get(service_name)
+            if service is None:
+                return None
+            snapshots = []
+            timestamp = datetime.now(timezone.utc).isoformat()
+            for instance_id in service["instances"]:
+                self.snapshot_id += 1
+                failed = self.random.random() < self.instance_failure_rate
+                snapshots.append({
+                    "id": self.snapshot_id,
+                    "serviceId": service_name,
+                    "instanceId": instance_id,
+                    "status": "FAILED" if failed else "ACTIVE",
+                    "cpuUsage": self.random.random(),
+                    "diskTotalSpace": 100.0,
+                    "diskFreeSpace": 50.0,
+                    "timestamp": timestamp,
+                    "active": not failed,
+                    "shutdown": False,
+                    "unreachable": False,
+                    "failed": failed,
+                    "booting": False
+                })
+            return snapshots
+
+    def configuration(self, service_name):
+        with self.lock:
+            service = self.services.get(service_name)
+            if service is None:
+                return None
+            instances = service["instances"]
+            weights = self.weights.get(service_name) or {i: 1 / len(instances) for i in instances}
+            return {
+                "serviceId": service_name,
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "loadBalancerWeights": weights,
+                "loadBalancerType": "WEIGHTED_RANDOM"
+            }
+
+    def add_instances(self, body):
+        with self.lock:
+            service = self._service_of_implementation(body["serviceImplementationName"])
+            if service is None:
+                return None
+            added = [self._new_instance(service["currentImplementationId"])
+                     for _ in range(int(body["numberOfInstances"]))]
+            service["instances"].extend(added)
+            self.weights.pop(service["serviceId"], None)
+            return {
+                "serviceImplementationName": body["serviceImplementationName"],
+                "dockerizedInstances": [{"address": i.split("@")[1].split(":")[0], "port": int(i.rsplit(":", 1)[1])}
+                                        for i in added]
+            }
+
+    def remove_instance(self, body):
+        with self.lock:
+            service = self._service_of_implementation(body["serviceImplementationName"])
+            if service is None:
+                return None
+            instance_id = f"{body['serviceImplementationName']}@{body['address']}:{body['port']}"
+            if instance_id not in service["instances"]:
+                return None
+            service["instances"].remove(instance_id)
+            self.weights.pop(service["serviceId"], None)
+            return {"serviceImplementationName": body["serviceImplementationName"],
+                    "address": body["address"], "port": body["port"]}
+
+    def change_lb_weights(self, body):
+        with self.lock:
+            if body.get("serviceID") not in self.services:
+                return None
+            weights = dict(body.get("newWeights") or {})
+            for instance_id in body.get("instancesToRemoveWeightOf") or []:
+                weights.pop(instance_id, None)
+            self.weights[body["serviceID"]] = weights
+            return {"serviceID": body["serviceID"], "newWeights": weights}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the Spring services
+
+    def setup(self):
+        super().setup()
+        # Headers and body are separate writes; without this, Nagle + delayed ACK add ~40 ms per response
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_GET(self):
+        path = urlparse(self.path).path.rstrip("/").split("/")
+        backend = self.server.backend
+        if not self._simulate_upstream():
+            return
+        if path[1:] == ["rest", "systemArchitecture"]:
+            self._reply(backend.system_architecture())
+        elif len(path) == 5 and path[1:3] == ["rest", "service"] and path[4] == "snapshot":
+            self._reply(backend.snapshot(unquote(path[3])))
+        elif len(path) == 5 and path[1:3] == ["rest", "service"] and path[4] == "configuration":
+            self._reply(backend.configuration(unquote(path[3])))
+        else:
+            self._reply(None)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        path = urlparse(self.path).path.rstrip("/")
+        backend = self.server.backend
+        if not self._simulate_upstream():
+            return
+        handlers = {
+            "/rest/addInstances": backend.add_instances,
+            "/rest/removeInstance": backend.remove_instance,
+            "/rest/changeLBWeights": backend.change_lb_weights,
+        }
+        self._reply(handlers[path](body) if path in handlers else None)
+
+    def _simulate_upstream(self):
+        backend = self.server.backend
+        if backend.latency or backend.latency_jitter:
+            time.sleep(backend.latency + backend.random.random() * backend.latency_jitter)
+        if backend.failure_rate and backend.random.random() < backend.failure_rate:
+            self._reply({"error": "simulated failure"}, status=500)
+            return False
+        return True
+
+    def _reply(self, data, status=200):
+        if data is None:
+            data, status = {"error": "not found"}, 404
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # The interface opens many connections at once; the default backlog of 5 drops some of them
+    request_queue_size = 128
+
+
+class RamsesStandIn:
+    """
+    Runs a RamsesBackend behind an HTTP server on a background thread.
+
+        with RamsesStandIn(services=100) as standin:
+            os.environ["RAMSES_PROBE_URL"] = standin.url
+            ...
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, **backend_kwargs):
+        self.backend = RamsesBackend(**backend_kwargs)
+        self.server = _Server((host, port), _Handler)
+        self.server.backend = self.backend
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="ramses-standin", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stand-in for the RAMSES probe, instances manager and load balancer")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=32838)
+    parser.add_argument("--services", type=int, default=10)
+    parser.add_argument("--instances", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--latency-jitter", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="probability of answering 500")
+    parser.add_argument("--instance-failure-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+    standin = RamsesStandIn(host=args.host, port=args.port, services=args.services, instances=args.instances,
+                            latency=args.latency, latency_jitter=args.latency_jitter,
+                            failure_rate=args.failure_rate, instance_failure_rate=args.instance_failure_rate,
+                            seed=args.seed)
+    print(f"RAMSES stand-in available at {standin.url}")
+    try:
+        standin.server.serve_forever()
+    except KeyboardInterrupt:
+        standin.server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,7 @@
+import logging
+
+from UPISAS.analysis import IncrementalAnalyzer, FAILED, UNREACHABLE, AVAILABILITY, RESPONSE_TIME
+from UPISAS.knowledge import MonitoredHistory
 from UPISAS.strategy import Strategy
 
 #This is a port of the ReactiveAdaptationManager originally published alongside SWIM.
@@ -13,61 +17,45 @@ class ReactiveAdaptationManager(Strategy):
         # Initialize RAMSES configuration parameters
         self.analysis_window_size = 5  # Example value
         self.metrics_window_size = 10  # Example value
+        # Samples of every monitored metric kept in the knowledge history
+        self.knowledge.history = MonitoredHistory(self.metrics_window_size)
         self.failure_rate_threshold = 0.1  # Example value
         self.unreachable_rate_threshold = 0.1  # Example value
         self.max_boot_time_seconds = 60  # Example value
+        self.availability_threshold = 85  # Percent
+        self.response_time_threshold = 3  # Seconds
+        self.analyzer = None  # Created on the first analysis, over windows of `analysis_window_size` samples of the history
+        self.violations = {}  # Service id -> implementation id of services violating a threshold
 
     def analyze(self):
         """
         Analyze the monitored data to identify services violating QoS thresholds.
 
-        Uses the `monitored_data` in knowledge to detect services with:
-        - Availability below 85%
-        - Response time above 3 seconds
+        Aggregates are kept over the last `analysis_window_size` samples of the knowledge
+        history, per instance and per service, and only services whose snapshots changed
+        are re-checked. A service needs a new instance when:
+        - its failure rate is above `failure_rate_threshold`
+        - its unreachable rate is above `unreachable_rate_threshold`
+        - an active instance has a mean availability below 85% or a mean response time above 3 seconds
         
         Updates `analysis_data` in the knowledge base with services requiring new instances.
         """
         try:
             print("Starting analysis phase.")
-            monitored_data = self.knowledge.monitored_data
-            analysis_data = {}
-
-            # Iterate through the monitored data for each service
-            for service_id, service_data in monitored_data.items():
-                print(f"Analysing service {service_id}")
-                current_implementation_id = service_data.get("currentImplementationId")
-
-                # Assume instances and snapshots are available
-                snapshots = service_data.get("snapshot", [])
-                for snapshot in snapshots:
-                    instance_id = snapshot.get("instanceId")
-                    status = snapshot.get("status")
-                    qos = snapshot.get("qos", {})
-
-                    # Skip if instance is not active
-                    if status != "ACTIVE":
-                        print(f"Instance {instance_id} is not active (status: {status}). Skipping.")
-                        continue
+            if self.analyzer is None or self.analyzer.window_size != self.analysis_window_size \
+                    or self.analyzer.history is not self.knowledge.history:
+                self.analyzer = IncrementalAnalyzer(self.knowledge.history, self.analysis_window_size)
+                self.violations = {}
 
-                    # Check for QOS violations
-                    availability = qos.get("availability")
-                    response_time = qos.get("responseTime")
+            for service_id in self.analyzer.update():
+                service = self.analyzer.services[service_id]
+                if self._violates_thresholds(service):
+                    self.violations[service_id] = service.implementation_id
+                else:
+                    self.violations.pop(service_id, None)
 
-                    # Convert availability to a number if it exists
-                    if isinstance(availability, str) and availability.endswith("%"):
-                        availability = float(availability.strip('%'))
-
-                    """
-                    If availability < 85% or response time > 3, add the currentImplementationId of the service
-                    as a key in analysis_data with "addInstance" as its value.
-                    """
-                    if (availability is not None and availability < 85) or (response_time is not None and response_time > 3):
-                        print(f"Instance {instance_id} of service {service_id} has QOS violation: "
-                            f"Availability: {availability}, Response Time: {response_time}.")
-                        
-                        # Add to analysis_data
-                        if current_implementation_id not in analysis_data:
-                            analysis_data[current_implementation_id] = "addInstance"
+            # Add the currentImplementationId of every violating service with "addInstance" as its value
+            analysis_data = {implementation_id: "addInstance" for implementation_id in self.violations.values()}
 
             # Update knowledge with the analysis data
             self.knowledge.analysis_data = analysis_data
@@ -76,6 +64,28 @@ class ReactiveAdaptationManager(Strategy):
         except Exception as e:
             print("Error during the Analyse execution:", str(e))
             return False
+
+    def _violates_thresholds(self, service):
+        failure_rate = service.mean(FAILED)
+        if failure_rate > self.failure_rate_threshold:
+            logging.info(f"Service {service.service_id} has failure rate {failure_rate:.2f}")
+            return True
+        unreachable_rate = service.mean(UNREACHABLE)
+        if unreachable_rate > self.unreachable_rate_threshold:
+            logging.info(f"Service {service.service_id} has unreachable rate {unreachable_rate:.2f}")
+            return True
+        for instance in service.instances.values():
+            # Skip if instance is not active
+            if instance.status != "ACTIVE":
+                logging.debug(f"Instance {instance.instance_id} is not active (status: {instance.status}). Skipping.")
+                continue
+            availability = instance.mean(AVAILABILITY)
+            response_time = instance.mean(RESPONSE_TIME)
+            if availability < self.availability_threshold or response_time > self.response_time_threshold:
+                logging.info(f"Instance {instance.instance_id} of service {service.service_id} has QOS violation: "
+                             f"Availability: {availability}, Response Time: {response_time}.")
+                return True
+        return False
        
     def plan(self):
         """
@@ -5,13 +5,57 @@ import requests
 import time
 import json
 import random
+import functools
 
 from UPISAS.exceptions import EndpointNotReachable
 from UPISAS.knowledge import Knowledge
-from UPISAS import validate_schema, get_response_for_get_request
+from UPISAS import validate_schema, get_response_for_get_request, VALIDATION_FULL
+from UPISAS import codec
+from UPISAS.http_pool import get_session
+from UPISAS.readiness import ReadinessProbe
+from UPISAS.document_cache import DocumentCache
+from UPISAS.instrumentation import REGISTRY
+from UPISAS.snapshot_model import MonitorSnapshot
+from UPISAS.run_log import MONITOR, ANALYSIS, PLAN, EXECUTE
 import logging
 
 pp = pprint.PrettyPrinter(indent=4)
+REGISTRY.describe("upisas_phase_seconds", "Duration of each MAPE-K phase of the strategy")
+REGISTRY.describe("upisas_phase_errors_total", "MAPE-K phases of the strategy that raised an exception")
+REGISTRY.describe("upisas_monitor_retries_total", "Retries of the monitor request")
+_JSON_HEADERS = {"Content-Type": codec.JSON_MEDIA_TYPE}
+# Phases whose result is appended to the strategy's recorder: phase -> (entry kind, knowledge attribute)
+_RECORDED_PHASES = {"analyze": (ANALYSIS, "analysis_data"), "plan": (PLAN, "plan_data")}
+
+
+def _timed_phase(phase):
+    """
+    Record the duration of a MAPE-K phase in `upisas_phase_seconds`, and count the calls that
+    raise in `upisas_phase_errors_total`. Nested calls of the same phase (e.g. through super())
+    are only recorded once. The result of a successful analysis or plan is also appended to the
+    strategy's recorder, if it has one.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if phase in self._timed_phases:
+                return method(self, *args, **kwargs)
+            self._timed_phases.add(phase)
+            try:
+                with self.metrics.timer("upisas_phase_seconds", phase=phase):
+                    result = method(self, *args, **kwargs)
+            except Exception:
+                self.metrics.counter("upisas_phase_errors_total", phase=phase).inc()
+                raise
+            finally:
+                self._timed_phases.discard(phase)
+            if result and phase in _RECORDED_PHASES and self.recorder is not None:
+                kind, attribute = _RECORDED_PHASES[phase]
+                self.recorder.append(kind, getattr(self.knowledge, attribute))
+            return result
+        return wrapper
+    return decorator
+
 
 # Define an abstract base class for monitor and execute
 class Strategy(ABC):
@@ -26,11 +70,44 @@ class Strategy(ABC):
             monitored_data={}, analysis_data={}, plan_data={},
             adaptation_options={}, monitor_schema={}, execute_schema={}, adaptation_options_schema={}
         )
+        self.readiness = ReadinessProbe(self.exemplar.base_endpoint)
+        self.execute_batch_supported = None  # Unknown until the first batched execute
+        # How monitored data is validated: VALIDATION_FULL, VALIDATION_SAMPLED (every
+        # `validation_sample_every` ticks) or VALIDATION_KEYS (key shape only)
+        self.validation_mode = VALIDATION_FULL
+        self.validation_sample_every = 10
+        self.monitor_ticks = 0
+        self.document_cache = DocumentCache()
+        # Oldest monitoring data (in seconds) the exemplar may serve from memory; None lets it decide
+        self.monitor_max_staleness = None
+        # Encoding to ask the exemplar for on /monitor, e.g. codec.MSGPACK_MEDIA_TYPE for large
+        # documents (None: JSON); a server that does not offer it answers in JSON
+        self.monitor_media_type = None
+        # Whether to keep monitored data as a MonitorSnapshot (interned ids, typed arrays, see
+        # UPISAS.snapshot_model) instead of the raw JSON; only for RAMSES-shaped data
+        self.compact_monitor_data = False
+        # Whether to give every RAMSES snapshot random QoS values (see process_monitor_data); off to
+        # keep the recorded ones, e.g. when replaying a run log
+        self.inject_qos = True
+        self._stream_document = {}  # Raw document the updates of the monitor stream apply to
+        # A RunRecorder (see UPISAS.run_log) every monitor tick, analysis and executed plan is appended to
+        self.recorder = None
+        # Phase latencies, retries and errors (also recorded for the HTTP calls of the shared session)
+        self.metrics = REGISTRY
+        self._timed_phases = set()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Time the analysis and planning of every strategy, however they are called
+        for phase in ("analyze", "plan"):
+            if phase in cls.__dict__:
+                setattr(cls, phase, _timed_phase(phase)(cls.__dict__[phase]))
 
     def ping(self):
         ping_res = self._perform_get_request(self.exemplar.base_endpoint)
         logging.info(f"ping result: {ping_res}")
 
+    @_timed_phase("monitor")
     def monitor(self, endpoint_suffix="monitor", with_validation=True, verbose=False):
         """
         Fetch and process monitoring data from the `monitor` endpoint.
@@ -43,50 +120,143 @@ class Strategy(ABC):
         Returns:
             True if monitoring data is successfully fetched and processed.
         """
-        fresh_data = self._perform_get_request(endpoint_suffix)
+        fresh_data = self.fetch_monitor_data(endpoint_suffix)
+        return self.process_monitor_data(fresh_data, with_validation, verbose)
+
+    def subscribe(self, endpoint_suffix="monitor/stream", with_validation=True, verbose=False, max_events=None):
+        """
+        Follow the exemplar's monitor stream, applying each update to `knowledge.monitored_data`.
+
+        The stream sends the full document first and then only the services (and fields) that
+        changed. This is a generator yielding the version after each applied update, so the
+        caller can run the rest of the loop whenever something changed:
+
+            for version in strategy.subscribe():
+                if strategy.analyze() and strategy.plan():
+                    strategy.execute()
+
+        If the connection drops, it reconnects and resumes from the last version received.
+
+        Args:
+            endpoint_suffix: Suffix of the Server-Sent Events endpoint.
+            with_validation: Whether to validate the updated data against the monitor schema.
+            verbose: Print detailed information for debugging purposes.
+            max_events: Stop after this many updates (None: follow the stream forever).
+        """
+        url = '/'.join([self.exemplar.base_endpoint.rstrip('/'), endpoint_suffix.lstrip('/')])
+        version = None
+        received = 0
+        while max_events is None or received < max_events:
+            self.readiness.wait_until_ready()
+            headers = {"Accept": "text/event-stream"}
+            if version is not None:
+                headers["Last-Event-ID"] = str(version)
+            try:
+                with get_session().get(url, headers=headers, stream=True) as response:
+                    if response.status_code == 404:
+                        logging.error(f"Endpoint '{endpoint_suffix}' not reachable at URL: {url}")
+                        raise EndpointNotReachable
+                    for event_type, data in _iter_server_sent_events(response):
+                        payload = codec.loads(data)
+                        self._apply_monitor_update(event_type, payload)
+                        version = payload["version"]
+                        self.process_monitor_data(self._stream_document, with_validation, verbose)
+                        received += 1
+                        yield version
+                        if max_events is not None and received >= max_events:
+                            return
+            except requests.exceptions.RequestException as e:
+                logging.warning(f"Monitor stream interrupted: {e}. Reconnecting...")
+                self.readiness.mark_unready()
+
+    def _apply_monitor_update(self, event_type, payload):
+        if event_type == "full":
+            self._stream_document = payload["document"]
+            return
+        monitored_data = self._stream_document
+        for service_name, fields in payload["changed"].items():
+            monitored_data.setdefault(service_name, {}).update(fields)
+        for service_name in payload["removed"]:
+            monitored_data.pop(service_name, None)
+
+    @_timed_phase("monitor_fetch")
+    def fetch_monitor_data(self, endpoint_suffix="monitor"):
+        """Fetch raw monitoring data without touching the knowledge base."""
+        return self._perform_get_request(endpoint_suffix)
+
+    @_timed_phase("monitor_process")
+    def process_monitor_data(self, fresh_data, with_validation=True, verbose=False):
+        """
+        Validate freshly fetched monitoring data and store it in the knowledge base.
+
+        Args:
+            fresh_data: Monitoring data returned by `fetch_monitor_data`.
+            with_validation: Whether to validate the data against a schema.
+            verbose: Print detailed information for debugging purposes.
+
+        Returns:
+            True if monitoring data is successfully processed.
+        """
         if verbose:
             print("[Monitor]\tgot fresh_data: " + str(fresh_data))
         if with_validation:
             # Validate the fetched data against the monitoring schema
             if not self.knowledge.monitor_schema:
                 self.get_monitor_schema()
-            validate_schema(fresh_data, self.knowledge.monitor_schema)
+            validate_schema(fresh_data, self.knowledge.monitor_schema, mode=self.validation_mode,
+                            tick=self.monitor_ticks, sample_every=self.validation_sample_every,
+                            key_path=self.exemplar.monitor_key_path)
+        self.monitor_ticks += 1
         
         # Add QoS data to each snapshot
-        for service_data in fresh_data.values():
-            snapshots = service_data.get('snapshot', [])
-            for snapshot in snapshots:
-                if service_data.get('serviceId') in ["CONFIG-SERVER", "API-GATEWAY-SERVICE"]:
-                    availability = None
-                    response_time = None
-                    snapshot['qos'] = {
-                        'availability': availability,
-                        'responseTime': response_time
-                    }
-                else:
-                    # Assign random QoS metrics for other services
-                    availability = random.randint(80, 90)
-                    response_time = random.randint(2, 5)
-                    snapshot['qos'] = {
-                        'availability': availability,
-                        'responseTime': response_time
-                    }
+        if self.inject_qos:
+            for service_data in fresh_data.values():
+                if not isinstance(service_data, dict):
+                    continue
+                snapshots = service_data.get('snapshot', [])
+                for snapshot in snapshots:
+                    if service_data.get('serviceId') in ["CONFIG-SERVER", "API-GATEWAY-SERVICE"]:
+                        availability = None
+                        response_time = None
+                        snapshot['qos'] = {
+                            'availability': availability,
+                            'responseTime': response_time
+                        }
+                    else:
+                        # Assign random QoS metrics for other services
+                        availability = random.randint(80, 90)
+                        response_time = random.randint(2, 5)
+                        snapshot['qos'] = {
+                            'availability': availability,
+                            'responseTime': response_time
+                        }
         
+        if self.recorder is not None:
+            self.recorder.append(MONITOR, fresh_data)
+        if self.compact_monitor_data:
+            fresh_data = MonitorSnapshot.parse(fresh_data)
         # Update the monitored data in the knowledge base
         self.knowledge.monitored_data = fresh_data  # Overwrite with fresh data
+        self.knowledge.history.record(fresh_data)
         if verbose:
             print("[Knowledge]\tdata monitored so far: " + str(self.knowledge.monitored_data))
             # print(str(self.knowledge))
         return True
 
-    def execute(self, adaptation=None, endpoint_suffix="execute", with_validation=False):
+    @_timed_phase("execute")
+    def execute(self, adaptation=None, endpoint_suffix="execute", with_validation=False,
+                batch_endpoint_suffix="execute_batch"):
         """
         Execute the given adaptation plan by posting it to the `execute` endpoint.
 
+        If the exemplar exposes a batch endpoint, the whole plan is sent in a single call;
+        otherwise every request is posted to the `execute` endpoint one by one.
+
         Args:
             adaptation: The plan to execute (default is `self.knowledge.plan_data`).
             endpoint_suffix: Endpoint to send the adaptation data to.
             with_validation: Whether to validate the adaptation data before sending it.
+            batch_endpoint_suffix: Endpoint accepting the whole list of requests, or None to disable batching.
 
         Returns:
             True if all adaptation requests are successfully executed.
@@ -99,10 +269,18 @@ class Strategy(ABC):
                 self.get_execute_schema()
             validate_schema(adaptation, self.knowledge.execute_schema)
         url = '/'.join([self.exemplar.base_endpoint.rstrip('/'), endpoint_suffix.lstrip('/')])
-        
+        request_items = adaptation.get("requests", [])
+
+        if request_items and batch_endpoint_suffix and self.execute_batch_supported is not False:
+            batch_url = '/'.join([self.exemplar.base_endpoint.rstrip('/'), batch_endpoint_suffix.lstrip('/')])
+            if self._execute_batch(batch_url, request_items):
+                if self.recorder is not None:
+                    self.recorder.append(EXECUTE, adaptation)
+                return True
+
         # Send each request in the adaptation plan to the `execute` endpoint
-        for request_item in adaptation.get("requests", []):
-            response = requests.post(url, json=request_item)
+        for request_item in request_items:
+            response = get_session().post(url, data=codec.dumps(request_item), headers=_JSON_HEADERS)
             logging.info("[Execute]\tposted adaptation: " + str(request_item))
 
             # Handle potential errors in the response
@@ -117,10 +295,39 @@ class Strategy(ABC):
 
             print(response)
 
+        if self.recorder is not None:
+            self.recorder.append(EXECUTE, adaptation)
+        return True
+
+    def _execute_batch(self, url, request_items):
+        """
+        Post all `request_items` to the batch endpoint in one call.
+
+        Returns False (and remembers it) if the exemplar has no batch endpoint.
+        """
+        response = get_session().post(url, data=codec.dumps(request_items), headers=_JSON_HEADERS)
+        if response.status_code == 404:
+            logging.info("Batch execute endpoint not available, falling back to one request per adaptation.")
+            self.execute_batch_supported = False
+            return False
+        self.execute_batch_supported = True
+        if response.status_code >= 400:
+            logging.error(f"Execute batch failed with status code {response.status_code}: {response.text}")
+            response.raise_for_status()
+
+        failed = False
+        for request_item, result in zip(request_items, codec.decode_response(response)["results"]):
+            if result["status"] >= 400:
+                logging.error(f"Execute request {request_item} failed with status code {result['status']}: {result['response']}")
+                failed = True
+            else:
+                logging.info(f"[Execute]\tposted adaptation: {request_item}, got {result['response']}")
+        if failed:
+            raise requests.exceptions.HTTPError("One or more requests of the execute batch failed", response=response)
         return True
 
     def get_adaptation_options(self, endpoint_suffix="adaptation_options", with_validation=True):
-        self.knowledge.adaptation_options = self._perform_get_request(endpoint_suffix)
+        self.knowledge.adaptation_options = self._perform_cached_get_request(endpoint_suffix)
         if with_validation:
             if not self.knowledge.adaptation_options_schema:
                 self.get_adaptation_options_schema()
@@ -129,46 +336,45 @@ class Strategy(ABC):
         pp.pprint(self.knowledge.adaptation_options)
 
     def get_monitor_schema(self, endpoint_suffix="monitor_schema"):
-        self.knowledge.monitor_schema = self._perform_get_request(endpoint_suffix)
+        self.knowledge.monitor_schema = self._perform_cached_get_request(endpoint_suffix)
         logging.info("monitor_schema set to: ")
         pp.pprint(self.knowledge.monitor_schema)
 
     def get_execute_schema(self, endpoint_suffix="execute_schema"):
-        self.knowledge.execute_schema = self._perform_get_request(endpoint_suffix)
+        self.knowledge.execute_schema = self._perform_cached_get_request(endpoint_suffix)
         logging.info("execute_schema set to: ")
         pp.pprint(self.knowledge.execute_schema)
 
     def get_adaptation_options_schema(self, endpoint_suffix="adaptation_options_schema"):
-        self.knowledge.adaptation_options_schema = self._perform_get_request(endpoint_suffix)
+        self.knowledge.adaptation_options_schema = self._perform_cached_get_request(endpoint_suffix)
         logging.info("adaptation_options_schema set to: ")
         pp.pprint(self.knowledge.adaptation_options_schema)
         
-    def get_monitor_data(self):
+    def get_monitor_data(self, endpoint_suffix="monitor", max_retries=10, timeout=30):
         """
         Fetch monitoring data with retry logic for robustness.
 
+        Waits for the exemplar to be ready first; once it has answered, the ready state is
+        cached and later calls go straight to the endpoint. A failed request re-arms the
+        readiness probe, and retries back off exponentially with jitter.
+
         Returns:
             Parsed monitoring data or an empty JSON object if retries fail.
         """
-        url = "http://127.0.0.1:41248/monitor"
-        
-        print("!!!!!!!!!!!!!!Config Server container is still starting, wait for 2 mins!!!!!!!!!!!!!!")
-        time.sleep(120)  # Initial delay
-        max_retries = 10  # Maximum number of retries
-        delay_between_retries = 3  # Seconds to wait between retries
-        timeout = 30  # Timeout for each request in seconds
+        url = '/'.join([self.exemplar.base_endpoint.rstrip('/'), endpoint_suffix.lstrip('/')])
+        headers = {"Accept": f"{self.monitor_media_type}, {codec.JSON_MEDIA_TYPE};q=0.5"} if self.monitor_media_type else None
 
         for attempt in range(max_retries):
+            self.readiness.wait_until_ready()
             try:
-                print(f"Attempt {attempt + 1} of {max_retries}")
-                response = requests.get(url, timeout=timeout)  # Set timeout here
+                params = {"max_staleness": self.monitor_max_staleness} if self.monitor_max_staleness is not None else None
+                response = get_session().get(url, params=params, headers=headers, timeout=timeout)
                 if response.status_code == 200:
                     try:
-                        data = response.json()  # Parse the JSON response
-                        if data and len(data.keys()) != 1:  # Check if JSON is not empty
-                            print("Response received successfully!")
-                            print("Status Code:", response.status_code)
-                            print("Response Content:", response.text)
+                        data = codec.decode_response(response)  # Parse the JSON (or msgpack) response
+                        # Check if JSON is not empty (nor still incomplete)
+                        if data and len(data.keys()) != self.exemplar.incomplete_monitor_key_count:
+                            logging.info("[Monitor]\tresponse received successfully")
                             return data  # Return the parsed JSON response
                         else:
                             print("Empty JSON response. Retrying...")
@@ -178,15 +384,35 @@ class Strategy(ABC):
                     print(f"Unexpected status code: {response.status_code}. Retrying...")
             except requests.exceptions.Timeout:
                 print(f"Request timed out after {timeout} seconds. Retrying...")
+                self.readiness.mark_unready()
             except requests.exceptions.RequestException as e:
                 print(f"Request failed: {e}. Retrying...")
+                self.readiness.mark_unready()
 
-            time.sleep(delay_between_retries)  # Wait before retrying
+            self.metrics.counter("upisas_monitor_retries_total").inc()
+            time.sleep(self.readiness.backoff_delay(attempt))  # Wait before retrying
 
         print("Failed to fetch data after maximum retries.")
         
         return json.dumps({})
 
+    def _perform_cached_get_request(self, endpoint_suffix):
+        """
+        Perform a GET request for a rarely changing document, revalidating the on-disk copy if there is one.
+
+        Args:
+            endpoint_suffix: The suffix to append to the base endpoint for the GET request.
+
+        Returns:
+            The JSON document, either fresh or from the cache.
+        """
+        url = '/'.join([self.exemplar.base_endpoint.rstrip('/'), endpoint_suffix.lstrip('/')])
+        response, document = self.document_cache.get(url)
+        if response.status_code == 404:
+            logging.error(f"Endpoint '{endpoint_suffix}' not reachable at URL: {url}")
+            raise EndpointNotReachable
+        return document
+
     def _perform_get_request(self, endpoint_suffix):
         """
         Perform a GET request to a given endpoint and handle errors.
@@ -206,7 +432,7 @@ class Strategy(ABC):
             if response.status_code == 404:
                 logging.error(f"Endpoint '{endpoint_suffix}' not reachable at URL: {url}")
                 raise EndpointNotReachable
-            return response.json()
+            return codec.decode_response(response)
 
     @abstractmethod
     def analyze(self):
@@ -218,3 +444,21 @@ class Strategy(ABC):
         """Implement the planning logic specific to the strategy."""
         pass 
 
+
+def _iter_server_sent_events(response):
+    """Yield (event type, data) for each event of a text/event-stream response, skipping comments."""
+    event_type, data = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            if data:
+                yield event_type, "\n".join(data)
+            event_type, data = "message", []
+        elif line.startswith(":"):
+            continue
+        else:
+            name, _, value = line.partition(":")
+            value = value[1:] if value.startswith(" ") else value
+            if name == "event":
+                event_type = value
+            elif name == "data":
+                data.append(value)
@@ -0,0 +1,131 @@
+import math
+import random
+import unittest
+
+from UPISAS.analysis import IncrementalAnalyzer, FAILED, AVAILABILITY, RESPONSE_TIME
+from UPISAS.knowledge import MonitoredHistory
+
+
+def _monitored_data(snapshot_id, status="ACTIVE", availability=90, instances=("i1",)):
+    return {
+        "S": {
+            "serviceId": "S",
+            "currentImplementationId": "s-impl",
+            "snapshot": [{"id": snapshot_id, "instanceId": instance_id, "status": status,
+                          "qos": {"availability": availability, "responseTime": 2}}
+                         for instance_id in instances]
+        }
+    }
+
+
+class TestIncrementalAnalyzer(unittest.TestCase):
+    """
+    Test cases for the windowed aggregates used by the reactive RAMSES strategy.
+    """
+
+    def _analyzer(self, window_size, capacity=8):
+        return IncrementalAnalyzer(MonitoredHistory(capacity), window_size)
+
+    @staticmethod
+    def _update(analyzer, monitored_data):
+        analyzer.history.record(monitored_data)
+        return analyzer.update()
+
+    def test_window_of_the_history(self):
+        analyzer = self._analyzer(window_size=2)
+        for snapshot_id, availability in enumerate((10, None, 30, 50)):
+            self._update(analyzer, _monitored_data(snapshot_id, availability=availability))
+        self.assertEqual(analyzer.services["S"].instances["i1"].mean(AVAILABILITY), 40)
+        self.assertEqual(analyzer.history.mean("S", "i1", AVAILABILITY), 30)
+        with self.assertRaises(ValueError):
+            self._analyzer(window_size=10)
+
+    def test_unchanged_snapshots_are_skipped(self):
+        analyzer = self._analyzer(window_size=3)
+        self.assertEqual(self._update(analyzer, _monitored_data(1)), {"S"})
+        self.assertEqual(self._update(analyzer, _monitored_data(1)), set())
+        self.assertEqual(self._update(analyzer, _monitored_data(2, availability=60)), {"S"})
+        self.assertEqual(analyzer.services["S"].instances["i1"].mean(AVAILABILITY), 75)
+
+    def test_snapshots_recorded_between_updates(self):
+        analyzer = self._analyzer(window_size=3)
+        self._update(analyzer, _monitored_data(1, availability=60))
+        analyzer.history.record(_monitored_data(2, availability=60))
+        self.assertEqual(self._update(analyzer, _monitored_data(3, availability=90)), {"S"})
+        self.assertEqual(analyzer.services["S"].mean(AVAILABILITY), 70)
+
+    def test_service_failure_rate(self):
+        analyzer = self._analyzer(window_size=4)
+        self._update(analyzer, _monitored_data(1, instances=("i1", "i2")))
+        self._update(analyzer, _monitored_data(2, status="FAILED", instances=("i1", "i2")))
+        self.assertEqual(analyzer.services["S"].mean(FAILED), 0.5)
+
+    def test_removed_instances_leave_the_service_aggregates(self):
+        analyzer = self._analyzer(window_size=4)
+        self._update(analyzer, _monitored_data(1, status="FAILED", instances=("i1", "i2")))
+        self._update(analyzer, _monitored_data(2, instances=("i2",)))
+        self.assertEqual(list(analyzer.services["S"].instances), ["i2"])
+        self.assertEqual(analyzer.services["S"].mean(FAILED), 0.5)
+
+    def test_running_sums_match_the_windows(self):
+        rng = random.Random(0)
+        analyzer = self._analyzer(window_size=3, capacity=6)
+        history = analyzer.history
+        instances = ("i1", "i2", "i3")
+        for snapshot_id in range(60):
+            present = [instance_id for instance_id in instances if rng.random() < 0.9]
+            monitored_data = {"S": {"currentImplementationId": "s-impl", "snapshot": [
+                {"id": snapshot_id if rng.random() < 0.7 else 0, "instanceId": instance_id,
+                 "status": rng.choice(("ACTIVE", "FAILED")),
+                 "qos": {"availability": rng.choice((None, 80, 90, 95)), "responseTime": rng.randint(1, 5)}}
+                for instance_id in present]}}
+            history.record(monitored_data)
+            # Some ticks are not analyzed, so several samples are folded at once
+            if rng.random() < 0.3:
+                continue
+            analyzer.update()
+            service = analyzer.services["S"]
+            self.assertEqual(sorted(service.instances), sorted(history.instances("S")))
+            for metric in (FAILED, AVAILABILITY, RESPONSE_TIME):
+                values = [value for instance_id in service.instances
+                          for value in history.window("S", instance_id, metric, 3) if not math.isnan(value)]
+                expected = sum(values) / len(values) if values else math.nan
+                self.assertTrue(math.isclose(service.mean(metric), expected) or
+                                (math.isnan(expected) and math.isnan(service.mean(metric))))
+                for instance_id, instance in service.instances.items():
+                    mean = history.mean("S", instance_id, metric, 3)
+                    self.assertTrue(math.isclose(instance.mean(metric), mean) or
+                                    (math.isnan(mean) and math.isnan(instance.mean(metric))))
+
+    def test_only_changed_instances_are_visited(self):
+        analyzer = self._analyzer(window_size=3)
+        self._update(analyzer, _monitored_data(1, instances=("i1", "i2")))
+        self.assertEqual(analyzer.update(), set())
+        monitored_data = _monitored_data(1, instances=("i1", "i2"))
+        monitored_data["S"]["snapshot"][1]["id"] = 2
+        analyzer.history.record(monitored_data)
+        self.assertEqual(analyzer._pending, {("S", "i2")})
+        self.assertEqual(analyzer.update(), {"S"})
+
+    def test_vanished_services_are_pruned(self):
+        analyzer = self._analyzer(window_size=3)
+        monitored_data = _monitored_data(1)
+        monitored_data["T"] = dict(monitored_data["S"], currentImplementationId="t-impl")
+        self._update(analyzer, monitored_data)
+        self.assertEqual(sorted(analyzer.services), ["S", "T"])
+        self.assertEqual(self._update(analyzer, _monitored_data(2)), {"S", "T"})
+        self.assertEqual(list(analyzer.services), ["S"])
+        self.assertEqual(list(analyzer.history.services()), ["S"])
+        self.assertFalse([key for key in analyzer.history.keys() if key[0] == "T"])
+
+    def test_analyzer_of_a_recorded_history(self):
+        history = MonitoredHistory(8)
+        history.record(_monitored_data(1, availability=60))
+        analyzer = IncrementalAnalyzer(history, 3)
+        self.assertEqual(analyzer.update(), {"S"})
+        self.assertEqual(analyzer.services["S"].implementation_id, "s-impl")
+        self.assertEqual(analyzer.services["S"].mean(AVAILABILITY), 60)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+
+from UPISAS import codec
+
+
+class _Response:
+    def __init__(self, content, content_type):
+        self.content = content
+        self.headers = {"Content-Type": content_type}
+
+
+class TestCodec(unittest.TestCase):
+    """
+    Test cases for the JSON and msgpack codecs used by the strategy and the RAMSES interface.
+    """
+
+    document = {"SERVICE": {"snapshot": [{"id": 1, "status": "ACTIVE", "qos": {"availability": 85.5}}]}}
+
+    def test_json_codecs_round_trip(self):
+        for name in ("json", "orjson"):
+            if name not in codec.CODECS:
+                continue
+            json_codec = codec.get_codec(name)
+            encoded = json_codec.dumps(self.document)
+            self.assertIsInstance(encoded, bytes)
+            self.assertEqual(codec.STDLIB_JSON.loads(encoded), self.document)
+            self.assertEqual(json_codec.loads(encoded.decode()), self.document)
+
+    def test_unknown_codec(self):
+        with self.assertRaises(ValueError):
+            codec.get_codec("yaml")
+
+    def test_media_types(self):
+        self.assertEqual(codec.media_types()[0], codec.JSON_MEDIA_TYPE)
+        self.assertIs(codec.for_media_type("application/json; charset=utf-8"), codec.JSON)
+        self.assertIs(codec.for_media_type(None), codec.JSON)
+
+    def test_decode_response(self):
+        response = _Response(codec.dumps(self.document), "application/json")
+        self.assertEqual(codec.decode_response(response), self.document)
+        with self.assertRaises(ValueError):
+            codec.decode_response(_Response(b"<html>", "text/html"))
+
+    @unittest.skipUnless("msgpack" in codec.CODECS, "msgpack is not installed")
+    def test_msgpack(self):
+        self.assertIn(codec.MSGPACK_MEDIA_TYPE, codec.media_types())
+        msgpack_codec = codec.for_media_type("application/x-msgpack")
+        response = _Response(msgpack_codec.dumps(self.document), codec.MSGPACK_MEDIA_TYPE)
+        self.assertEqual(codec.decode_response(response), self.document)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import socket
+import threading
+import unittest
+
+import requests
+
+from UPISAS.exemplars.in_process_demo import InProcessDemoExemplar
+from UPISAS.http_pool import configure_session, close_session, get_session, DEFAULT_POOL_MAXSIZE
+
+
+class TestHttpPool(unittest.TestCase):
+    """
+    Test cases for the process-wide pooled HTTP session (no docker needed).
+    """
+
+    def setUp(self):
+        self.exemplar = InProcessDemoExemplar(auto_start=True)
+        self.exemplar.start_run()
+        self.url = self.exemplar.base_endpoint
+
+    def tearDown(self):
+        self.exemplar.stop_container()
+        # Back to a session with the default settings
+        configure_session()
+
+    def _pool(self, session, url):
+        return session.get_adapter(url).poolmanager.connection_from_url(url)
+
+    def test_session_is_shared(self):
+        sessions = []
+        threads = [threading.Thread(target=lambda: sessions.append(get_session())) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len({id(session) for session in sessions + [get_session()]}), 1)
+
+    def test_connections_are_reused(self):
+        session = get_session()
+        for _ in range(5):
+            self.assertEqual(session.get(self.url + "/monitor").status_code, 200)
+        self.assertEqual(self._pool(session, self.url).num_connections, 1)
+
+    def test_pool_sizes(self):
+        self.assertEqual(self._pool(get_session(), self.url).pool.maxsize, DEFAULT_POOL_MAXSIZE)
+        session = configure_session(pool_maxsize=3, host_pool_sizes={self.url: 7})
+        self.assertIs(get_session(), session)
+        self.assertEqual(self._pool(session, self.url).pool.maxsize, 7)
+        self.assertEqual(self._pool(session, "http://127.0.0.1:9").pool.maxsize, 3)
+        self.assertEqual(session.get(self.url + "/monitor").status_code, 200)
+
+    def test_close_session(self):
+        session = get_session()
+        close_session()
+        self.assertIsNot(get_session(), session)
+
+    def test_default_timeout(self):
+        session = configure_session(timeout=0.2)
+        # Accepts connections (in its backlog) but never answers
+        with socket.socket() as listener:
+            listener.bind(("127.0.0.1", 0))
+            listener.listen()
+            with self.assertRaises(requests.exceptions.ReadTimeout):
+                session.get(f"http://127.0.0.1:{listener.getsockname()[1]}/monitor")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+import docker
+
+from UPISAS.exceptions import DockerImageNotFoundOnDockerHub
+from UPISAS.image_prefetch import compose_images, forget_local_image, prefetch_images
+
+
+class _FakeImages:
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, image):
+        self.client.lookups.append(image)
+        if image not in self.client.local:
+            raise docker.errors.ImageNotFound(image)
+
+
+class _FakeApi:
+    def __init__(self, client):
+        self.client = client
+
+    def pull(self, image, stream=True, decode=True):
+        with self.client.lock:
+            self.client.active += 1
+            self.client.max_active = max(self.client.max_active, self.client.active)
+        try:
+            time.sleep(0.05)
+            if image.startswith("missing/"):
+                yield {"error": f"pull access denied for {image}, repository does not exist"}
+                return
+            yield {"status": "Downloading", "id": "layer", "progressDetail": {"current": 5, "total": 10}}
+            yield {"status": "Extracting", "id": "layer", "progressDetail": {"current": 10, "total": 10}}
+            self.client.local.add(image)
+        finally:
+            with self.client.lock:
+                self.client.active -= 1
+
+
+class _FakeDockerClient:
+    """Stands in for docker.DockerClient, with a set of local images and pulls that take 50 ms."""
+
+    def __init__(self, local=()):
+        self.local = set(local)
+        self.lookups = []
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+        self.images = _FakeImages(self)
+        self.api = _FakeApi(self)
+
+
+class TestImagePrefetch(unittest.TestCase):
+    """
+    Test cases for the image prefetch, against a fake docker client (no docker needed).
+    """
+
+    def setUp(self):
+        forget_local_image()
+
+    def test_missing_images_are_pulled_concurrently(self):
+        client = _FakeDockerClient(local={"owner/present:1"})
+        images = ["owner/present:1", "owner/a:1", "owner/b:1", "owner/c:1", "owner/a:1"]
+        pulled = prefetch_images(images, client=client, show_progress=False)
+        self.assertEqual(pulled, ["owner/a:1", "owner/b:1", "owner/c:1"])
+        self.assertGreater(client.max_active, 1)
+        self.assertTrue({"owner/a:1", "owner/b:1", "owner/c:1"} <= client.local)
+
+    def test_local_images_are_remembered(self):
+        client = _FakeDockerClient(local={"owner/present:1"})
+        prefetch_images(["owner/present:1", "owner/a:1"], client=client, show_progress=False)
+        client.lookups.clear()
+        self.assertEqual(prefetch_images(["owner/present:1", "owner/a:1"], client=client, show_progress=False), [])
+        self.assertEqual(client.lookups, [])
+
+    def test_image_not_found_on_dockerhub(self):
+        client = _FakeDockerClient()
+        with self.assertRaises(DockerImageNotFoundOnDockerHub):
+            prefetch_images(["missing/image:1", "owner/a:1"], client=client, show_progress=False)
+        self.assertIn("owner/a:1", client.local)
+
+    def test_compose_images_substitutes_variables(self):
+        with tempfile.TemporaryDirectory() as compose_dir:
+            with open(os.path.join(compose_dir, "docker-compose.yml"), "w") as f:
+                f.write("services:\n"
+                        "  db:\n    image: owner/db:${ARCH}\n"
+                        "  web:\n    image: \"owner/web:${WEB_TAG:-latest}\"\n"
+                        "  db-replica:\n    image: owner/db:${ARCH}\n")
+            with open(os.path.join(compose_dir, ".env"), "w") as f:
+                f.write("ARCH=amd64 # or arm64\n")
+            self.assertEqual(compose_images(compose_dir), ["owner/db:amd64", "owner/web:latest"])
+
+
+if __name__ == '__main__':
+    unittest.main()
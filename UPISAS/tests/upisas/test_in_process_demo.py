@@ -0,0 +1,102 @@
+import unittest
+
+import jsonschema
+
+from UPISAS import ServerNotReachable
+from UPISAS.exceptions import EndpointNotReachable, IncompleteJSONSchema
+from UPISAS.exemplars.in_process_demo import InProcessDemoExemplar
+from UPISAS.http_pool import get_session
+from UPISAS.strategies.demo_strategy import DemoStrategy
+
+
+class TestInProcessDemoExemplar(unittest.TestCase):
+    """
+    Test cases for the InProcessDemoExemplar, and the Strategy class against it (no docker needed).
+    """
+
+    def setUp(self):
+        self.exemplar = InProcessDemoExemplar(auto_start=True)
+
+    def tearDown(self):
+        if self.exemplar and self.exemplar.exemplar_container:
+            self.exemplar.stop_container()
+
+    def test_container_lifecycle(self):
+        exemplar = InProcessDemoExemplar(auto_start=False)
+        self.assertEqual(exemplar.get_container_status(), "created")
+        self.assertFalse(exemplar.pause_container())
+        self.assertTrue(exemplar.start_container())
+        self.assertEqual(exemplar.get_container_status(), "running")
+        self.assertTrue(exemplar.pause_container())
+        self.assertEqual(exemplar.get_container_status(), "paused")
+        self.assertTrue(exemplar.unpause_container())
+        self.assertEqual(exemplar.get_container_status(), "running")
+        self.assertTrue(exemplar.stop_container(remove=False))
+        self.assertEqual(exemplar.get_container_status(), "exited")
+        self.assertTrue(exemplar.stop_container(remove=True))
+        self.assertEqual(exemplar.get_container_status(), "removed")
+
+    def test_server_not_reachable_before_start_run(self):
+        self.strategy = DemoStrategy(self.exemplar)
+        with self.assertRaises(ServerNotReachable):
+            self.strategy.ping()
+
+    def test_restart_after_stop(self):
+        self.exemplar.start_run()
+        self.exemplar.stop_container(remove=False)
+        self.exemplar.start_container()
+        self.exemplar.start_run()
+        self.assertEqual(get_session().get(self.exemplar.base_endpoint).text, "alive")
+
+    def test_monitor_analyze_plan_successfully(self):
+        self.exemplar.start_run()
+        self.strategy = DemoStrategy(self.exemplar)
+        self.strategy.get_monitor_schema()
+        with self.assertLogs() as cm:
+            self.assertTrue(self.strategy.monitor())
+            self.assertTrue("JSON object validated by JSON Schema" in ", ".join(cm.output))
+        self.assertIn("f", self.strategy.knowledge.monitored_data)
+
+    def test_adaptation_options_successfully(self):
+        self.exemplar.start_run()
+        self.strategy = DemoStrategy(self.exemplar)
+        self.strategy.get_adaptation_options()
+        self.assertEqual(self.strategy.knowledge.adaptation_options["x"]["type"], "continuous")
+
+    def test_execute_changes_monitored_value(self):
+        exemplar = InProcessDemoExemplar(auto_start=True, enable_random=False)
+        exemplar.start_run()
+        try:
+            url = exemplar.base_endpoint + "/"
+            self.assertAlmostEqual(get_session().get(url + "monitor").json()["f"], 0.4)
+            response = get_session().put(url + "execute", json={"x": 0.51681, "y": 1.00861})
+            self.assertEqual(response.text, "ok")
+            self.assertAlmostEqual(get_session().get(url + "monitor").json()["f"], 0.0198944, places=6)
+        finally:
+            exemplar.stop_container()
+
+    def test_endpoints_not_reachable(self):
+        self.exemplar.start_run(app="app-no-endpoints.js")
+        self.strategy = DemoStrategy(self.exemplar)
+        for fetch in (self.strategy.get_adaptation_options, self.strategy.get_monitor_schema,
+                      self.strategy.get_execute_schema, self.strategy.get_adaptation_options_schema):
+            with self.assertRaises(EndpointNotReachable):
+                fetch()
+
+    def test_json_validation_no_complete_schema_present(self):
+        self.exemplar.start_run()
+        self.strategy = DemoStrategy(self.exemplar)
+        self.strategy.knowledge.monitor_schema = {"type": "object", "properties": {}}
+        with self.assertRaises(IncompleteJSONSchema):
+            self.strategy.monitor()
+
+    def test_json_validation_json_instance_not_conforming_to_schema(self):
+        self.exemplar.start_run()
+        self.strategy = DemoStrategy(self.exemplar)
+        self.strategy.knowledge.monitor_schema = {"type": "object", "properties": {"f": {"type": "string"}}}
+        with self.assertRaises(jsonschema.exceptions.ValidationError):
+            self.strategy.monitor()
+
+
+if __name__ == '__main__':
+    unittest.main()
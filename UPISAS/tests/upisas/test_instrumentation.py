@@ -0,0 +1,68 @@
+import unittest
+
+from UPISAS.exemplars.in_process_demo import InProcessDemoExemplar
+from UPISAS.instrumentation import Histogram, MetricsRegistry, REGISTRY
+from UPISAS.strategies.demo_strategy import DemoStrategy
+
+
+class TestInstrumentation(unittest.TestCase):
+    """
+    Test cases for the metrics registry, and the phase timings of the Strategy class (no docker needed).
+    """
+
+    def test_histogram_buckets_and_quantile(self):
+        histogram = Histogram(buckets=(0.1, 0.2, 0.4))
+        for value in (0.05, 0.15, 0.15, 0.3, 1.0):
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [1, 2, 1, 1])
+        self.assertEqual(histogram.count, 5)
+        self.assertAlmostEqual(histogram.sum, 1.65)
+        self.assertAlmostEqual(histogram.quantile(0.5), 0.175)
+        self.assertEqual(histogram.quantile(1.0), 0.4)
+
+    def test_timer_observes_failing_blocks(self):
+        registry = MetricsRegistry()
+        with self.assertRaises(ValueError):
+            with registry.timer("phase_seconds", phase="plan"):
+                raise ValueError
+        self.assertEqual(registry.histogram("phase_seconds", phase="plan").count, 1)
+
+    def test_render_prometheus_text(self):
+        registry = MetricsRegistry()
+        registry.describe("requests_seconds", "Request latency")
+        registry.histogram("requests_seconds", buckets=(0.5, 1.0), endpoint="/monitor").observe(0.7)
+        registry.counter("errors_total", endpoint='a"b').inc(2)
+        lines = registry.render().splitlines()
+        self.assertIn('errors_total{endpoint="a\\"b"} 2', lines)
+        self.assertIn("# HELP requests_seconds Request latency", lines)
+        self.assertIn("# TYPE requests_seconds histogram", lines)
+        self.assertIn('requests_seconds_bucket{endpoint="/monitor",le="0.5"} 0', lines)
+        self.assertIn('requests_seconds_bucket{endpoint="/monitor",le="1.0"} 1', lines)
+        self.assertIn('requests_seconds_bucket{endpoint="/monitor",le="+Inf"} 1', lines)
+        self.assertIn('requests_seconds_count{endpoint="/monitor"} 1', lines)
+
+    def test_metric_type_conflict(self):
+        registry = MetricsRegistry()
+        registry.counter("calls")
+        with self.assertRaises(ValueError):
+            registry.histogram("calls")
+
+    def test_strategy_phases_are_timed(self):
+        exemplar = InProcessDemoExemplar(auto_start=True)
+        exemplar.start_run()
+        try:
+            REGISTRY.reset()
+            strategy = DemoStrategy(exemplar)
+            strategy.monitor(with_validation=False)
+            strategy.knowledge.monitored_data = {"f": [0.3]}  # DemoStrategy analyzes a list of samples
+            strategy.analyze()
+            strategy.plan()
+        finally:
+            exemplar.stop_container()
+        for phase in ("monitor", "monitor_fetch", "monitor_process", "analyze", "plan"):
+            self.assertEqual(REGISTRY.histogram("upisas_phase_seconds", phase=phase).count, 1, phase)
+        self.assertEqual(REGISTRY.histogram("upisas_http_request_seconds", method="GET", endpoint="/monitor").count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
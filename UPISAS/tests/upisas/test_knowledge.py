@@ -0,0 +1,105 @@
+import copy
+import math
+import unittest
+
+from UPISAS.knowledge import RingBuffer, MonitoredHistory
+
+
+class TestRingBuffer(unittest.TestCase):
+    """
+    Test cases for the RingBuffer backing the monitored history.
+    """
+
+    def test_window_before_wrap(self):
+        buffer = RingBuffer(4)
+        for value in (1, 2, 3):
+            buffer.append(value)
+        self.assertEqual(list(buffer.window()), [1, 2, 3])
+        self.assertEqual(list(buffer.window(2)), [2, 3])
+
+    def test_window_after_wrap(self):
+        buffer = RingBuffer(4)
+        for value in range(1, 11):
+            buffer.append(value)
+        self.assertEqual(len(buffer), 4)
+        self.assertEqual(list(buffer.window()), [7, 8, 9, 10])
+        self.assertEqual(list(buffer.window(100)), [7, 8, 9, 10])
+        self.assertEqual(buffer.last(), 10)
+
+    def test_window_is_a_readonly_view(self):
+        buffer = RingBuffer(2)
+        buffer.append(1)
+        window = buffer.window()
+        self.assertIsInstance(window, memoryview)
+        self.assertTrue(window.readonly)
+
+
+class TestMonitoredHistory(unittest.TestCase):
+    """
+    Test cases for recording monitored data into the MonitoredHistory.
+    """
+
+    monitored_data = {
+        "RESTAURANT-SERVICE": {
+            "serviceId": "RESTAURANT-SERVICE",
+            "snapshot": [
+                {"id": 7, "instanceId": "restaurant-1", "status": "ACTIVE", "cpuUsage": 0.5, "failed": False,
+                 "active": True, "qos": {"availability": 80, "responseTime": None}},
+            ]
+        },
+        "f": 0.25
+    }
+
+    def _monitored_data(self, snapshot_id):
+        monitored_data = copy.deepcopy(self.monitored_data)
+        monitored_data["RESTAURANT-SERVICE"]["snapshot"][0]["id"] = snapshot_id
+        return monitored_data
+
+    def test_record(self):
+        history = MonitoredHistory(capacity=8)
+        for snapshot_id in range(3):
+            history.record(self._monitored_data(snapshot_id))
+        self.assertEqual(history.ticks, 3)
+        self.assertEqual(list(history.window("RESTAURANT-SERVICE", "restaurant-1", "availability")), [80] * 3)
+        self.assertEqual(list(history.window("RESTAURANT-SERVICE", "restaurant-1", "cpuUsage")), [0.5] * 3)
+        self.assertEqual(list(history.window(None, None, "f")), [0.25] * 3)
+        # The failed flag gives the failed metric, missing QoS values are NaN
+        self.assertEqual(list(history.window("RESTAURANT-SERVICE", "restaurant-1", "failed")), [0] * 3)
+        self.assertTrue(all(map(math.isnan, history.window("RESTAURANT-SERVICE", "restaurant-1", "responseTime"))))
+        # Other flags and ids are not metrics
+        for field in ("active", "id"):
+            self.assertNotIn(("RESTAURANT-SERVICE", "restaurant-1", field), history)
+
+    def test_repeated_snapshots_are_recorded_once(self):
+        history = MonitoredHistory(capacity=8)
+        for snapshot_id in (1, 1, 2):
+            history.record(self._monitored_data(snapshot_id))
+        self.assertEqual(len(history.window("RESTAURANT-SERVICE", "restaurant-1", "availability")), 2)
+        self.assertEqual(list(history.window(None, None, "f")), [0.25] * 3)
+
+    def test_removed_instances_are_dropped(self):
+        history = MonitoredHistory(capacity=8)
+        for count in (1, 2, 3, 1):
+            history.record({"S": {"snapshot": [{"instanceId": f"i{index}", "cpuUsage": 0.5}
+                                               for index in range(count)]}})
+        self.assertEqual({key[:2] for key in history.keys()}, {("S", "i0")})
+        self.assertEqual(list(history.instances("S")), ["i0"])
+        self.assertEqual(len(history.window("S", "i0", "cpuUsage")), 4)
+        # An instance that comes back starts a new series
+        history.record({"S": {"snapshot": [{"instanceId": "i0", "cpuUsage": 0.5},
+                                           {"instanceId": "i2", "cpuUsage": 0.5}]}})
+        self.assertEqual(len(history.window("S", "i2", "cpuUsage")), 1)
+
+    def test_statistics(self):
+        history = MonitoredHistory(capacity=4)
+        for value in (1, 2, 3, 4, 5):
+            history.append("S", "i", "m", value)
+        self.assertEqual(history.mean("S", "i", "m"), 3.5)
+        self.assertEqual(history.mean("S", "i", "m", size=2), 4.5)
+        self.assertEqual(history.percentile("S", "i", "m", 50), 3.5)
+        self.assertEqual(history.percentile("S", "i", "m", 100), 5)
+        self.assertTrue(math.isnan(history.mean("S", "other", "m")))
+
+
+if __name__ == '__main__':
+    unittest.main()
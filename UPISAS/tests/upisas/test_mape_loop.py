@@ -0,0 +1,94 @@
+import time
+import unittest
+
+from UPISAS.exemplars.in_process_demo import InProcessDemoExemplar
+from UPISAS.mape_loop import MapeKLoop
+from UPISAS.strategy import Strategy
+
+
+class _RecordingStrategy:
+    """Stands in for a Strategy, recording when each phase runs."""
+
+    def __init__(self, analyze_time=0.0):
+        self.analyze_time = analyze_time
+        self.fetches = []
+        self.executed = 0
+        self.processed = []
+
+    def fetch_monitor_data(self, endpoint_suffix):
+        self.fetches.append(time.monotonic())
+        return {"tick": len(self.fetches)}
+
+    def process_monitor_data(self, fresh_data, with_validation=True, verbose=False):
+        self.processed.append(fresh_data["tick"])
+
+    def analyze(self):
+        time.sleep(self.analyze_time)
+        return True
+
+    def plan(self):
+        return True
+
+    def execute(self):
+        self.executed += 1
+
+
+class _SelfMonitoringStrategy(Strategy):
+    """Overrides monitor(), as strategies written before the loop existed do."""
+
+    def __init__(self, exemplar):
+        super().__init__(exemplar)
+        self.monitored = 0
+
+    def monitor(self, endpoint_suffix="monitor", with_validation=True, verbose=False):
+        self.monitored += 1
+        return super().monitor(endpoint_suffix, with_validation=False, verbose=verbose)
+
+    def analyze(self):
+        return False
+
+    def plan(self):
+        return False
+
+
+class TestMapeKLoop(unittest.TestCase):
+    """
+    Test cases for the asyncio MAPE-K loop driver.
+    """
+
+    def test_runs_requested_ticks_on_period(self):
+        strategy = _RecordingStrategy()
+        loop = MapeKLoop(strategy, tick_period=0.05)
+        self.assertEqual(loop.run_for(ticks=4), 4)
+        self.assertEqual(strategy.processed, [1, 2, 3, 4])
+        self.assertEqual(strategy.executed, 4)
+        gaps = [b - a for a, b in zip(strategy.fetches, strategy.fetches[1:])]
+        self.assertTrue(all(0.03 < gap < 0.1 for gap in gaps))
+
+    def test_without_overlap(self):
+        strategy = _RecordingStrategy()
+        loop = MapeKLoop(strategy, tick_period=0.05, overlap=False)
+        self.assertEqual(loop.run_for(ticks=3), 3)
+        self.assertEqual(strategy.processed, [1, 2, 3])
+
+    def test_overrun_skips_ticks(self):
+        strategy = _RecordingStrategy(analyze_time=0.12)
+        loop = MapeKLoop(strategy, tick_period=0.05)
+        loop.run_for(ticks=2)
+        self.assertGreater(loop.skipped_ticks, 0)
+
+    def test_overridden_monitor_is_called(self):
+        exemplar = InProcessDemoExemplar(auto_start=True)
+        exemplar.start_run()
+        self.addCleanup(exemplar.stop_container)
+        strategy = _SelfMonitoringStrategy(exemplar)
+        loop = MapeKLoop(strategy, tick_period=0.05)
+        self.assertTrue(loop.monitors_itself)
+        self.assertFalse(MapeKLoop(_RecordingStrategy()).monitors_itself)
+        self.assertEqual(loop.run_for(ticks=3), 3)
+        self.assertEqual(strategy.monitored, 3)
+        self.assertIn("f", strategy.knowledge.monitored_data)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import math
+import random
+import unittest
+
+from UPISAS.metrics import swim_utility, ramses_columns
+
+
+def _swim_utility_reference(mon_data, rt_threshold, max_service_rate):
+    """The per-sample loop the vectorized utility replaces."""
+    utilities = []
+    for i in range(len(mon_data["max_servers"])):
+        max_servers = int(mon_data["max_servers"][i])
+        arrival_rate = mon_data["arrival_rate"][i]
+        dimmer = mon_data["dimmer_factor"][i]
+        max_throughput = max_servers * max_service_rate
+        avg_response_time = ((mon_data["basic_rt"][i] * mon_data["basic_throughput"][i]
+                              + mon_data["opt_rt"][i] * mon_data["opt_throughput"][i])
+                             / (mon_data["basic_throughput"][i] + mon_data["opt_throughput"][i]))
+        ur = arrival_rate * ((1 - dimmer) * 1 + dimmer * 1.5)
+        uc = 10 * (max_servers - mon_data["servers"][i])
+        if avg_response_time <= rt_threshold and ur >= arrival_rate * 1.5 - 1e-5:
+            utilities.append(ur + uc)
+        elif avg_response_time <= rt_threshold:
+            utilities.append(ur)
+        else:
+            utilities.append(min(0.0, arrival_rate - max_throughput) * 1.5)
+    return utilities
+
+
+class TestMetrics(unittest.TestCase):
+    """
+    Test cases for the vectorized run metrics.
+    """
+
+    def test_swim_utility_matches_reference(self):
+        rng = random.Random(42)
+        n = 500
+        mon_data = {
+            "max_servers": [rng.choice([1, 2, 3]) for _ in range(n)],
+            "servers": [rng.uniform(1, 3) for _ in range(n)],
+            "arrival_rate": [rng.uniform(0, 20) for _ in range(n)],
+            "dimmer_factor": [rng.choice([0.0, 0.5, 1.0]) for _ in range(n)],
+            "basic_rt": [rng.uniform(0, 1) for _ in range(n)],
+            "opt_rt": [rng.uniform(0, 1) for _ in range(n)],
+            "basic_throughput": [rng.uniform(0.1, 10) for _ in range(n)],
+            "opt_throughput": [rng.uniform(0.1, 10) for _ in range(n)],
+        }
+        expected = _swim_utility_reference(mon_data, 0.5, 7)
+        actual = swim_utility(mon_data, 0.5, 7).tolist()
+        for e, a in zip(expected, actual):
+            self.assertAlmostEqual(e, a)
+
+    def test_ramses_columns(self):
+        monitored_data = {
+            "A": {"snapshot": [{"qos": {"availability": "80%", "responseTime": 2, "failureRate": 0.5}},
+                               {"qos": {"availability": 90, "responseTime": None}}]},
+            "B": {"snapshot": None},
+        }
+        columns = ramses_columns(monitored_data, defaults={"failureRate": 0})
+        self.assertEqual(columns["availability"].tolist(), [80, 90])
+        self.assertEqual(columns["failureRate"].tolist(), [0.5, 0])
+        self.assertEqual(columns["responseTime"][0], 2)
+        self.assertTrue(math.isnan(columns["responseTime"][1]))
+        self.assertEqual(ramses_columns({})["utility"].shape, (0,))
+        columns = ramses_columns({"A": {"snapshot": [{"qos": {"availability": 95.5}}]}})
+        self.assertEqual(columns["availability"].tolist(), [95.5])
+        self.assertTrue(math.isnan(columns["utility"][0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import sys
+import unittest
+
+INTERFACE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "ramses", "Interface"))
+if INTERFACE_PATH not in sys.path:
+    sys.path.insert(0, INTERFACE_PATH)
+
+from monitor_stream import MonitorState  # noqa: E402
+
+
+def _service(instances, weights=None):
+    return {"serviceId": "S", "instances": instances, "instanceConfig": {"weights": weights}}
+
+
+class TestMonitorState(unittest.TestCase):
+    """
+    Test cases for the versioned monitor document behind /monitor/stream.
+    """
+
+    def setUp(self):
+        self.state = MonitorState(history_size=3)
+        self.state.update({"A": _service(["a1"]), "B": _service(["b1"])})
+
+    def test_unchanged_document_keeps_its_version(self):
+        self.assertEqual(self.state.update({"A": _service(["a1"]), "B": _service(["b1"])}), 1)
+        self.assertIsNone(self.state.event_since(1))
+
+    def test_new_client_gets_the_full_document(self):
+        event_type, payload = self.state.event_since(None)
+        self.assertEqual(event_type, "full")
+        self.assertEqual(payload, {"version": 1, "document": self.state.document})
+
+    def test_deltas_are_merged(self):
+        self.state.update({"A": _service(["a1", "a2"]), "B": _service(["b1"])})
+        self.state.update({"A": _service(["a1", "a2"], {"a1": 1.0}), "B": _service(["b1"])})
+        self.state.update({"A": _service(["a1", "a2"], {"a1": 1.0}), "C": _service(["c1"])})
+        self.assertEqual(self.state.event_since(1), ("delta", {
+            "version": 4,
+            # Only the fields that changed, with their latest value
+            "changed": {"A": {"instances": ["a1", "a2"], "instanceConfig": {"weights": {"a1": 1.0}}},
+                        "C": _service(["c1"])},
+            "removed": ["B"],
+        }))
+        self.assertEqual(self.state.event_since(3)[1]["changed"], {"C": _service(["c1"])})
+
+    def test_removed_then_added_again(self):
+        self.state.update({"A": _service(["a1"])})
+        self.state.update({"A": _service(["a1"]), "B": _service(["b2"])})
+        event_type, payload = self.state.event_since(1)
+        self.assertEqual(payload["changed"], {"B": _service(["b2"])})
+        self.assertEqual(payload["removed"], [])
+
+    def test_history_overflow_falls_back_to_the_full_document(self):
+        for count in range(2, 7):
+            self.state.update({"A": _service([f"a{i}" for i in range(count)])})
+        # History of 3: versions 4 to 6 are kept, so a client at 3 still gets a delta
+        self.assertEqual(self.state.event_since(3)[0], "delta")
+        self.assertEqual(self.state.event_since(2)[0], "full")
+        # As does a client claiming a version that was never sent
+        self.assertEqual(self.state.event_since(99)[0], "full")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+import os
+import sys
+import threading
+import time
+import unittest
+
+INTERFACE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "ramses", "Interface"))
+if INTERFACE_PATH not in sys.path:
+    sys.path.insert(0, INTERFACE_PATH)
+
+from monitor_stream import MonitorState  # noqa: E402
+from prefetcher import MonitorPrefetcher  # noqa: E402
+from probe_cache import ProbeCache, ARCHITECTURE, CONFIGURATION, SNAPSHOT  # noqa: E402
+
+
+class _Loader:
+    def __init__(self, value="value"):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+class TestProbeCache(unittest.TestCase):
+    """
+    Test cases for the TTL cache of the probe responses of the RAMSES interface.
+    """
+
+    def setUp(self):
+        self.cache = ProbeCache(ttls={ARCHITECTURE: 60, CONFIGURATION: 60, SNAPSHOT: 0.05})
+
+    def test_entries_expire_after_their_ttl(self):
+        loader = _Loader()
+        self.assertEqual(self.cache.get((SNAPSHOT, "A"), loader), "value")
+        self.assertEqual(self.cache.get((SNAPSHOT, "A"), loader), "value")
+        self.assertEqual(loader.calls, 1)
+        time.sleep(0.06)
+        self.cache.get((SNAPSHOT, "A"), loader)
+        self.assertEqual(loader.calls, 2)
+        # An expired entry can still be peeked at
+        time.sleep(0.06)
+        self.assertEqual(self.cache.peek((SNAPSHOT, "A")), "value")
+
+    def test_zero_ttl_disables_caching(self):
+        cache = ProbeCache(ttls={SNAPSHOT: 0})
+        loader = _Loader()
+        cache.get((SNAPSHOT, "A"), loader)
+        cache.get((SNAPSHOT, "A"), loader)
+        self.assertEqual(loader.calls, 2)
+        self.assertIsNone(cache.peek((SNAPSHOT, "A")))
+
+    def test_failed_fetches_are_not_cached(self):
+        failing = _Loader(None)
+        self.assertIsNone(self.cache.get((ARCHITECTURE,), failing))
+        self.assertIsNone(self.cache.get((ARCHITECTURE,), failing))
+        self.assertEqual(failing.calls, 2)
+        self.assertEqual(self.cache.get((ARCHITECTURE,), _Loader({"A": {}})), {"A": {}})
+
+    def test_invalidate(self):
+        for key in ((ARCHITECTURE,), (CONFIGURATION, "A", "a"), (CONFIGURATION, "B", "b"), (SNAPSHOT, "A")):
+            self.cache.get(key, _Loader())
+        self.cache.invalidate(CONFIGURATION, "A")
+        self.assertIsNone(self.cache.peek((CONFIGURATION, "A", "a")))
+        self.assertEqual(self.cache.peek((CONFIGURATION, "B", "b")), "value")
+        # Without a service, all the entries of the kind
+        self.cache.get((CONFIGURATION, "A", "a"), _Loader())
+        self.cache.invalidate(CONFIGURATION, None)
+        self.assertIsNone(self.cache.peek((CONFIGURATION, "A", "a")))
+        self.assertIsNone(self.cache.peek((CONFIGURATION, "B", "b")))
+        self.assertEqual(self.cache.peek((SNAPSHOT, "A")), "value")
+        self.cache.invalidate()
+        self.assertIsNone(self.cache.peek((ARCHITECTURE,)))
+        self.assertIsNone(self.cache.peek((SNAPSHOT, "A")))
+
+    def test_invalidation_during_a_fetch(self):
+        fetching, invalidated = threading.Event(), threading.Event()
+
+        def slow_loader():
+            fetching.set()
+            self.assertTrue(invalidated.wait(5))
+            return "before the adaptation"
+
+        def invalidate(*args):
+            self.assertTrue(fetching.wait(5))
+            self.cache.invalidate(*args)
+            invalidated.set()
+
+        for args in ((), (CONFIGURATION,), (CONFIGURATION, "A")):
+            with self.subTest(args=args):
+                fetching.clear()
+                invalidated.clear()
+                thread = threading.Thread(target=invalidate, args=args)
+                thread.start()
+                # The fetched value is returned, but not cached
+                self.assertEqual(self.cache.get((CONFIGURATION, "A", "a"), slow_loader), "before the adaptation")
+                thread.join()
+                self.assertIsNone(self.cache.peek((CONFIGURATION, "A", "a")))
+                self.assertEqual(self.cache.get((CONFIGURATION, "A", "a"), _Loader()), "value")
+                self.cache.invalidate()
+
+        # Invalidating another service does not discard it
+        fetching.clear()
+        invalidated.clear()
+        thread = threading.Thread(target=invalidate, args=(CONFIGURATION, "B"))
+        thread.start()
+        self.cache.get((CONFIGURATION, "A", "a"), slow_loader)
+        thread.join()
+        self.assertEqual(self.cache.peek((CONFIGURATION, "A", "a")), "before the adaptation")
+
+
+class TestMonitorPrefetcher(unittest.TestCase):
+    """
+    Test cases for the background refresh of the monitor document.
+    """
+
+    def setUp(self):
+        self.state = MonitorState()
+        self.builds = 0
+        self.built = threading.Event()
+
+    def _build(self):
+        self.builds += 1
+        if self.builds >= 3:
+            self.built.set()
+        return {"A": {"version": self.builds}}
+
+    def test_start_and_stop(self):
+        prefetcher = MonitorPrefetcher(self.state, self._build, interval=0.01)
+        prefetcher.start()
+        prefetcher.start()  # Already running: no second thread
+        self.assertTrue(self.built.wait(5))
+        prefetcher.stop()
+        builds = self.builds
+        self.assertGreaterEqual(self.state.version, 3)
+        time.sleep(0.05)
+        self.assertEqual(self.builds, builds)
+        # And it can be started again
+        self.built.clear()
+        prefetcher.start()
+        self.addCleanup(prefetcher.stop)
+        self.assertTrue(self.built.wait(5))
+
+    def test_disabled(self):
+        prefetcher = MonitorPrefetcher(self.state, self._build, interval=0)
+        self.assertFalse(prefetcher.enabled)
+        prefetcher.start()
+        time.sleep(0.02)
+        prefetcher.stop()
+        self.assertEqual(self.builds, 0)
+
+    def test_failed_build_keeps_prefetching(self):
+        def build():
+            self.builds += 1
+            if self.builds == 1:
+                raise RuntimeError("probe unreachable")
+            return {"A": {"status": "ok"}}
+
+        prefetcher = MonitorPrefetcher(self.state, build, interval=0.01)
+        prefetcher.start()
+        self.addCleanup(prefetcher.stop)
+        self.assertEqual(self.state.wait_for_change(0, timeout=5), 1)
+        self.assertEqual(self.state.document, {"A": {"status": "ok"}})
+
+
+if __name__ == '__main__':
+    unittest.main()
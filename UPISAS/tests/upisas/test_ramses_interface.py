@@ -0,0 +1,187 @@
+import os
+import sys
+import unittest
+
+from UPISAS import codec
+from UPISAS.standins.ramses_backend import RamsesStandIn
+
+# The interface imports its sibling modules at the top level, as when it runs from its own directory
+INTERFACE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "ramses", "Interface"))
+if INTERFACE_PATH not in sys.path:
+    sys.path.insert(0, INTERFACE_PATH)
+
+import api  # noqa: E402
+
+
+class TestRamsesInterface(unittest.TestCase):
+    """
+    Test cases for the RAMSES interface app, against the stand-in RAMSES backend (no docker needed).
+    """
+
+    def setUp(self):
+        self.standin = RamsesStandIn(services=3, instances=2, seed=0).start()
+        self.addCleanup(self.standin.stop)
+        api.probe_url = api.instances_manager_url = api.load_balancer_url = self.standin.url
+        api.probe_cache.invalidate()
+        api.monitor_state.invalidate()
+        self.addCleanup(api.monitor_prefetcher.stop)
+        self.client = api.app.test_client()
+
+    def _monitor(self, **params):
+        response = self.client.get("/monitor", query_string=params)
+        self.assertEqual(response.status_code, 200)
+        return codec.loads(response.data)
+
+    def test_monitor_shows_adaptations_at_once(self):
+        self.assertTrue(api.monitor_prefetcher.enabled)
+        self.assertEqual(len(self._monitor()["SERVICE-0"]["instances"]), 2)
+        response = self.client.post("/execute", json={"operation": "addInstances",
+                                                      "serviceImplementationName": "service-0",
+                                                      "numberOfInstances": 1})
+        self.assertEqual(response.status_code, 200)
+        # Without waiting for the prefetcher, and although any staleness is allowed
+        self.assertEqual(len(self._monitor()["SERVICE-0"]["instances"]), 3)
+
+
+    def _first_stream_event(self, **kwargs):
+        response = self.client.get("/monitor/stream", buffered=False, **kwargs)
+        self.assertEqual(response.status_code, 200)
+        try:
+            return next(response.response).decode().splitlines()
+        finally:
+            response.close()
+
+    def test_stream_resumes_from_last_event_id(self):
+        self._monitor()
+        version = api.monitor_state.version
+        self.client.post("/execute", json={"operation": "addInstances", "serviceImplementationName": "service-1",
+                                           "numberOfInstances": 1})
+        lines = self._first_stream_event(headers={"Last-Event-ID": str(version)})
+        self.assertEqual(lines[1], "event: delta")
+        self.assertEqual(list(codec.loads(lines[2][len("data: "):])["changed"]), ["SERVICE-1"])
+
+    def test_stream_with_invalid_resume_point_sends_the_full_document(self):
+        for kwargs in ({"headers": {"Last-Event-ID": "abc"}}, {"query_string": {"since": "1.5"}}):
+            lines = self._first_stream_event(**kwargs)
+            self.assertEqual(lines[1], "event: full")
+            self.assertIn("SERVICE-0", codec.loads(lines[2][len("data: "):])["document"])
+
+
+    def _add(self, implementation, count=1):
+        return {"operation": "addInstances", "serviceImplementationName": implementation, "numberOfInstances": count}
+
+    def _remove(self, implementation, port):
+        return {"operation": "removeInstance", "serviceImplementationName": implementation,
+                "address": implementation, "port": port}
+
+    def test_only_consecutive_add_instances_are_merged(self):
+        batch = [(index, api.UnifiedRequest.decode(item)) for index, item in enumerate([
+            self._add("service-0"), self._add("service-0", 2), self._add("service-1"),
+            self._remove("service-0", 50001), self._add("service-0")])]
+        merged = api.merge_add_instances(batch)
+        self.assertEqual([(indices, getattr(req, "numberOfInstances", None)) for indices, req in merged],
+                         [([0, 1], 3), ([2], 1), ([3], None), ([4], 1)])
+        # The requests of the batch are left as they were
+        self.assertEqual(batch[0][1].numberOfInstances, 1)
+
+    def test_requests_on_one_service_share_a_target(self):
+        self._monitor()
+        weights = {"operation": "changeLBWeights", "weightsId": "SERVICE-0", "weights": {},
+                   "instancesToRemoveWeightOf": []}
+        targets = {api.request_target(api.UnifiedRequest.decode(item))
+                   for item in (self._add("service-0"), self._remove("service-0", 50001), weights)}
+        self.assertEqual(targets, {"SERVICE-0"})
+
+    def test_batch_results(self):
+        self._monitor()
+        # Ports 50001-50006 are the instances of the 3 services; new instances get 50007 on
+        response = self.client.post("/execute_batch", json=[
+            self._add("service-0"), self._remove("service-0", 50007), self._add("service-0"),
+            {"operation": "unknown"}])
+        self.assertEqual(response.status_code, 200)
+        results = codec.loads(response.data)["results"]
+        self.assertEqual([(result["status"], result["merged"]) for result in results],
+                         [(200, False), (200, False), (200, False), (400, False)])
+        # The remove ran between the two adds, not after them
+        self.assertEqual(results[0]["response"]["dockerizedInstances"], [{"address": "service-0", "port": 50007}])
+        self.assertNotIn("error", results[1]["response"])
+        self.assertEqual(results[2]["response"]["dockerizedInstances"], [{"address": "service-0", "port": 50008}])
+        self.assertEqual(self._monitor()["SERVICE-0"]["instances"],
+                         ["service-0@service-0:50001", "service-0@service-0:50002", "service-0@service-0:50008"])
+
+        response = self.client.post("/execute_batch", json=[self._add("service-1"), self._add("service-1")])
+        results = codec.loads(response.data)["results"]
+        self.assertEqual([(result["status"], result["merged"]) for result in results], [(200, True), (200, True)])
+        self.assertEqual(len(results[0]["response"]["dockerizedInstances"]), 2)
+        self.assertEqual(len(self._monitor()["SERVICE-1"]["instances"]), 4)
+
+    def test_batch_keeps_the_order_of_one_service(self):
+        self._monitor()
+        # Removing an instance resets the weights of its service, so they must be set after it
+        response = self.client.post("/execute_batch", json=[
+            self._remove("service-0", 50002),
+            {"operation": "changeLBWeights", "weightsId": "SERVICE-0",
+             "weights": {"service-0@service-0:50001": 1.0},
+             "instancesToRemoveWeightOf": ["service-0@service-0:50002"]}])
+        self.assertEqual([result["status"] for result in codec.loads(response.data)["results"]], [200, 200])
+        self.assertEqual(self._monitor()["SERVICE-0"]["instanceConfig"]["loadBalancerWeights"],
+                         {"service-0@service-0:50001": 1.0})
+
+
+    def test_valid_requests(self):
+        weights = {"operation": "changeLBWeights", "weightsId": "SERVICE-0", "weights": {"a": 1, "b": 0.5},
+                   "instancesToRemoveWeightOf": []}
+        req = api.UnifiedRequest.decode(weights)
+        self.assertIsInstance(req, api.ChangeLBWeights)
+        self.assertEqual(req.weights, {"a": 1.0, "b": 0.5})
+        self.assertIsInstance(req.weights["a"], float)
+        req = api.UnifiedRequest.decode(self._remove("service-0", 50001))
+        self.assertEqual(req, api.RemoveInstance("removeInstance", "service-0", "service-0", 50001))
+        response = self.client.post("/execute", json=self._add("service-0", 2))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(codec.loads(response.data)["dockerizedInstances"]), 2)
+
+    def test_malformed_requests(self):
+        malformed = {
+            "not an object": ["addInstances"],
+            "unknown operation": {"operation": "restart"},
+            "missing operation": {"serviceImplementationName": "service-0", "numberOfInstances": 1},
+            "missing field": {"operation": "addInstances", "serviceImplementationName": "service-0"},
+            "wrong type": self._add("service-0", "1"),
+            "bool for an integer": self._add("service-0", True),
+            "unknown key": dict(self._add("service-0"), force=True),
+            "key of another operation": dict(self._add("service-0"), weightsId="SERVICE-0"),
+        }
+        for case, item in malformed.items():
+            with self.subTest(case):
+                with self.assertRaises(api.InvalidRequest):
+                    api.UnifiedRequest.decode(item)
+                response = self.client.post("/execute", json=item)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("Invalid request", codec.loads(response.data)["error"])
+        self.assertEqual(self.client.post("/execute", data="{", content_type="application/json").status_code, 400)
+        self.assertEqual(self.client.post("/execute", data="operation=addInstances").status_code, 400)
+        response = self.client.post("/execute_batch", json=[self._add("service-0"), dict(self._add("service-0"), x=1)])
+        self.assertEqual([result["status"] for result in codec.loads(response.data)["results"]], [200, 400])
+
+    @unittest.skipIf("msgpack" not in codec.CODECS, "msgpack is not installed")
+    def test_msgpack_request(self):
+        msgpack = codec.get_codec("msgpack")
+        response = self.client.post("/execute", data=msgpack.dumps(self._add("service-0")),
+                                    content_type=codec.MSGPACK_MEDIA_TYPE)
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post("/execute", data=msgpack.dumps({"operation": "restart"}),
+                                    content_type="application/x-msgpack")
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post("/execute", data=b"\xc1", content_type=codec.MSGPACK_MEDIA_TYPE)
+        self.assertEqual(response.status_code, 400)
+
+    @unittest.skipIf("msgpack" in codec.CODECS, "msgpack is installed")
+    def test_msgpack_request_without_msgpack(self):
+        response = self.client.post("/execute", data=b"\x81", content_type=codec.MSGPACK_MEDIA_TYPE)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("msgpack", codec.loads(response.data)["error"])
+
+
+if __name__ == '__main__':
+    unittest.main()
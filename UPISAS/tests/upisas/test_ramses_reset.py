@@ -0,0 +1,142 @@
+import unittest
+
+from requests.exceptions import ConnectionError
+
+from UPISAS.exceptions import ServerNotReachable
+from UPISAS.exemplars.ramses import RAMSES, ramses_baseline, ramses_reset_requests
+
+
+def _service(instances, weights):
+    return {"serviceId": "SERVICE", "instances": instances,
+            "instanceConfig": {"loadBalancerWeights": weights}}
+
+
+class TestRamsesReset(unittest.TestCase):
+    """
+    Test cases for resetting a running RAMSES stack to its baseline between runs (no docker needed).
+    """
+
+    def setUp(self):
+        self.baseline = ramses_baseline({
+            "PAYMENT": _service(["payment@payment:1"], {"payment@payment:1": 1.0}),
+            "ORDERING": _service(["ordering@ordering:2"], {"ordering@ordering:2": 1.0}),
+        })
+
+    def test_unchanged_stack_needs_no_requests(self):
+        monitored = {
+            "PAYMENT": _service(["payment@payment:1"], {"payment@payment:1": 1.0}),
+            "ORDERING": _service(["ordering@ordering:2"], {"ordering@ordering:2": 1.0}),
+        }
+        self.assertEqual(ramses_reset_requests(self.baseline, monitored), [])
+
+    def test_added_instances_are_removed_and_weights_restored(self):
+        monitored = {
+            "PAYMENT": _service(["payment@payment:1", "payment@payment:3"],
+                                {"payment@payment:1": 0.5, "payment@payment:3": 0.5}),
+            "ORDERING": _service(["ordering@ordering:2"], {"ordering@ordering:2": 1.0}),
+        }
+        self.assertEqual(ramses_reset_requests(self.baseline, monitored), [
+            {"operation": "removeInstance", "serviceImplementationName": "payment",
+             "address": "payment", "port": 3},
+            {"operation": "changeLBWeights", "weightsId": "PAYMENT", "weights": {"payment@payment:1": 1.0},
+             "instancesToRemoveWeightOf": ["payment@payment:3"]},
+        ])
+
+    def test_changed_weights_are_restored(self):
+        self.baseline["ORDERING"]["weights"] = {"ordering@ordering:2": 0.7, "ordering@ordering:4": 0.3}
+        self.baseline["ORDERING"]["instances"].append("ordering@ordering:4")
+        monitored = {
+            "PAYMENT": _service(["payment@payment:1"], {"payment@payment:1": 1.0}),
+            "ORDERING": _service(["ordering@ordering:2", "ordering@ordering:4"],
+                                 {"ordering@ordering:2": 0.5, "ordering@ordering:4": 0.5}),
+        }
+        self.assertEqual(ramses_reset_requests(self.baseline, monitored), [
+            {"operation": "changeLBWeights", "weightsId": "ORDERING",
+             "weights": {"ordering@ordering:2": 0.7, "ordering@ordering:4": 0.3}, "instancesToRemoveWeightOf": []},
+        ])
+
+    def test_lost_instance_cannot_be_reset(self):
+        monitored = {
+            "PAYMENT": _service([], {}),
+            "ORDERING": _service(["ordering@ordering:2"], {"ordering@ordering:2": 1.0}),
+        }
+        self.assertIsNone(ramses_reset_requests(self.baseline, monitored))
+        self.assertIsNone(ramses_reset_requests(self.baseline, {"PAYMENT": monitored["PAYMENT"]}))
+
+
+class _FakeRAMSES(RAMSES):
+    """RAMSES with the compose stack and the interface process stood in for, recording what is restarted."""
+
+    def __init__(self, monitored, stack_healthy=True, interface_alive=True):
+        super().__init__(auto_start=False)
+        self.baseline = ramses_baseline(monitored)
+        self.monitored = monitored
+        self.stack_healthy = stack_healthy
+        self.interface_alive = interface_alive
+        self.restarted = []
+        self.executed = []
+
+    def wait_until_ready(self, services=None, max_wait=None):
+        if not self.stack_healthy:
+            raise ServerNotReachable
+
+    def start_container(self, wait_ready=True):
+        self.restarted.append("stack")
+        self.stack_healthy = True
+
+    def stop_container(self):
+        self.stop_interface()
+
+    def start_run(self, wait_ready=True, server=None):
+        self.restarted.append("interface")
+        self.interface_alive = True
+
+    def stop_interface(self):
+        self.interface_alive = False
+
+    def _get_monitor_document(self):
+        if not self.interface_alive:
+            raise ConnectionError("interface is down")
+        return self.monitored
+
+    def _execute_batch(self, execute_requests):
+        self.executed.extend(execute_requests)
+        return [{"status": 200} for _ in execute_requests]
+
+
+class TestRamsesResetFallbacks(unittest.TestCase):
+    """
+    Test cases for what RAMSES.reset restarts when the in-place reset cannot be done.
+    """
+
+    monitored = {"PAYMENT": _service(["payment@payment:1"], {"payment@payment:1": 1.0})}
+
+    def test_in_place_reset(self):
+        ramses = _FakeRAMSES(self.monitored)
+        self.assertTrue(ramses.reset())
+        self.assertEqual(ramses.restarted, [])
+        self.assertFalse(ramses.interface_alive)
+
+    def test_dead_interface_is_restarted_alone(self):
+        ramses = _FakeRAMSES(self.monitored, interface_alive=False)
+        ramses.monitored = {"PAYMENT": _service(["payment@payment:1", "payment@payment:3"], {})}
+        self.assertTrue(ramses.reset())
+        self.assertEqual(ramses.restarted, ["interface"])
+        self.assertEqual(ramses.executed[0]["operation"], "removeInstance")
+        self.assertIsNotNone(ramses.baseline)
+
+    def test_unhealthy_stack_is_restarted(self):
+        ramses = _FakeRAMSES(self.monitored, stack_healthy=False)
+        self.assertFalse(ramses.reset())
+        self.assertEqual(ramses.restarted, ["stack"])
+        self.assertIsNone(ramses.baseline)
+
+    def test_lost_baseline_instance_restarts_the_stack(self):
+        ramses = _FakeRAMSES(self.monitored)
+        ramses.monitored = {"PAYMENT": _service([], {})}
+        self.assertFalse(ramses.reset())
+        self.assertEqual(ramses.restarted, ["stack"])
+
+
+if __name__ == '__main__':
+    unittest.main()
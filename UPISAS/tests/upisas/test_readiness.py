@@ -0,0 +1,150 @@
+import io
+import socket
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from UPISAS.compose import ComposeService, _parse_compose_file
+from UPISAS.exceptions import ServerNotReachable
+from UPISAS.readiness import ReadinessProbe, StackReadiness, port_answers
+
+
+class _AliveHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(404)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class TestReadinessProbe(unittest.TestCase):
+    """
+    Test cases for the ReadinessProbe, against a local HTTP server (no docker needed).
+    """
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _AliveHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_ready_state_is_cached(self):
+        probe = ReadinessProbe(self.url)
+        self.assertTrue(probe.wait_until_ready())
+        self.assertTrue(probe.ready)
+        self.server.shutdown()
+        self.server.server_close()
+        self.assertTrue(probe.wait_until_ready(max_wait=0))
+
+    def test_mark_unready_rearms_probe(self):
+        probe = ReadinessProbe(self.url)
+        probe.wait_until_ready()
+        probe.mark_unready()
+        self.assertFalse(probe.ready)
+        self.assertTrue(probe.wait_until_ready())
+
+    def test_server_not_reachable(self):
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        probe = ReadinessProbe(f"http://127.0.0.1:{port}", initial_delay=0.01, max_wait=0.1)
+        with self.assertRaises(ServerNotReachable):
+            probe.wait_until_ready()
+        self.assertFalse(probe.ready)
+
+    def test_backoff_delay_is_bounded(self):
+        probe = ReadinessProbe(self.url, initial_delay=1, max_delay=4, jitter=0.5)
+        for attempt in range(10):
+            self.assertLessEqual(probe.backoff_delay(attempt), 6)
+            self.assertGreaterEqual(probe.backoff_delay(attempt), 0.5)
+
+
+
+class TestStackReadiness(unittest.TestCase):
+    """
+    Test cases for the StackReadiness gate, against local servers standing in for compose services.
+    """
+
+    def setUp(self):
+        self.servers = []
+
+    def tearDown(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+
+    def _free_port(self):
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            return s.getsockname()[1]
+
+    def _serve(self, port):
+        server = ThreadingHTTPServer(("127.0.0.1", port), _AliveHandler)
+        threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+        self.servers.append(server)
+
+    def test_port_must_answer(self):
+        with socket.socket() as silent:
+            # Accepts connections (like a published docker port) but never answers
+            silent.bind(("127.0.0.1", 0))
+            silent.listen()
+            self.assertFalse(port_answers("127.0.0.1", silent.getsockname()[1], timeout=0.2))
+        port = self._free_port()
+        self._serve(port)
+        self.assertTrue(port_answers("127.0.0.1", port))
+
+    def test_services_become_ready_in_dependency_order(self):
+        db_port, web_port = self._free_port(), self._free_port()
+        services = {
+            "web": ComposeService("web", ports=[(web_port, 80)], depends_on=["db"]),
+            "db": ComposeService("db", ports=[(db_port, 3306)]),
+            "worker": ComposeService("worker", depends_on=["web"]),
+        }
+        self._serve(web_port)
+        threading.Timer(0.3, self._serve, args=(db_port,)).start()
+        started = time.monotonic()
+        with self.assertLogs() as cm:
+            StackReadiness(services, poll_interval=0.05).wait_until_ready(max_wait=5)
+        self.assertGreaterEqual(time.monotonic() - started, 0.3)
+        ready = [line.split(":")[-1].split()[0] for line in cm.output if " is ready after" in line]
+        self.assertEqual(ready, ["db", "web", "worker"])
+
+    def test_services_not_ready(self):
+        services = {"db": ComposeService("db", ports=[(self._free_port(), 3306)])}
+        with self.assertRaises(ServerNotReachable):
+            StackReadiness(services, poll_interval=0.05).wait_until_ready(max_wait=0.2)
+
+    def test_parse_compose_file(self):
+        compose_file = io.StringIO(
+            "version: '3.8'\n"
+            "services:\n"
+            "  db:\n"
+            "    image: owner/db:${ARCH}\n"
+            "    ports:\n"
+            "      - \"32829:3306\"\n"
+            "  web:\n"
+            "    image: owner/web\n"
+            "    depends_on:\n"
+            "      db:\n"
+            "        condition: service_started\n"
+            "    ports:\n"
+            "      - \"127.0.0.1:8080:80\"  # Adjust if necessary\n"
+            "      - \"9000\"\n"
+            "networks:\n"
+            "  net:\n"
+            "    driver: bridge\n")
+        services = _parse_compose_file(compose_file, {"ARCH": "amd64"})
+        self.assertEqual(list(services), ["db", "web"])
+        self.assertEqual(services["db"].image, "owner/db:amd64")
+        self.assertEqual(services["db"].ports, [(32829, 3306)])
+        self.assertEqual(services["web"].depends_on, ["db"])
+        self.assertEqual(services["web"].ports, [(8080, 80)])
+
+
+if __name__ == '__main__':
+    unittest.main()
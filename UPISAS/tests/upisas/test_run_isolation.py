@@ -0,0 +1,70 @@
+import socket
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from UPISAS.compose import load_services
+from UPISAS.exceptions import NoRunSlotAvailable
+from UPISAS.exemplars.ramses import RAMSES
+from UPISAS.run_isolation import allocate_run_slot
+
+
+class TestRunIsolation(unittest.TestCase):
+    """
+    Test cases for the run slots, and the ports and compose project they give RAMSES (no docker needed).
+    """
+
+    def setUp(self):
+        self.lock_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.lock_dir.cleanup)
+
+    def test_slots_are_distinct_until_released(self):
+        first = allocate_run_slot("test", lock_dir=self.lock_dir.name)
+        second = allocate_run_slot("test", lock_dir=self.lock_dir.name)
+        self.assertEqual((first.index, first.project_name, first.port_offset), (0, "test", 0))
+        self.assertEqual((second.index, second.project_name, second.port_offset), (1, "test-1", 100))
+        first.release()
+        with allocate_run_slot("test", lock_dir=self.lock_dir.name) as third:
+            self.assertEqual(third.index, 0)
+        second.release()
+
+    def test_slots_are_exclusive_across_processes(self):
+        with allocate_run_slot("test", lock_dir=self.lock_dir.name):
+            code = ("from UPISAS.run_isolation import allocate_run_slot; "
+                    f"print(allocate_run_slot('test', lock_dir={self.lock_dir.name!r}).index)")
+            output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+            self.assertEqual(output.strip(), "1")
+
+    def test_slots_with_busy_ports_are_skipped(self):
+        with socket.socket() as listener:
+            listener.bind(("0.0.0.0", 0))
+            listener.listen()
+            port = listener.getsockname()[1]
+            with allocate_run_slot("test", ports=[port], port_stride=7, lock_dir=self.lock_dir.name) as slot:
+                self.assertEqual(slot.index, 1)
+                self.assertEqual(slot.port(port), port + 7)
+
+    def test_no_slot_available(self):
+        with allocate_run_slot("test", slot_count=1, lock_dir=self.lock_dir.name):
+            with self.assertRaises(NoRunSlotAvailable):
+                allocate_run_slot("test", slot_count=1, lock_dir=self.lock_dir.name)
+
+    def test_ramses_uses_the_ports_of_its_slot(self):
+        with allocate_run_slot("test", lock_dir=self.lock_dir.name), \
+                allocate_run_slot("test", lock_dir=self.lock_dir.name) as slot:
+            exemplar = RAMSES(auto_start=False, run_slot=slot)
+            self.assertEqual(exemplar.base_endpoint, "http://127.0.0.1:41348")
+            self.assertEqual(exemplar.interface_environment()["RAMSES_PROBE_URL"], "http://localhost:32938")
+            services = load_services(exemplar.ramses_path, environment=exemplar.compose_environment())
+            self.assertEqual(services["sefa-probe"].ports, [(32938, 58020)])
+
+    def test_ramses_without_slot_keeps_the_default_ports(self):
+        exemplar = RAMSES(auto_start=False)
+        self.assertEqual(exemplar.base_endpoint, "http://127.0.0.1:41248")
+        self.assertEqual(exemplar.compose_environment(), {})
+        self.assertEqual(load_services(exemplar.ramses_path)["sefa-probe"].ports, [(32838, 58020)])
+
+
+if __name__ == '__main__':
+    unittest.main()
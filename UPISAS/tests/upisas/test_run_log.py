@@ -0,0 +1,96 @@
+import os
+import tempfile
+import unittest
+
+from UPISAS.run_log import RunLog, RunRecorder, INDEX_FILE, METRICS_FILE, MONITOR, ANALYSIS, PLAN
+from UPISAS.strategy import Strategy
+
+
+def _monitored_data(tick):
+    return {
+        "S": {
+            "serviceId": "S",
+            "snapshot": [{"id": tick, "instanceId": "s@host:1", "status": "ACTIVE",
+                          "qos": {"availability": 80 + tick, "responseTime": 2}}]
+        }
+    }
+
+
+class _RecordingStrategy(Strategy):
+    def analyze(self):
+        self.knowledge.analysis_data = {"s": "addInstance"}
+        return True
+
+    def plan(self):
+        self.knowledge.plan_data = {"requests": []}
+        return True
+
+
+class _Exemplar:
+    base_endpoint = "http://127.0.0.1:9"
+    monitor_key_path = None
+    incomplete_monitor_key_count = None
+
+
+class TestRunLog(unittest.TestCase):
+    """
+    Test cases for the run log, written by RunRecorder and read back through memory maps by RunLog.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = self.directory.name
+
+    def test_entries_and_time_index(self):
+        with RunRecorder(self.path, chunk_size=64) as recorder:
+            for tick in range(5):
+                recorder.append(MONITOR, _monitored_data(tick), timestamp=100 + tick)
+                recorder.append(ANALYSIS, {"tick": tick}, timestamp=100.5 + tick)
+        with RunLog(self.path) as log:
+            self.assertEqual(len(log), 10)
+            self.assertEqual(log.kind(1), ANALYSIS)
+            self.assertEqual(log.document(2), _monitored_data(1))
+            entries = list(log.records(kind=ANALYSIS, start=102, end=104))
+            self.assertEqual([(time, document) for time, _, document in entries],
+                             [(102.5, {"tick": 2}), (103.5, {"tick": 3})])
+
+    def test_metric_series(self):
+        with RunRecorder(self.path) as recorder:
+            for tick in range(3):
+                recorder.append(MONITOR, _monitored_data(tick), timestamp=tick)
+            recorder.append(MONITOR, {"f": [0.5, 0.25]}, timestamp=3)
+        with RunLog(self.path) as log:
+            times, values = log.series("availability", "S", "s@host:1")
+            self.assertEqual(list(times), [0, 1, 2])
+            self.assertEqual(list(values), [80, 81, 82])
+            self.assertEqual(list(log.series("f")[1]), [0.5, 0.25])
+            self.assertEqual(len(log.series("availability", "unknown")[0]), 0)
+
+    def test_log_cut_short(self):
+        with RunRecorder(self.path) as recorder:
+            for tick in range(3):
+                recorder.append(MONITOR, _monitored_data(tick), timestamp=tick)
+        # As if the last index row and metric row were only partly written
+        for file_name in (INDEX_FILE, METRICS_FILE):
+            path = os.path.join(self.path, file_name)
+            os.truncate(path, os.path.getsize(path) - 3)
+        with RunLog(self.path) as log:
+            self.assertEqual(len(log), 2)
+            self.assertEqual(list(log.series("availability", "S", "s@host:1")[1]), [80, 81])
+
+    def test_strategy_records_its_phases(self):
+        strategy = _RecordingStrategy(_Exemplar())
+        strategy.recorder = RunRecorder(self.path)
+        strategy.process_monitor_data(_monitored_data(1), with_validation=False)
+        strategy.analyze()
+        strategy.plan()
+        strategy.recorder.close()
+        with RunLog(self.path) as log:
+            self.assertEqual([kind for _, kind, _ in log.records()], [MONITOR, ANALYSIS, PLAN])
+            self.assertEqual(log.document(1), {"s": "addInstance"})
+            self.assertIn("qos", log.document(0)["S"]["snapshot"][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import math
+import unittest
+
+import numpy as np
+
+from UPISAS.analysis import IncrementalAnalyzer, AVAILABILITY, FAILED, RESPONSE_TIME
+from UPISAS.knowledge import MonitoredHistory
+from UPISAS.metrics import ramses_columns
+from UPISAS.snapshot_model import MonitorSnapshot
+
+
+def _monitored_data(snapshot_id, statuses=("ACTIVE", "FAILED")):
+    return {
+        "S": {
+            "serviceId": "S",
+            "currentImplementationId": "s-impl",
+            "snapshot": [{"id": snapshot_id, "instanceId": f"s-impl@host:{port}", "status": status,
+                          "timestamp": f"t{snapshot_id}", "failed": status == "FAILED",
+                          "qos": {"availability": "85%", "responseTime": port - 8000}}
+                         for port, status in zip((8001, 8002), statuses)]
+        },
+        "CONFIG-SERVER": {
+            "serviceId": "CONFIG-SERVER",
+            "snapshot": [{"id": snapshot_id, "instanceId": "config@host:1", "status": "ACTIVE",
+                          "qos": {"availability": None, "responseTime": None}}]
+        }
+    }
+
+
+class TestMonitorSnapshot(unittest.TestCase):
+    """
+    Test cases for the compact snapshot model, against the same data as raw dicts.
+    """
+
+    def test_parse(self):
+        snapshot = MonitorSnapshot.parse(dict(_monitored_data(1), version=3))
+        self.assertEqual(list(snapshot), ["S", "CONFIG-SERVER"])
+        service = snapshot["S"]
+        self.assertEqual(service.implementation_id, "s-impl")
+        self.assertEqual([instance.status for instance in service.instances], ["ACTIVE", "FAILED"])
+        self.assertEqual(list(service.metrics[FAILED]), [0.0, 1.0])
+        self.assertEqual(list(service.metrics[AVAILABILITY]), [85.0, 85.0])
+        self.assertEqual(service.instances[1].metric(RESPONSE_TIME), 2.0)
+        self.assertTrue(math.isnan(snapshot["CONFIG-SERVER"].instances[0].metric(AVAILABILITY)))
+
+    def test_ids_are_shared_across_ticks(self):
+        first = MonitorSnapshot.parse(_monitored_data(1))
+        second = MonitorSnapshot.parse(_monitored_data(2))
+        self.assertIs(first["S"].instances[0].instance_id, second["S"].instances[0].instance_id)
+
+    def test_analysis_matches_raw_data(self):
+        raw = IncrementalAnalyzer(MonitoredHistory(), window_size=3)
+        compact = IncrementalAnalyzer(MonitoredHistory(), window_size=3)
+        for snapshot_id, statuses in ((1, ("ACTIVE", "FAILED")), (1, ("ACTIVE", "FAILED")), (2, ("ACTIVE", "ACTIVE"))):
+            monitored_data = _monitored_data(snapshot_id, statuses)
+            raw.history.record(monitored_data)
+            compact.history.record(MonitorSnapshot.parse(monitored_data))
+            self.assertEqual(raw.update(), compact.update())
+        for service_id, service in raw.services.items():
+            for metric in (FAILED, AVAILABILITY, RESPONSE_TIME):
+                np.testing.assert_equal(service.mean(metric), compact.services[service_id].mean(metric))
+
+    def test_columns_and_history_match_raw_data(self):
+        monitored_data = _monitored_data(1)
+        defaults = {"failureRate": 0, "utility": 0}
+        raw, compact = ramses_columns(monitored_data, defaults), ramses_columns(MonitorSnapshot.parse(monitored_data), defaults)
+        for column, values in raw.items():
+            np.testing.assert_array_equal(values, compact[column])
+        raw, compact = MonitoredHistory(), MonitoredHistory()
+        raw.record(monitored_data)
+        compact.record(MonitorSnapshot.parse(monitored_data))
+        self.assertEqual(list(compact.window("S", "s-impl@host:8002", FAILED)), [1.0])
+        self.assertTrue(math.isnan(compact.mean("CONFIG-SERVER", "config@host:1", AVAILABILITY)))
+        for key in compact.keys():
+            np.testing.assert_array_equal(compact.window(*key), raw.window(*key))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import tempfile
+import unittest
+
+from UPISAS.exemplars.trace_replay import ReplayedTrace, TraceReplayExemplar, replay
+from UPISAS.http_pool import get_session
+from UPISAS.run_log import RunLog, RunRecorder, MONITOR, EXECUTE
+from UPISAS.strategies.ramses_reactive_strategy import ReactiveAdaptationManager
+from UPISAS.strategy import Strategy
+
+_ADD_INSTANCE = {"operation": "addInstance", "serviceImplementationName": "s", "numberOfInstances": 1}
+
+
+class _ThresholdStrategy(Strategy):
+    """Adds an instance whenever f drops below `threshold`."""
+
+    def __init__(self, exemplar, threshold=0.5):
+        super().__init__(exemplar)
+        self.threshold = threshold
+
+    def analyze(self):
+        self.knowledge.analysis_data = {"low": self.knowledge.monitored_data["f"] < self.threshold}
+        return True
+
+    def plan(self):
+        self.knowledge.plan_data = {"requests": [_ADD_INSTANCE] if self.knowledge.analysis_data["low"] else []}
+        return True
+
+
+def _f(tick):
+    return [0.9, 0.4, 0.8, 0.2, 0.45, 0.7][tick]
+
+
+class TestTraceReplay(unittest.TestCase):
+    """
+    Test cases for the TraceReplayExemplar, replaying a run log to a strategy (no docker needed).
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        # A run in which the plan reacted to f dropping below 0.3
+        with RunRecorder(self.directory.name) as recorder:
+            for tick in range(6):
+                recorder.append(MONITOR, {"f": _f(tick)}, timestamp=100 + 10 * tick)
+                requests = [_ADD_INSTANCE] if _f(tick) < 0.3 else []
+                recorder.append(EXECUTE, {"requests": requests}, timestamp=101 + 10 * tick)
+        self.exemplar = TraceReplayExemplar(self.directory.name, auto_start=True)
+        self.exemplar.start_run()
+
+    def tearDown(self):
+        if self.exemplar.exemplar_container:
+            self.exemplar.stop_container()
+
+    def _monitor(self):
+        return get_session().get(f"{self.exemplar.base_endpoint}/monitor").json()["f"]
+
+    def test_ticks_are_served_in_order(self):
+        self.assertEqual([self._monitor() for _ in range(6)], [_f(tick) for tick in range(6)])
+        self.assertTrue(self.exemplar.finished)
+        # The last tick is served again once the trace is finished
+        self.assertEqual(self._monitor(), _f(5))
+
+    def test_seek(self):
+        self.exemplar.trace.seek(4)
+        self.assertEqual(self._monitor(), _f(4))
+        self.exemplar.trace.seek_time(115)
+        self.assertEqual(self._monitor(), _f(2))
+        self.assertEqual(self.exemplar.trace.tick, 2)
+
+    def test_paced_replay(self):
+        now = [0.0]
+        with RunLog(self.directory.name) as log:
+            trace = ReplayedTrace(log, speed=10, clock=lambda: now[0])
+            served = []
+            for elapsed in (0, 0.5, 1.2, 1.9, 4.2, 9):
+                now[0] = elapsed
+                trace.monitor()
+                served.append(trace.tick)
+            self.assertEqual(served, [0, 0, 1, 1, 4, 5])
+            self.assertTrue(trace.finished)
+
+    def test_replayed_executions_match_the_recorded_ones(self):
+        strategy = _ThresholdStrategy(self.exemplar, threshold=0.3)
+        executed = replay(strategy, with_validation=False)
+        self.assertEqual(strategy.monitor_ticks, 6)
+        self.assertEqual(executed, self.exemplar.trace.recorded_executions())
+        self.assertEqual([execution["tick"] for execution in executed], [3])
+
+        # A changed threshold reacts at other ticks
+        self.exemplar.trace.seek(0)
+        self.exemplar.trace.executed.clear()
+        strategy.threshold = 0.5
+        self.assertEqual([(execution["tick"], execution["time"]) for execution in replay(strategy, with_validation=False)],
+                         [(1, 110.0), (3, 130.0), (4, 140.0)])
+
+    def test_posted_adaptations_are_logged(self):
+        self._monitor()
+        response = get_session().post(f"{self.exemplar.base_endpoint}/execute", json=_ADD_INSTANCE)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.exemplar.trace.executed, [{"tick": 0, "time": 100.0, "request": _ADD_INSTANCE}])
+        self.assertEqual(get_session().post(f"{self.exemplar.base_endpoint}/unknown", json={}).status_code, 404)
+
+    def test_replays_are_reproducible(self):
+        self.exemplar.stop_container()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        # The availability of the recorded run drops below 85% on average at tick 2 only
+        with RunRecorder(directory.name) as recorder:
+            for tick, availability in enumerate((90, 90, 70, 90, 90, 95)):
+                recorder.append(MONITOR, {"S": {
+                    "serviceId": "S", "currentImplementationId": "s-impl",
+                    "snapshot": [{"id": tick, "instanceId": "s-impl@host:1", "status": "ACTIVE",
+                                  "qos": {"availability": availability, "responseTime": 1}}]}})
+        self.exemplar = TraceReplayExemplar(directory.name, auto_start=True)
+        self.exemplar.start_run()
+        replays = []
+        for _ in range(2):
+            self.exemplar.trace.seek(0)
+            self.exemplar.trace.executed.clear()
+            strategy = ReactiveAdaptationManager(self.exemplar)
+            replays.append(list(replay(strategy, with_validation=False)))
+            self.assertTrue(strategy.inject_qos)
+        self.assertEqual(replays[0], replays[1])
+        self.assertEqual([execution["tick"] for execution in replays[0]], [2])
+
+    def test_ramses_documents(self):
+        self.exemplar.stop_container()
+        self.exemplar = TraceReplayExemplar.for_ramses(self.directory.name, auto_start=True)
+        self.exemplar.start_run()
+        strategy = _ThresholdStrategy(self.exemplar)
+        strategy.get_monitor_schema()
+        self.assertEqual(strategy.knowledge.monitor_schema["type"], "object")
+        self.assertEqual(self.exemplar.monitor_key_path, "CONFIG-SERVER")
+
+
+if __name__ == '__main__':
+    unittest.main()
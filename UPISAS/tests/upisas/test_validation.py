@@ -0,0 +1,52 @@
+import unittest
+
+import jsonschema
+
+from UPISAS import validate_schema, get_validator, VALIDATION_SAMPLED, VALIDATION_KEYS
+from UPISAS.exceptions import IncompleteJSONSchema
+
+
+class TestValidateSchema(unittest.TestCase):
+    """
+    Test cases for the cached JSON Schema validation (no docker needed).
+    """
+
+    schema = {
+        "type": "object",
+        "properties": {
+            "f": {
+                "type": "number",
+            }
+        }
+    }
+
+    def test_validator_is_cached(self):
+        self.assertIs(get_validator(self.schema), get_validator(dict(self.schema)))
+
+    def test_full_validation(self):
+        with self.assertLogs() as cm:
+            validate_schema({"f": 1.0}, self.schema)
+            self.assertTrue("JSON object validated by JSON Schema" in ", ".join(cm.output))
+        with self.assertRaises(jsonschema.exceptions.ValidationError):
+            validate_schema({"f": "1.0"}, self.schema)
+
+    def test_sampled_validation(self):
+        validate_schema({"f": "1.0"}, self.schema, mode=VALIDATION_SAMPLED, tick=1, sample_every=10)
+        with self.assertRaises(jsonschema.exceptions.ValidationError):
+            validate_schema({"f": "1.0"}, self.schema, mode=VALIDATION_SAMPLED, tick=10, sample_every=10)
+
+    def test_keys_only_validation(self):
+        validate_schema({"f": "1.0"}, self.schema, mode=VALIDATION_KEYS)
+        with self.assertRaises(IncompleteJSONSchema):
+            validate_schema({"g": 1.0}, self.schema, mode=VALIDATION_KEYS)
+
+    def test_key_path(self):
+        validate_schema({"service": {"f": 1.0}}, self.schema, mode=VALIDATION_KEYS, key_path="service")
+
+    def test_invalid_schema(self):
+        with self.assertRaises(jsonschema.exceptions.SchemaError):
+            validate_schema({"f": 1.0}, {"type": "strange_value", "properties": {"f": {"type": "number"}}})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+"""
+End-to-end benchmarks of the RAMSES interface against the Python stand-in backend.
+
+For each service count, starts a RamsesStandIn and the interface (in-process, on an
+ephemeral port) and reports:
+- /monitor latency percentiles
+- /execute and /execute_batch throughput (adaptations per second)
+- full MAPE-K tick time of the ReactiveAdaptationManager
+
+Run from the parent folder of the project:
+
+    python -m benchmarks.bench_ramses --services 10 100 1000
+"""
+
+import argparse
+import contextlib
+import io
+import logging
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+from werkzeug.serving import make_server
+
+from UPISAS.http_pool import get_session
+from UPISAS.standins.ramses_backend import RamsesStandIn
+from UPISAS.strategies.ramses_reactive_strategy import ReactiveAdaptationManager
+
+INTERFACE_PATH = os.path.join(os.path.dirname(__file__), "..", "UPISAS", "ramses", "Interface")
+
+
+class _InterfaceEndpoint:
+    """Just enough of an Exemplar for a Strategy to talk to the in-process interface."""
+    monitor_key_path = None
+    incomplete_monitor_key_count = 1
+
+    def __init__(self, base_endpoint):
+        self.base_endpoint = base_endpoint
+
+
+def load_interface(cached):
+    """Import the interface app; without `cached`, probe caching and prefetching are disabled."""
+    if not cached:
+        for variable in ("RAMSES_ARCHITECTURE_TTL", "RAMSES_CONFIGURATION_TTL", "RAMSES_SNAPSHOT_TTL",
+                         "RAMSES_MONITOR_PREFETCH_INTERVAL"):
+            os.environ[variable] = "0"
+    os.chdir(INTERFACE_PATH)
+    sys.path.insert(0, os.path.abspath(INTERFACE_PATH))
+    import api
+    return api
+
+
+def percentiles(samples):
+    p50, p90, p99 = np.percentile(np.asarray(samples) * 1000, [50, 90, 99])
+    return f"p50 {p50:8.2f} ms  p90 {p90:8.2f} ms  p99 {p99:8.2f} ms"
+
+
+def bench_monitor(url, requests):
+    session = get_session()
+    samples = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        session.get(url + "/monitor").raise_for_status()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def bench_execute(url, services, adaptations):
+    session = get_session()
+    items = [{"operation": "addInstances", "serviceImplementationName": f"service-{i % services}",
+              "numberOfInstances": 1} for i in range(adaptations)]
+    started = time.perf_counter()
+    for item in items:
+        session.post(url + "/execute", json=item).raise_for_status()
+    single = adaptations / (time.perf_counter() - started)
+    started = time.perf_counter()
+    session.post(url + "/execute_batch", json=items).raise_for_status()
+    batch = adaptations / (time.perf_counter() - started)
+    return single, batch
+
+
+def bench_tick(url, ticks):
+    strategy = ReactiveAdaptationManager(_InterfaceEndpoint(url))
+    samples = []
+    for _ in range(ticks):
+        started = time.perf_counter()
+        strategy.monitor(with_validation=False)
+        if strategy.analyze():
+            if strategy.plan():
+                strategy.execute()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--services", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--instances", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.0, help="stand-in latency per request, in seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--monitor-requests", type=int, default=20)
+    parser.add_argument("--adaptations", type=int, default=100)
+    parser.add_argument("--ticks", type=int, default=5)
+    parser.add_argument("--cached", action="store_true", help="keep the interface's probe caches and prefetcher")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    api = load_interface(args.cached)
+    interface = make_server("127.0.0.1", 0, api.app, threaded=True)
+    threading.Thread(target=interface.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{interface.server_port}"
+
+    results = []
+    for services in args.services:
+        with RamsesStandIn(services=services, instances=args.instances, latency=args.latency,
+                           failure_rate=args.failure_rate, seed=0) as standin:
+            api.probe_url = api.instances_manager_url = api.load_balancer_url = standin.url
+            # Nothing cached for the previous scenario may be served for this one
+            api.probe_cache.invalidate()
+            api.monitor_state.invalidate()
+            with contextlib.redirect_stdout(io.StringIO()):
+                monitor = bench_monitor(url, args.monitor_requests)
+                single, batch = bench_execute(url, services, args.adaptations)
+                tick = bench_tick(url, args.ticks)
+            results.append((services, monitor, single, batch, tick))
+
+    interface.shutdown()
+    for services, monitor, single, batch, tick in results:
+        print(f"services: {services}")
+        print(f"  /monitor latency   {percentiles(monitor)}")
+        print(f"  /execute           {single:8.1f} adaptations/s")
+        print(f"  /execute_batch     {batch:8.1f} adaptations/s")
+        print(f"  MAPE-K tick        {percentiles(tick)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -21,10 +21,8 @@ import time
 
 if __name__ == '__main__':
     # try:
-    exemplar = RAMSES(auto_start=True) #start containers
-    time.sleep(30)
-    exemplar.start_run() #run api.py
-    time.sleep(10)
+    exemplar = RAMSES(auto_start=True) #start containers, returns once they are up
+    exemplar.start_run() #run api.py, returns once it answers
     # print('sleeping')
     # Initialize the Strategy directly
     # strategy = ReactiveAdaptationManager(exemplar)